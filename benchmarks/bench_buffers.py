@@ -0,0 +1,166 @@
+"""
+Measure what reading into pooled buffers saves over read(n) in the hash and copy loops
+
+Hashes and copies a set of files three ways: with the read(n) loops the
+controllers used before (a new bytes object per chunk), through the real
+code paths with the shared BufferPool, and through the same code paths
+with a pool that keeps nothing (a new buffer per chunk). For each it
+reports MB/s, buffers allocated, the minor page faults the process took
+(each freshly allocated multi-megabyte buffer is new memory the kernel has
+to fault in) and the tracemalloc peak.
+
+The files are read from the page cache, so the numbers show the cost of the
+loops rather than of the disk.
+
+    python benchmarks/bench_buffers.py
+    python benchmarks/bench_buffers.py --files 8 --size 256M --buffer-size 16M
+"""
+import argparse
+import hashlib
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import parse_size
+from controllers.buffers import BufferPool
+from controllers.hashing import FileHasher
+from controllers.transfer import FileTransferManager
+
+
+def legacy_hash(paths, buffer_size):
+    """The read(n) loop _calculate_checksum used"""
+    digests = []
+    for path in paths:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            buffer = f.read(buffer_size)
+            while len(buffer) > 0:
+                hasher.update(buffer)
+                buffer = f.read(buffer_size)
+        digests.append(hasher.hexdigest())
+    return digests
+
+
+def pooled_hash(paths, buffer_size, pool):
+    file_hasher = FileHasher(buffer_pool=pool)
+    digests = []
+    for path in paths:
+        hasher = hashlib.sha256()
+        file_hasher.hash(path, [hasher], buffer_size=buffer_size, strategy='readinto')
+        digests.append(hasher.hexdigest())
+    return digests
+
+
+def legacy_copy(paths, destination, buffer_size):
+    """The read(n)/write loop of the buffered copy, without its reader thread"""
+    digests = []
+    for path in paths:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as src, open(os.path.join(destination, os.path.basename(path)), 'wb') as dst:
+            buffer = src.read(buffer_size)
+            while buffer:
+                dst.write(buffer)
+                hasher.update(buffer)
+                buffer = src.read(buffer_size)
+            dst.flush()
+            os.fsync(dst.fileno())
+        digests.append(hasher.hexdigest())
+    return digests
+
+
+def pooled_copy(paths, destination, buffer_size, pool):
+    manager = FileTransferManager(copy_mode='buffered')
+    manager.buffer_size = buffer_size
+    manager.buffer_pool = pool
+    return [manager._buffered_copy_with_progress(path, os.path.join(destination, os.path.basename(path)),
+                                                 os.path.getsize(path))
+            for path in paths]
+
+
+def measure(label, total_bytes, run, pool=None):
+    """Run once untraced for timing, then again under tracemalloc; print a result row"""
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    allocations = pool.allocations if pool else 0
+    start = time.perf_counter()
+    digests = run()
+    elapsed = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+    allocations = pool.allocations - allocations if pool else None
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{label:<32} {total_bytes / elapsed / (1024 * 1024):8.0f} MB/s"
+          f"{'' if allocations is None else allocations:>10} {faults:>12} {peak / (1024 * 1024):11.1f} MB")
+    return digests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=16, help="Number of files (default: 16)")
+    parser.add_argument('--size', type=parse_size, default=parse_size('32M'),
+                        help="Size of each file (default: 32M)")
+    parser.add_argument('--buffer-size', type=parse_size, default=parse_size('16M'),
+                        help="Chunk size, as FileTransferManager uses (default: 16M)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, 'source')
+        destination = os.path.join(folder, 'destination')
+        os.makedirs(source)
+        os.makedirs(destination)
+
+        block = os.urandom(args.size)
+        paths = []
+        for index in range(args.files):
+            path = os.path.join(source, f"file{index:04d}.bin")
+            with open(path, 'wb') as f:
+                f.write(block)
+            paths.append(path)
+        del block
+        total_bytes = args.files * args.size
+
+        # Read everything once so all runs are served from the page cache
+        legacy_hash(paths, args.buffer_size)
+
+        print(f"{args.files} files x {args.size} bytes, {args.buffer_size} byte chunks")
+        print(f"{'':<32} {'throughput':>13} {'buffers':>9} {'minor faults':>12} {'traced peak':>14}")
+
+        shared = BufferPool()
+        no_reuse = BufferPool(max_idle_bytes=0)
+        pooled_hash(paths, args.buffer_size, shared)  # Fill the pool, as a long run would have
+
+        results = [
+            measure("hash: read(n)", total_bytes, lambda: legacy_hash(paths, args.buffer_size)),
+            measure("hash: readinto, no reuse", total_bytes,
+                    lambda: pooled_hash(paths, args.buffer_size, no_reuse), no_reuse),
+            measure("hash: readinto, BufferPool", total_bytes,
+                    lambda: pooled_hash(paths, args.buffer_size, shared), shared),
+        ]
+        if len({tuple(result) for result in results}) != 1:
+            sys.exit("Hash loops disagree")
+
+        pooled_copy(paths, destination, args.buffer_size, shared)
+        results = [
+            measure("copy: read(n)", total_bytes,
+                    lambda: legacy_copy(paths, destination, args.buffer_size)),
+            measure("copy: readinto, no reuse", total_bytes,
+                    lambda: pooled_copy(paths, destination, args.buffer_size, no_reuse), no_reuse),
+            measure("copy: readinto, BufferPool", total_bytes,
+                    lambda: pooled_copy(paths, destination, args.buffer_size, shared), shared),
+        ]
+        if len({tuple(result) for result in results}) != 1:
+            sys.exit("Copy loops disagree")
+        shutil.rmtree(destination)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Compare writing the TIFF metadata report as CSV, Parquet and Feather
+
+Builds synthetic TIFF metadata records, writes the report in each format
+through Reporter's row builder and reports the write time, file size and
+the time pandas takes to load the file back.
+
+    python benchmarks/bench_columnar_reports.py --rows 200000
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers import columnar
+from controllers.columnar import ColumnarReportWriter
+from controllers.reporter import Reporter, TIFF_METADATA_COLUMNS, TIFF_METADATA_FIELDNAMES
+from models.tiff_metadata import TiffRecord
+
+
+def make_records(count, seed=0):
+    """Return count TiffRecords with a realistic mix of values"""
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        width = rng.choice([2400, 3600, 4800, 7200])
+        records.append(TiffRecord.from_dict({
+            'path': f"/archive/box{index // 500:04d}/folder{index // 50:05d}/scan{index:07d}.tif",
+            'rel_path': f"box{index // 500:04d}/folder{index // 50:05d}/scan{index:07d}.tif",
+            'size': rng.randint(5, 300) * 1024 * 1024,
+            'width': width,
+            'height': width * 4 // 3,
+            'format': 'TIFF',
+            'mode': rng.choice(['RGB', 'L', 'RGBA']),
+            'dpi_x': rng.choice([300.0, 400.0, 600.0, 'Unknown']),
+            'dpi_y': rng.choice([300.0, 400.0, 600.0]),
+            'bit_depth': rng.choice([8, 16, 24, 48]),
+            'color_profile': rng.choice(['Adobe RGB (1998)', 'sRGB IEC61966-2.1', 'None']),
+            'compression': rng.choice(['None', 'LZW', 'Deflate']),
+            'software': rng.choice(['Capture One', 'Adobe Photoshop 24.1', '']),
+            'datetime': f"2023:0{rng.randint(1, 9)}:1{rng.randint(0, 9)} 12:00:00",
+            'tiff_version': 'Classic TIFF',
+            'subfile_type': '0',
+            'planar_config': 'Contiguous',
+            'samples_per_pixel': 3,
+            'photometric': 'RGB',
+            'xmp': rng.choice(['Yes', 'No']),
+            'exif': rng.choice(['Yes', 'No']),
+            'iptc': 'No',
+            'is_bigtiff': 'No',
+            'is_tiled': rng.choice(['Yes', 'No']),
+            'tile_width': 256,
+            'tile_height': 256,
+            'bits_per_sample': '8,8,8'
+        }))
+    return records
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=TIFF_METADATA_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_columnar(rows, path, file_format):
+    with ColumnarReportWriter(path, TIFF_METADATA_COLUMNS, file_format) as writer:
+        writer.writerows(rows)
+
+
+def read_file(path, file_format):
+    if file_format == 'csv':
+        return pd.read_csv(path)
+    if file_format == 'parquet':
+        return pd.read_parquet(path)
+    return pd.read_feather(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help="Number of TIFF records")
+    args = parser.parse_args()
+
+    if not columnar.is_available():
+        sys.exit("pyarrow is required for this benchmark")
+
+    reporter = Reporter()
+    rows = [reporter._tiff_metadata_row(record) for record in make_records(args.rows)]
+
+    writers = [
+        ('csv', '.csv', write_csv),
+        ('parquet', '.parquet', lambda rows, path: write_columnar(rows, path, 'parquet')),
+        ('feather', '.feather', lambda rows, path: write_columnar(rows, path, 'feather'))
+    ]
+
+    print(f"{args.rows} rows")
+    print(f"{'format':<10}{'write (s)':>12}{'size (MB)':>12}{'read (s)':>12}")
+    with tempfile.TemporaryDirectory() as folder:
+        for file_format, extension, write in writers:
+            path = os.path.join(folder, 'tiff_metadata_report' + extension)
+
+            start = time.perf_counter()
+            write(rows, path)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            read_file(path, file_format)
+            read_time = time.perf_counter() - start
+
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"{file_format:<10}{write_time:>12.3f}{size_mb:>12.2f}{read_time:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare FileHasher's read strategies across file sizes and show the one it picks
+
+Writes a file of each size to --folder (a temporary folder by default; point
+it at the volume you care about, e.g. a NAS mount), then hashes it with
+every strategy and reports MB/s. The strategy FileHasher would choose for
+the file's size and filesystem is marked with *. By default each file is
+evicted from the page cache before every run (posix_fadvise DONTNEED) so
+the disk is measured; --warm measures hashing from memory instead.
+
+    python benchmarks/bench_hashing.py
+    python benchmarks/bench_hashing.py --folder /mnt/nas/tmp --sizes 64K,4M,256M,1G
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import parse_size
+from controllers.hashing import STRATEGIES, FileHasher, filesystem_type
+
+
+def write_file(path, size):
+    """Write size random-ish bytes (cheap to generate, impossible to compress)"""
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def time_strategy(hasher, path, algorithms, strategy, repeat, warm):
+    """Return the best seconds over repeat runs, and the digests"""
+    best = None
+    for _ in range(repeat):
+        hashers = [hashlib.new(name) for name in algorithms]
+        start = time.perf_counter()
+        hasher.hash(path, hashers, drop_cache=not warm, strategy=strategy)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, [h.hexdigest() for h in hashers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--folder', help="Where to write the test files (default: a temporary folder)")
+    parser.add_argument('--sizes', default='16K,512K,4M,64M,256M',
+                        help="Comma-separated file sizes (default: 16K,512K,4M,64M,256M)")
+    parser.add_argument('--algorithms', default='sha256',
+                        help="Comma-separated algorithms hashed together (default: sha256)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case (best is kept)")
+    parser.add_argument('--warm', action='store_true', help="Leave the files in the page cache")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    algorithms = args.algorithms.split(',')
+    hasher = FileHasher()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        filesystem = filesystem_type(os.stat(folder).st_dev)
+        print(f"{folder} ({filesystem}), {'+'.join(algorithms)}, "
+              f"{'warm' if args.warm else 'cold'} cache, best of {args.repeat}")
+        print(f"{'size':>10}  " + "".join(f"{strategy:>14}" for strategy in STRATEGIES) + "  chosen")
+
+        for size in sizes:
+            path = os.path.join(folder, f"test_{size}.bin")
+            write_file(path, size)
+            chosen = hasher.choose(size, filesystem, len(algorithms))
+
+            cells = []
+            digests = set()
+            for strategy in STRATEGIES:
+                seconds, digest = time_strategy(hasher, path, algorithms, strategy, args.repeat,
+                                                args.warm)
+                digests.add(tuple(digest))
+                marker = '*' if strategy == chosen else ' '
+                cells.append(f"{size / seconds / (1024 * 1024):.0f} MB/s{marker}")
+
+            if len(digests) != 1:
+                sys.exit(f"Strategies disagree on the digest of a {size} byte file")
+            print(f"{size:>10}  " + "".join(f"{cell:>14}" for cell in cells) + f"  {chosen}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Measure deep validation or pixel fingerprint throughput for each decode thread count
+
+Writes a set of tiled, compressed TIFFs (random-ish image data, so the
+codecs have real work to do), then verifies each of them with
+verify_pixels (or, with --fingerprint, hashes them with
+pixel_fingerprint) at every --threads count and reports MB/s of file and
+decoded pixel data, with the tracemalloc peak. The peak is a few tiles
+per thread, plus one row of tiles when fingerprinting, whatever the
+image size. The files are read from the page cache, so the numbers show
+the cost of decoding rather than of the disk.
+
+    python benchmarks/bench_pixels.py
+    python benchmarks/bench_pixels.py --compression jpeg --size 8192 --threads 1,4,8
+    python benchmarks/bench_pixels.py --fingerprint --size 16384 --tile 512
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import tifffile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cli import parse_size
+from controllers.pixels import PIXEL_MAX_INFLIGHT_BYTES, pixel_fingerprint, verify_pixels
+
+
+def write_images(folder, count, size, compression, tile):
+    """Write count RGB images of size x size pixels; return their paths"""
+    rng = np.random.default_rng(0)
+    # Smooth gradients with noise, which compress about as well as scans do
+    gradient = np.linspace(0, 200, size, dtype=np.float32)
+    base = (gradient[:, None] + gradient[None, :]) / 2
+    paths = []
+    for index in range(count):
+        noise = rng.integers(0, 48, (size, size, 3), dtype=np.uint8)
+        image = (base[:, :, None] + noise).astype(np.uint8)
+        path = os.path.join(folder, f"image{index:03d}.tif")
+        tifffile.imwrite(path, image, photometric='rgb', compression=compression,
+                         tile=(tile, tile))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=4, help="Number of images (default: 4)")
+    parser.add_argument('--size', type=int, default=4096, help="Image width and height (default: 4096)")
+    parser.add_argument('--compression', default='zlib',
+                        help="tifffile compression: zlib, lzw, jpeg, zstd... (default: zlib)")
+    parser.add_argument('--tile', type=int, default=256, help="Tile width and height (default: 256)")
+    parser.add_argument('--threads', default=','.join(map(str, sorted({1, 2, 4, os.cpu_count() or 1}))),
+                        help="Comma-separated decode thread counts")
+    parser.add_argument('--max-inflight', type=parse_size, default=PIXEL_MAX_INFLIGHT_BYTES,
+                        metavar='SIZE', help="Compressed bytes read ahead per file")
+    parser.add_argument('--fingerprint', action='store_true',
+                        help="Time pixel_fingerprint instead of verify_pixels")
+    args = parser.parse_args()
+
+    if args.fingerprint:
+        def run(path, threads):
+            return pixel_fingerprint(path, threads, args.max_inflight)
+    else:
+        def run(path, threads):
+            result = verify_pixels(path, threads, args.max_inflight)
+            if result['pixel_check'] != 'OK':
+                sys.exit(f"Verification failed: {result}")
+            return result
+
+    with tempfile.TemporaryDirectory() as folder:
+        paths = write_images(folder, args.files, args.size, args.compression, args.tile)
+        file_bytes = sum(os.path.getsize(path) for path in paths)
+        pixel_bytes = args.files * args.size * args.size * 3
+
+        # Read everything once so all runs are served from the page cache
+        for path in paths:
+            with open(path, 'rb') as f:
+                while f.read(16 * 1024 * 1024):
+                    pass
+
+        print(f"{args.files} x {args.size}x{args.size} RGB, {args.compression}, "
+              f"{args.tile}px tiles, {file_bytes / (1024 * 1024):.0f} MB on disk")
+        print(f"{'threads':>8} {'file MB/s':>10} {'pixel MB/s':>11} {'traced peak':>14}")
+
+        for threads in [int(value) for value in args.threads.split(',')]:
+            start = time.perf_counter()
+            for path in paths:
+                run(path, threads)
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            for path in paths:
+                run(path, threads)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{threads:>8} {file_bytes / elapsed / (1024 * 1024):10.0f} "
+                  f"{pixel_bytes / elapsed / (1024 * 1024):11.0f} {peak / (1024 * 1024):11.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
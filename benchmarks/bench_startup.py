@@ -0,0 +1,138 @@
+"""
+Measure GUI and CLI cold-start time and check no heavy module is loaded at startup
+
+For the GUI (main.py run offscreen until its window is shown) and the CLI
+(cli.py --help) this prints the best wall-clock time over --repeat runs
+and an import-time breakdown from python -X importtime. It exits with
+status 1 if numpy, pandas, pyarrow, tifffile or PIL were imported before
+the window appeared or by the CLI, or if a startup is slower than
+--max-seconds.
+
+With --executable, the PyInstaller build from build.py is started the same
+way (it honours TIFF_TOOL_STARTUP_REPORT), so the frozen app is held to the
+same checks.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --executable ~/Desktop/TIFF_Tool_Build/tiff_preservation_tool/tiff_preservation_tool
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only features (not startup) may load
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow', 'tifffile', 'PIL')
+
+
+def run_gui(command, importtime=False):
+    """Start the GUI until its window is shown; return (seconds, modules, importtime lines)"""
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    with tempfile.TemporaryDirectory() as folder:
+        report = os.path.join(folder, 'startup.json')
+        env['TIFF_TOOL_STARTUP_REPORT'] = report
+        if importtime:
+            command = command[:1] + ['-X', 'importtime'] + command[1:]
+
+        start = time.perf_counter()
+        try:
+            process = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True,
+                                     timeout=60)
+        except subprocess.TimeoutExpired:
+            sys.exit(f"{' '.join(command)} didn't quit; does it support TIFF_TOOL_STARTUP_REPORT?")
+        elapsed = time.perf_counter() - start
+
+        if not os.path.exists(report):
+            sys.exit(f"{' '.join(command)} didn't show its window:\n{process.stderr}")
+        with open(report) as f:
+            modules = json.load(f)['modules']
+
+    return elapsed, modules, process.stderr.splitlines()
+
+
+def run_cli(importtime=False):
+    """Run cli.py --help; return (seconds, modules, importtime lines)"""
+    command = [sys.executable, 'cli.py', '--help']
+    if importtime:
+        command = command[:1] + ['-X', 'importtime'] + command[1:]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=120)
+    elapsed = time.perf_counter() - start
+
+    lines = process.stderr.splitlines()
+    return elapsed, [name for name, _, _, _ in parse_importtime(lines)], lines
+
+
+def parse_importtime(lines):
+    """Return (module, depth, self_us, cumulative_us) for each -X importtime line"""
+    imports = []
+    for line in lines:
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def heavy_modules(modules):
+    return sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES))
+
+
+def best_time(run, repeat):
+    return min(run()[0] for _ in range(repeat))
+
+
+def print_breakdown(lines, top):
+    imports = parse_importtime(lines)
+    total = sum(cumulative for _, depth, _, cumulative in imports if depth == 0)
+    print(f"  imports: {total / 1000:.1f} ms; slowest top-level imports:")
+    top_level = sorted((item for item in imports if item[1] == 0), key=lambda item: -item[3])
+    for name, _, _, cumulative in top_level[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (best is kept)")
+    parser.add_argument('--top', type=int, default=12, help="Imports listed in the breakdown")
+    parser.add_argument('--max-seconds', type=float, help="Fail if a startup takes longer")
+    parser.add_argument('--executable', help="PyInstaller build of the GUI to check as well")
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(label, seconds, modules):
+        print(f"{label}: {seconds * 1000:.0f} ms (best of {args.repeat})")
+        heavy = heavy_modules(modules)
+        if heavy:
+            failures.append(f"{label} imported {', '.join(heavy)} at startup")
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            failures.append(f"{label} took {seconds:.2f} s (limit {args.max_seconds:.2f} s)")
+
+    gui_command = [sys.executable, 'main.py']
+    _, modules, lines = run_gui(gui_command, importtime=True)
+    check("GUI (source)", best_time(lambda: run_gui(gui_command), args.repeat), modules)
+    print_breakdown(lines, args.top)
+
+    _, modules, lines = run_cli(importtime=True)
+    check("CLI", best_time(run_cli, args.repeat), modules)
+    print_breakdown(lines, args.top)
+
+    if args.executable:
+        executable = [os.path.abspath(os.path.expanduser(args.executable))]
+        seconds = best_time(lambda: run_gui(executable), args.repeat)
+        check("GUI (PyInstaller build)", seconds, run_gui(executable)[1])
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,356 @@
+"""
+Command-line interface for running scans, reports, checksums and transfers
+without the GUI (and without importing Qt), e.g. from cron or a batch
+scheduler.
+
+Every line written to stdout is a JSON object with an "event" key:
+"status", "progress", "rate" and "record" lines while the command runs,
+then a single "result" line (or "cancelled" / "error"). Progress lines are
+limited to --progress-rate a second.
+
+    python cli.py report /archive/scans --output /archive/reports --format parquet
+    python cli.py checksum generate /archive/scans --layout consolidated
+    python cli.py transfer /archive/scans /mnt/backup/scans --sync-mode size_mtime
+"""
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+import multiprocessing
+
+from controllers.cancellation import CancellationToken, OperationCancelled
+from controllers.progress import ProgressReporter
+from models.config import (SCAN_WORKERS, SCAN_CATALOG_NAME, CHECKSUM_WORKERS,
+                           CHECKSUM_MAX_INFLIGHT_BYTES, CHECKSUM_ROTATIONAL_WORKERS,
+                           FIXITY_CACHE_PATH, FIXITY_MAX_AGE_DAYS, FIXITY_SAMPLE_CONFIDENCE,
+                           FIXITY_SAMPLE_MARGIN, TRANSFER_WORKERS)
+
+# Exit codes besides 0 (success)
+EXIT_FAILURES = 1  # Completed, but with invalid, missing or failed files
+EXIT_ERROR = 2
+EXIT_CANCELLED = 130
+
+# Size suffixes accepted by size options
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+class JsonLinesOutput:
+    """Writes events as JSON lines, from any thread"""
+
+    def __init__(self, stream, quiet=False):
+        self.stream = stream
+        self.quiet = quiet
+        self.lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({'event': event, **fields}, default=str)
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def callbacks(self, progress_rate, progress_names=('progress',)):
+        """
+        Return a ProgressReporter and a dict of coalesced callbacks for a
+        controller: status_callback, count_callback and one progress callback
+        per name in progress_names. With quiet, the callbacks do nothing.
+        """
+        reporter = ProgressReporter(rate_callback=self._emit_rate, frame_rate=progress_rate)
+        if self.quiet:
+            reporter.rate_callback = None
+            return reporter, dict({f'{name}_callback': None for name in progress_names},
+                                  status_callback=None, count_callback=None)
+
+        callbacks = {
+            'status_callback': reporter.status(lambda message: self.emit('status', message=message)),
+            'count_callback': reporter.count
+        }
+        for name in progress_names:
+            callbacks[f'{name}_callback'] = reporter.percent(
+                lambda value, name=name: self.emit(name, value=value))
+        return reporter, callbacks
+
+    def _emit_rate(self, files_per_second, mb_per_second):
+        self.emit('rate', files_per_second=round(files_per_second, 2),
+                  mb_per_second=round(mb_per_second, 2))
+
+
+def parse_size(text):
+    """Parse a byte count such as 65536, 64K, 16M or 1G"""
+    text = text.strip().upper().rstrip('B')
+    multiplier = 1
+    if text and text[-1] in SIZE_UNITS:
+        multiplier = SIZE_UNITS[text[-1]]
+        text = text[:-1]
+    try:
+        size = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}") from None
+    if size <= 0:
+        raise argparse.ArgumentTypeError("size must be positive")
+    return size
+
+
+def parse_algorithms(text):
+    """Parse a comma-separated list of checksum algorithms, e.g. sha256,md5"""
+    from controllers.checksum import CHECKSUM_ALGORITHMS
+
+    algorithms = [name.strip().lower() for name in text.split(',') if name.strip()]
+    for name in algorithms:
+        if name not in CHECKSUM_ALGORITHMS:
+            raise argparse.ArgumentTypeError(
+                f"unknown algorithm {name!r} (choose from {', '.join(CHECKSUM_ALGORITHMS)})")
+    if not algorithms:
+        raise argparse.ArgumentTypeError("no algorithm given")
+    return algorithms
+
+
+def existing_folder(path):
+    """Accept only a path to an existing folder"""
+    if not os.path.isdir(path):
+        raise argparse.ArgumentTypeError(f"not a folder: {path}")
+    return path
+
+
+def run_scan(args, output, cancel_token):
+    from controllers.duplicates import DuplicateIndex
+    from controllers.scanner import Scanner
+
+    scanner = Scanner(workers=args.workers, catalog_path=args.catalog, cancel_token=cancel_token,
+                      deep_validation=args.deep_validation, fingerprint=args.fingerprint)
+    reporter, callbacks = output.callbacks(args.progress_rate)
+
+    counts = {'tiff': 0, 'non_tiff': 0}
+    pixel_failures = []
+    with DuplicateIndex() as duplicates:
+        for kind, record in scanner.iter_scan(args.root, **callbacks):
+            counts[kind] += 1
+            if args.records:
+                output.emit('record', kind=kind, record=dict(record))
+            if args.deep_validation and kind == 'tiff' and record.get('pixel_check') != 'OK':
+                pixel_failures.append(record['rel_path'])
+            if kind == 'tiff':
+                duplicates.add(record)
+        reporter.flush()
+        duplicate_groups, duplicate_files = duplicates.counts()
+
+    extra = {}
+    if args.deep_validation:
+        extra['pixel_failures'] = pixel_failures
+    if args.fingerprint:
+        extra.update(duplicate_groups=duplicate_groups, duplicate_files=duplicate_files)
+    output.emit('result', tiff_files=counts['tiff'], non_tiff_files=counts['non_tiff'],
+                folders=len(scanner.results['folders']),
+                deleted_files=scanner.results['deleted_files'], **extra)
+    return EXIT_FAILURES if pixel_failures else 0
+
+
+def run_report(args, output, cancel_token):
+    from controllers.reporter import Reporter
+    from controllers.scanner import Scanner
+
+    os.makedirs(args.output, exist_ok=True)
+    catalog_path = None if args.no_catalog else os.path.join(args.output, SCAN_CATALOG_NAME)
+
+    scanner = Scanner(workers=args.workers, catalog_path=catalog_path, cancel_token=cancel_token,
+                      deep_validation=args.deep_validation, fingerprint=args.fingerprint)
+    reporter = Reporter(columnar_format=None if args.format == 'csv' else args.format,
+                        deep_validation=args.deep_validation, fingerprint=args.fingerprint)
+    progress_reporter, callbacks = output.callbacks(args.progress_rate)
+
+    records = scanner.iter_scan(args.root, **callbacks)
+    statistics = reporter.generate_streaming_reports(records, scanner.results, args.output,
+                                                     status_callback=callbacks['status_callback'])
+    progress_reporter.flush()
+
+    extra = {}
+    if args.deep_validation:
+        extra['pixel_check'] = statistics.pixel_check_counts
+    if args.fingerprint:
+        extra.update(duplicate_groups=statistics.duplicate_groups,
+                     duplicate_files=statistics.duplicate_files)
+    output.emit('result',
+                output_folder=args.output,
+                total_tiff_files=statistics.total_tiff_files,
+                total_non_tiff_files=statistics.total_non_tiff_files,
+                total_folders=statistics.total_folders,
+                asset_folders=statistics.asset_folders,
+                total_size_gb=statistics.total_size_gb,
+                dpi=statistics.dpi_counts,
+                compression=statistics.compression_counts,
+                color_profile=statistics.profile_counts,
+                bit_depth=statistics.bit_depth_counts,
+                deleted_files=scanner.results['deleted_files'], **extra)
+    return EXIT_FAILURES if any(result != 'OK' for result in extra.get('pixel_check', ())) else 0
+
+
+def run_checksum(args, output, cancel_token):
+    from controllers.checksum import ChecksumGenerator
+
+    generator = ChecksumGenerator(workers=args.workers,
+                                  max_inflight_bytes=args.max_inflight,
+                                  rotational_workers=args.rotational_workers,
+                                  cancel_token=cancel_token,
+                                  fixity_cache_path=args.fixity_cache,
+                                  fixity_max_age_days=args.max_age_days,
+                                  fixity_confidence=args.sample_confidence,
+                                  fixity_margin=args.sample_margin)
+    if args.buffer_size:
+        generator.buffer_size = args.buffer_size
+    reporter, callbacks = output.callbacks(args.progress_rate)
+
+    if args.action == 'generate':
+        results = generator.generate_checksums(args.folder, algorithm=args.algorithm,
+                                               format_type=args.layout, **callbacks)
+        reporter.flush()
+        output.emit('result', files=len(results['checksums']), output_files=results['output_files'])
+        return 0
+
+    results = generator.validate_checksums(args.folder, **callbacks)
+    reporter.flush()
+    output.emit('result', **results)
+    return EXIT_FAILURES if results['invalid_files'] or results['missing_files'] else 0
+
+
+def run_transfer(args, output, cancel_token):
+    from controllers.transfer import FileTransferManager
+
+    manager = FileTransferManager(workers=args.workers, queue_depth=args.queue_depth,
+                                  copy_mode=args.copy_mode, sync_mode=args.sync_mode,
+                                  cancel_token=cancel_token)
+    if args.buffer_size:
+        manager.buffer_size = args.buffer_size
+    reporter, callbacks = output.callbacks(args.progress_rate,
+                                           ('overall_progress', 'file_progress'))
+
+    results = manager.transfer_files(args.source, args.destination, **callbacks)
+    reporter.flush()
+
+    output.emit('result', log_file=manager.log_file, **results)
+    return EXIT_FAILURES if results['errors'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Scan, report on, checksum and transfer TIFF collections without the GUI. "
+                    "Writes JSON lines to stdout.")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Only write the result line, no progress")
+    parser.add_argument('--progress-rate', type=float, default=2.0, metavar='N',
+                        help="Maximum progress lines per second (default: 2)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="Scan a folder for TIFF files")
+    scan.add_argument('root', type=existing_folder, help="Folder to scan")
+    scan.add_argument('--workers', type=int, default=SCAN_WORKERS,
+                      help=f"Metadata extraction processes (default: {SCAN_WORKERS})")
+    scan.add_argument('--catalog', metavar='PATH',
+                      help="SQLite scan catalog, so unchanged files aren't parsed again")
+    scan.add_argument('--deep-validation', action='store_true',
+                      help="Also decode every strip and tile, reporting files whose pixel data is "
+                           "truncated or corrupt")
+    scan.add_argument('--fingerprint', action='store_true',
+                      help="Also hash the decoded pixels, to find the same image saved with "
+                           "different compression, layout or tags")
+    scan.add_argument('--records', action='store_true',
+                      help="Write a 'record' line with the metadata of every file")
+    scan.set_defaults(run=run_scan)
+
+    report = commands.add_parser('report', help="Scan a folder and write the reports")
+    report.add_argument('root', type=existing_folder, help="Folder to scan")
+    report.add_argument('--output', required=True, metavar='FOLDER', help="Folder for the reports")
+    report.add_argument('--workers', type=int, default=SCAN_WORKERS,
+                        help=f"Metadata extraction processes (default: {SCAN_WORKERS})")
+    report.add_argument('--format', choices=['csv', 'parquet', 'feather'], default='csv',
+                        help="Also write the per-file reports as Parquet or Feather")
+    report.add_argument('--deep-validation', action='store_true',
+                        help="Also decode every strip and tile, adding the first failure of each "
+                             "file to the TIFF metadata report")
+    report.add_argument('--fingerprint', action='store_true',
+                        help="Also hash the decoded pixels and write duplicate_groups.csv, listing "
+                             "the same image saved with different compression, layout or tags")
+    report.add_argument('--no-catalog', action='store_true',
+                        help=f"Parse every file instead of using {SCAN_CATALOG_NAME} in the output folder")
+    report.set_defaults(run=run_report)
+
+    checksum = commands.add_parser('checksum', help="Generate or validate checksum files")
+    checksum.add_argument('action', choices=['generate', 'validate'])
+    checksum.add_argument('folder', type=existing_folder, help="Folder to process")
+    checksum.add_argument('--algorithm', type=parse_algorithms, default=['sha256'], metavar='NAMES',
+                          help="Comma-separated algorithms for generate, all from one read of "
+                               "each file: md5, sha1, sha256, sha512, blake2b (default: sha256)")
+    checksum.add_argument('--layout', choices=['per_folder', 'consolidated'], default='per_folder',
+                          help="One checksum file per folder, or one for the whole tree")
+    checksum.add_argument('--workers', type=int, default=CHECKSUM_WORKERS,
+                          help=f"Hashing threads (default: {CHECKSUM_WORKERS})")
+    checksum.add_argument('--rotational-workers', type=int, default=CHECKSUM_ROTATIONAL_WORKERS,
+                          help="Validation threads per spinning disk")
+    checksum.add_argument('--max-inflight', type=parse_size, default=CHECKSUM_MAX_INFLIGHT_BYTES,
+                          metavar='SIZE', help="Bytes of files hashed ahead (e.g. 256M)")
+    checksum.add_argument('--buffer-size', type=parse_size, metavar='SIZE',
+                          help="Read buffer size (e.g. 64K)")
+    checksum.add_argument('--fixity-cache', nargs='?', const=FIXITY_CACHE_PATH, metavar='PATH',
+                          help="For validate, only sample unchanged files verified recently, "
+                               f"using this fixity database (default: {FIXITY_CACHE_PATH})")
+    checksum.add_argument('--max-age-days', type=float, default=FIXITY_MAX_AGE_DAYS,
+                          help=f"Re-read files last verified longer ago (default: {FIXITY_MAX_AGE_DAYS})")
+    checksum.add_argument('--sample-confidence', type=float, default=FIXITY_SAMPLE_CONFIDENCE,
+                          help=f"Confidence the sample is sized for (default: {FIXITY_SAMPLE_CONFIDENCE})")
+    checksum.add_argument('--sample-margin', type=float, default=FIXITY_SAMPLE_MARGIN,
+                          help=f"Margin of error the sample is sized for (default: {FIXITY_SAMPLE_MARGIN})")
+    checksum.set_defaults(run=run_checksum)
+
+    transfer = commands.add_parser('transfer', help="Copy a folder with checksum verification")
+    transfer.add_argument('source', type=existing_folder, help="Source folder")
+    transfer.add_argument('destination', help="Destination folder")
+    transfer.add_argument('--workers', type=int, default=TRANSFER_WORKERS,
+                          help=f"Files copied at the same time (default: {TRANSFER_WORKERS})")
+    transfer.add_argument('--buffer-size', type=parse_size, metavar='SIZE',
+                          help="Copy buffer size (e.g. 16M)")
+    transfer.add_argument('--queue-depth', type=int, default=2,
+                          help="Buffers read ahead of the writer")
+    transfer.add_argument('--copy-mode', choices=['auto', 'buffered'], default='auto',
+                          help="'auto' copies in the kernel where possible")
+    transfer.add_argument('--sync-mode', choices=['journal', 'size_mtime', 'manifest'],
+                          default='journal', help="How files already at the destination are skipped")
+    transfer.set_defaults(run=run_transfer)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    output = JsonLinesOutput(sys.stdout, quiet=args.quiet)
+
+    # SIGINT and SIGTERM cancel cleanly, leaving outputs consistent
+    cancel_token = CancellationToken()
+    def cancel(signum, frame):
+        cancel_token.cancel()
+    signal.signal(signal.SIGINT, cancel)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, cancel)
+
+    try:
+        return args.run(args, output, cancel_token)
+    except OperationCancelled:
+        output.emit('cancelled')
+        return EXIT_CANCELLED
+    except BrokenPipeError:
+        # Whatever was reading stdout has gone (e.g. piped into head)
+        sys.stdout = open(os.devnull, 'w')
+        return EXIT_ERROR
+    except Exception as e:
+        # A Ctrl-C also reaches the scanner's worker processes, which can
+        # break the pool before the cancellation is noticed
+        if cancel_token.is_cancelled:
+            output.emit('cancelled')
+            return EXIT_CANCELLED
+        output.emit('error', message=str(e), type=type(e).__name__)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    # Required for the scanner's worker processes
+    multiprocessing.freeze_support()
+    sys.exit(main())
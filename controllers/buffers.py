@@ -0,0 +1,64 @@
+import threading
+from contextlib import contextmanager
+
+
+class BufferPool:
+    """
+    Reusable bytearrays for read loops, shared between threads
+
+    Reading with readinto into a buffer from the pool, rather than with
+    read(n), avoids allocating (and the kernel zero-filling) a new object per
+    chunk, which with multi-megabyte chunks across millions of files is
+    most of the allocator's work. Released buffers are kept for the next
+    acquire of the same size, up to max_idle_bytes in total.
+    """
+
+    def __init__(self, max_idle_bytes=128 * 1024 * 1024):
+        """
+        Args:
+            max_idle_bytes: Most memory kept in buffers nobody is using;
+                            buffers released beyond this are freed
+        """
+        self.max_idle_bytes = max_idle_bytes
+        self.lock = threading.Lock()
+        self.idle = {}  # size -> list of idle buffers
+        self.idle_bytes = 0
+        self.allocations = 0  # Buffers created, rather than reused
+
+    def acquire(self, size):
+        """Return a bytearray of size bytes; its contents are undefined"""
+        with self.lock:
+            free = self.idle.get(size)
+            if free:
+                self.idle_bytes -= size
+                return free.pop()
+            self.allocations += 1
+        return bytearray(size)
+
+    def release(self, buffer):
+        """Give a buffer from acquire back; it mustn't be used afterwards"""
+        size = len(buffer)
+        with self.lock:
+            if self.idle_bytes + size <= self.max_idle_bytes:
+                self.idle.setdefault(size, []).append(buffer)
+                self.idle_bytes += size
+
+    @contextmanager
+    def buffer(self, size):
+        """Acquire a buffer for the duration of a with block, as a memoryview"""
+        buffer = self.acquire(size)
+        try:
+            with memoryview(buffer) as view:
+                yield view
+        finally:
+            self.release(buffer)
+
+    def clear(self):
+        """Free the idle buffers"""
+        with self.lock:
+            self.idle.clear()
+            self.idle_bytes = 0
+
+
+# Pool shared by the checksum and transfer read loops
+BUFFER_POOL = BufferPool()
@@ -0,0 +1,71 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+class OperationCancelled(Exception):
+    """Raised inside a controller once its CancellationToken has been cancelled"""
+
+
+class CancellationToken:
+    """
+    Lets another thread cancel or pause a long-running controller operation
+
+    Controllers call checkpoint() between files and between buffers. While
+    the token is paused checkpoint() blocks, so the operation stops using
+    the disks without losing its place; once it is cancelled checkpoint()
+    raises OperationCancelled, which unwinds the operation through its
+    normal cleanup.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Wake up anything waiting while paused so it can stop
+        self._running.set()
+
+    def pause(self):
+        if not self._cancelled.is_set():
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    @property
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def is_paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Wait while paused, then raise OperationCancelled if cancelled"""
+        self._running.wait()
+        if self._cancelled.is_set():
+            raise OperationCancelled()
+
+
+@contextmanager
+def atomic_write(path, mode='w', **kwargs):
+    """
+    Open a file for writing so that it only appears once it is complete
+
+    The data goes to a temporary file next to path, which replaces path when
+    the block finishes. If the block raises (a cancelled operation, say) the
+    temporary file is removed and any previous version of path is kept.
+    """
+    temp_path = path + '.partial'
+    f = open(temp_path, mode, **kwargs)
+    try:
+        yield f
+    except BaseException:
+        f.close()
+        os.remove(temp_path)
+        raise
+    f.close()
+    os.replace(temp_path, path)
@@ -0,0 +1,149 @@
+import os
+import json
+import sqlite3
+import datetime
+
+# Bump when the outcomes Scanner stores or the files table change, so older
+# ones are re-extracted
+CATALOG_VERSION = 4
+
+
+class ScanCatalog:
+    """
+    Persistent record of what Scanner found for each file, stored in SQLite
+
+    Each row keeps the file's (size, mtime, inode) signature together with the
+    outcome of processing it, so a rescan only needs to re-extract files whose
+    signature changed. Files not seen by a scan of their root are marked as
+    deleted rather than removed, and come back if they reappear.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.root = None
+        self.scan_id = None
+
+        # Outcomes stored by an older version of the extraction code are discarded
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS files")
+            self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS scans (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                root TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER,
+                outcome TEXT NOT NULL,
+                scan_id INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                deep INTEGER NOT NULL DEFAULT 0,
+                fingerprinted INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self.connection.commit()
+
+    def begin_scan(self, root_folder):
+        """Start recording a scan of root_folder"""
+        self.root = os.path.abspath(root_folder)
+        cursor = self.connection.execute(
+            "INSERT INTO scans (root, started_at) VALUES (?, ?)",
+            (self.root, datetime.datetime.now().isoformat()))
+        self.scan_id = cursor.lastrowid
+
+    def is_unchanged(self, entry, deep_validation=False, fingerprint=False):
+        """
+        Return True if an outcome is stored for an inventory entry and the
+        file is unchanged since
+
+        A hit also marks the file as seen by the current scan. The outcome
+        itself is only loaded by stored_outcome, so a scan can check every
+        file up front without holding all their outcomes in memory.
+
+        Args:
+            entry: The file's inventory FileEntry
+            deep_validation: Only accept an outcome stored by a scan that
+                             also verified the pixel data
+            fingerprint: Only accept an outcome stored by a scan that also
+                         fingerprinted the pixels
+        """
+        if entry.error is not None:
+            return False
+
+        path = os.path.abspath(entry.path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, inode, deep, fingerprinted FROM files WHERE path = ? AND deleted = 0",
+            (path,)).fetchone()
+
+        if row is None or tuple(row[:3]) != entry.signature():
+            return False
+        if (deep_validation and not row[3]) or (fingerprint and not row[4]):
+            return False
+
+        self.connection.execute("UPDATE files SET scan_id = ? WHERE path = ?",
+                                (self.scan_id, path))
+        return True
+
+    def stored_outcome(self, entry):
+        """Return the stored outcome for an entry is_unchanged accepted"""
+        row = self.connection.execute("SELECT outcome FROM files WHERE path = ?",
+                                      (os.path.abspath(entry.path),)).fetchone()
+        return tuple(json.loads(row[0]))
+
+    def store(self, entry, outcome, deep_validation=False, fingerprint=False):
+        """
+        Record the outcome of processing an inventory entry
+
+        Args:
+            entry: The file's inventory FileEntry
+            outcome: scan_file outcome
+            deep_validation: True if the outcome includes the pixel validation
+            fingerprint: True if the outcome includes the pixel fingerprint
+        """
+        # Files that couldn't be stat'ed are retried on every scan
+        if entry.error is not None:
+            return
+
+        self.connection.execute(
+            "INSERT OR REPLACE INTO files "
+            "(path, size, mtime_ns, inode, outcome, scan_id, deleted, deep, fingerprinted) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)",
+            (os.path.abspath(entry.path), entry.size, entry.mtime_ns, entry.inode,
+             json.dumps(outcome, default=str), self.scan_id, int(deep_validation), int(fingerprint)))
+
+    def finish_scan(self):
+        """
+        Mark files under the scanned root that weren't seen as deleted
+
+        Returns:
+            List of paths that disappeared since the previous scan
+        """
+        # Anything under the root (including nested roots scanned before)
+        prefix = os.path.join(self.root, '')
+        under_root = "substr(path, 1, ?) = ? AND scan_id != ? AND deleted = 0"
+        params = (len(prefix), prefix, self.scan_id)
+
+        deleted = [row[0] for row in self.connection.execute(
+            f"SELECT path FROM files WHERE {under_root} ORDER BY path", params)]
+
+        self.connection.execute(f"UPDATE files SET deleted = 1 WHERE {under_root}", params)
+        self.connection.execute("UPDATE scans SET finished_at = ? WHERE id = ?",
+                                (datetime.datetime.now().isoformat(), self.scan_id))
+        self.connection.commit()
+
+        return deleted
+
+    def commit(self):
+        """Save the outcomes stored so far without finishing the scan"""
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
@@ -1,36 +1,90 @@
 import os
+import time
+import random
 import hashlib
 import csv
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.cancellation import atomic_write
+from controllers.fixity import FixityCache, sample_size
+from controllers.hashing import FileHasher
+from controllers.inventory import FileInventory
+from controllers.parallel import DevicePool, ordered_map, unordered_map
+
+# Algorithms that can be generated, each written to checksums_<algorithm>.txt
+CHECKSUM_ALGORITHMS = ('md5', 'sha1', 'sha256', 'sha512', 'blake2b')
 
 class ChecksumGenerator:
-    def __init__(self):
-        self.buffer_size = 65536  # 64KB buffer for reading files
+    def __init__(self, workers=1, max_inflight_bytes=256 * 1024 * 1024, rotational_workers=1,
+                 cancel_token=None, fixity_cache_path=None, fixity_max_age_days=90,
+                 fixity_confidence=0.95, fixity_margin=0.05):
+        """
+        Args:
+            workers: Number of threads hashing files at once. hashlib releases
+                     the GIL, so this scales with the storage, not the CPU.
+            max_inflight_bytes: Limit on the total size of files being hashed
+                                ahead of the one currently being reported
+            rotational_workers: Threads per spinning disk when validating
+            cancel_token: Optional CancellationToken checked between buffers.
+                          Cancelling raises OperationCancelled; checksum files
+                          already written are complete, others are untouched.
+            fixity_cache_path: Optional SQLite FixityCache file. When given,
+                               validation only reads files that changed or
+                               weren't verified in the last fixity_max_age_days,
+                               plus a random sample of the rest sized for
+                               fixity_confidence and fixity_margin.
+        """
+        self.buffer_size = None  # Read buffer size; None picks one per filesystem
+        self.file_hasher = FileHasher()
+        self.workers = workers
+        self.max_inflight_bytes = max_inflight_bytes
+        self.rotational_workers = rotational_workers
+        self.cancel_token = cancel_token
+        self.fixity_cache_path = fixity_cache_path
+        self.fixity_max_age_days = fixity_max_age_days
+        self.fixity_confidence = fixity_confidence
+        self.fixity_margin = fixity_margin
     
     def generate_checksums(self, folder_path, algorithm="sha256", format_type="per_folder",
-                          progress_callback=None, status_callback=None):
+                          progress_callback=None, status_callback=None, count_callback=None):
         """
         Generate checksums for all files in a folder
         
+        Several algorithms can be given at once; every file is then read only
+        once and each algorithm gets its own checksums_<algorithm>.txt files.
+        
         Args:
             folder_path: Path to process
-            algorithm: Hash algorithm to use (sha256)
+            algorithm: Hash algorithm to use (one of CHECKSUM_ALGORITHMS), or
+                       a list of them
             format_type: 'per_folder' or 'consolidated'
             progress_callback: Function to call with progress updates (0-100)
             status_callback: Function to call with status messages
+            count_callback: Function to call with (files, bytes) hashed
             
         Returns:
-            Dictionary with results
+            Dictionary with results. 'checksums' maps each file to its
+            checksum, or to a dict of {algorithm: checksum} when a list of
+            algorithms was given.
         """
+        if isinstance(algorithm, str):
+            algorithms = [algorithm]
+        else:
+            algorithms = list(dict.fromkeys(algorithm))
+        for name in algorithms:
+            if name not in CHECKSUM_ALGORITHMS:
+                raise ValueError(f"Unsupported checksum algorithm: {name}")
+        manifest_names = {f"checksums_{name}.txt" for name in algorithms}
+        
         results = {
             'checksums': {},
             'output_files': []
         }
         
-        # Count total files for progress
-        total_files = 0
-        for root, _, files in os.walk(folder_path):
-            total_files += len(files)
+        # List the folder once; the inventory also gives the total for progress
+        inventory = FileInventory(folder_path, self.cancel_token)
+        total_files = len(inventory)
         
         if total_files == 0:
             if status_callback:
@@ -40,66 +94,80 @@ class ChecksumGenerator:
         # Track processed files for progress
         processed_files = 0
         
+        # Work out up front which files get hashed, so they can be hashed
+        # ahead of the loops below while results still arrive in walk order
+        if format_type == "consolidated":
+            to_hash = [entry for entry in inventory.files()
+                       if os.path.relpath(entry.path, folder_path) not in manifest_names]
+        else:
+            to_hash = [entry for entry in inventory.files()
+                       if entry.name not in manifest_names]
+        checksums = self._iter_checksums(to_hash, algorithms, count_callback)
+        
         # Process files based on format type
         if format_type == "consolidated":
-            # Single output file
-            output_file = os.path.join(folder_path, f"checksums_{algorithm}.txt")
+            # Single output file per algorithm
             consolidated_checksums = []
             
-            for root, _, files in os.walk(folder_path):
-                for filename in files:
-                    file_path = os.path.join(root, filename)
+            for root, files in inventory.walk():
+                for entry in files:
+                    file_path = entry.path
                     rel_path = os.path.relpath(file_path, folder_path)
                     
-                    # Skip the checksum file itself if it exists
-                    if rel_path == f"checksums_{algorithm}.txt":
+                    # Skip the checksum files themselves if they exist
+                    if rel_path in manifest_names:
                         continue
                     
                     if status_callback:
                         status_callback(f"Processing: {rel_path}")
                     
-                    # Generate checksum
-                    checksum = self._calculate_checksum(file_path, algorithm)
+                    # Generate checksums
+                    digests = next(checksums)
                     
                     # Store in results dictionary
-                    results['checksums'][rel_path] = checksum
+                    results['checksums'][rel_path] = self._result_checksum(algorithm, digests)
                     
                     # Add to consolidated list
-                    consolidated_checksums.append((checksum, rel_path))
+                    consolidated_checksums.append((digests, rel_path))
                     
                     # Update progress
                     processed_files += 1
+                    if count_callback:
+                        count_callback(1, 0)
                     if progress_callback:
                         progress_value = int((processed_files / total_files) * 100)
                         progress_callback(progress_value)
             
-            # Write consolidated checksums file
-            with open(output_file, 'w') as f:
-                for checksum, rel_path in consolidated_checksums:
-                    f.write(f"{checksum} *{rel_path}\n")
-            
-            results['output_files'].append(output_file)
+            # Write consolidated checksums files
+            for name in algorithms:
+                output_file = os.path.join(folder_path, f"checksums_{name}.txt")
+                with atomic_write(output_file) as f:
+                    for digests, rel_path in consolidated_checksums:
+                        f.write(f"{digests[name]} *{rel_path}\n")
+                
+                results['output_files'].append(output_file)
             
         else:  # per_folder
             # Generate checksum file per folder
-            for root, _, files in os.walk(folder_path):
-                if not files:
+            for root, entries in inventory.walk():
+                if not entries:
                     continue
                 
+                files = [entry.name for entry in entries]
+                
                 # Create relative path for the current folder
                 rel_root = os.path.relpath(root, folder_path)
                 
-                # Skip if this is just the output file from a previous run
-                if len(files) == 1 and files[0] == f"checksums_{algorithm}.txt":
+                # Skip if these are just the output files from a previous run
+                if all(filename in manifest_names for filename in files):
                     continue
                 
-                # Prepare checksum file for this folder
-                checksum_file = os.path.join(root, f"checksums_{algorithm}.txt")
+                # Prepare checksum files for this folder
                 folder_checksums = []
                 
                 for filename in files:
-                    # Skip the checksum file itself if it exists
-                    if filename == f"checksums_{algorithm}.txt":
+                    # Skip the checksum files themselves if they exist
+                    if filename in manifest_names:
                         continue
                     
                     file_path = os.path.join(root, filename)
@@ -107,45 +175,60 @@ class ChecksumGenerator:
                     if status_callback:
                         status_callback(f"Processing: {os.path.join(rel_root, filename)}")
                     
-                    # Generate checksum
-                    checksum = self._calculate_checksum(file_path, algorithm)
+                    # Generate checksums
+                    digests = next(checksums)
                     
                     # Store in results dictionary
                     rel_path = os.path.join(rel_root, filename)
                     if rel_root == '.':
                         rel_path = filename
-                    results['checksums'][rel_path] = checksum
+                    results['checksums'][rel_path] = self._result_checksum(algorithm, digests)
                     
                     # Add to folder checksums
-                    folder_checksums.append((checksum, filename))
+                    folder_checksums.append((digests, filename))
                     
                     # Update progress
                     processed_files += 1
+                    if count_callback:
+                        count_callback(1, 0)
                     if progress_callback:
                         progress_value = int((processed_files / total_files) * 100)
                         progress_callback(progress_value)
                 
-                # Write checksum file for this folder
+                # Write checksum files for this folder
                 if folder_checksums:
-                    with open(checksum_file, 'w') as f:
-                        for checksum, filename in folder_checksums:
-                            f.write(f"{checksum} *{filename}\n")
-                    
-                    results['output_files'].append(checksum_file)
+                    for name in algorithms:
+                        checksum_file = os.path.join(root, f"checksums_{name}.txt")
+                        with atomic_write(checksum_file) as f:
+                            for digests, filename in folder_checksums:
+                                f.write(f"{digests[name]} *{filename}\n")
+                        
+                        results['output_files'].append(checksum_file)
         
         if status_callback:
             status_callback(f"Checksums generated for {len(results['checksums'])} files.")
         
         return results
     
-    def validate_checksums(self, folder_path, progress_callback=None, status_callback=None):
+    def validate_checksums(self, folder_path, progress_callback=None, status_callback=None,
+                           count_callback=None):
         """
         Validate checksums for files in a folder
         
+        The algorithm of each checksum file is taken from its name
+        (checksums_<algorithm>.txt), falling back to the checksum length.
+        A file listed in several checksum files is read once and checked
+        against all of them.
+        
+        With a fixity cache, unchanged files verified recently are trusted
+        unless they fall in the random sample; they are listed in
+        'skipped_files' and the sampled ones in 'sampled_files'.
+        
         Args:
             folder_path: Path to process
             progress_callback: Function to call with progress updates (0-100)
             status_callback: Function to call with status messages
+            count_callback: Function to call with (files, bytes) hashed
             
         Returns:
             Dictionary with validation results
@@ -155,28 +238,31 @@ class ChecksumGenerator:
             'valid_files': 0,
             'invalid_files': [],
             'missing_checksums': [],
-            'missing_files': []
+            'missing_files': [],
+            'sampled_files': [],
+            'skipped_files': []
         }
         
-        # Find checksum files
+        # Find checksum files, listing the folder once so existence checks
+        # below can use the inventory instead of a stat per file
+        inventory = FileInventory(folder_path, self.cancel_token)
         checksum_files = []
-        for root, _, files in os.walk(folder_path):
-            for filename in files:
-                if filename.startswith('checksums_') and filename.endswith('.txt'):
-                    checksum_files.append(os.path.join(root, filename))
+        for entry in inventory.files():
+            if entry.name.startswith('checksums_') and entry.name.endswith('.txt'):
+                checksum_files.append(entry.path)
         
         if not checksum_files:
             if status_callback:
                 status_callback("No checksum files found")
             return results
         
-        # Track total files to validate
-        total_to_validate = 0
-        expected_checksums = {}  # Map of file path to expected checksum
+        # Map of file path to {algorithm: expected checksum}
+        expected_checksums = {}
         
         # Read all checksum files first
         for checksum_file in checksum_files:
             checksum_dir = os.path.dirname(checksum_file)
+            file_algorithm = os.path.basename(checksum_file)[len('checksums_'):-len('.txt')]
             
             with open(checksum_file, 'r') as f:
                 for line in f:
@@ -200,9 +286,13 @@ class ChecksumGenerator:
                         file_path = os.path.join(checksum_dir, filename)
                     
                     # Track this file for validation
-                    expected_checksums[file_path] = checksum
-                    total_to_validate += 1
+                    if file_algorithm in CHECKSUM_ALGORITHMS:
+                        algorithm = file_algorithm
+                    else:
+                        algorithm = self._algorithm_for_checksum(checksum)
+                    expected_checksums.setdefault(file_path, {})[algorithm] = checksum
         
+        total_to_validate = len(expected_checksums)
         results['total_files'] = total_to_validate
         
         if total_to_validate == 0:
@@ -210,48 +300,58 @@ class ChecksumGenerator:
                 status_callback("No files to validate in checksum files")
             return results
         
-        # Validate each file
-        processed_files = 0
+        # With a fixity cache, unchanged files verified recently are only
+        # read if they fall in the random sample
+        fixity_cache = None
+        signatures = {}
+        if self.fixity_cache_path:
+            fixity_cache = FixityCache(self.fixity_cache_path)
+            expected_checksums = self._plan_fixity(expected_checksums, inventory, fixity_cache,
+                                                   signatures, results)
         
-        for file_path, expected_checksum in expected_checksums.items():
-            if not os.path.exists(file_path):
-                results['missing_files'].append(file_path)
-                processed_files += 1
-                continue
-            
-            if status_callback:
-                rel_path = os.path.relpath(file_path, folder_path)
-                status_callback(f"Validating: {rel_path}")
-            
-            # Calculate actual checksum
-            # Determine algorithm from checksum length
-            if len(expected_checksum) == 64:  # SHA-256
-                algorithm = 'sha256'
-            elif len(expected_checksum) == 40:  # SHA-1
-                algorithm = 'sha1'
-            elif len(expected_checksum) == 32:  # MD5
-                algorithm = 'md5'
+        try:
+            # Validate each file
+            if self.workers > 1:
+                self._validate_in_parallel(expected_checksums, inventory, folder_path, results,
+                                           progress_callback, status_callback, count_callback,
+                                           fixity_cache, signatures)
             else:
-                algorithm = 'sha256'  # Default to SHA-256
-            
-            actual_checksum = self._calculate_checksum(file_path, algorithm)
-            
-            # Compare checksums
-            if actual_checksum.lower() == expected_checksum.lower():
-                results['valid_files'] += 1
-            else:
-                rel_path = os.path.relpath(file_path, folder_path)
-                results['invalid_files'].append({
-                    'path': rel_path,
-                    'expected': expected_checksum,
-                    'actual': actual_checksum
-                })
-            
-            # Update progress
-            processed_files += 1
-            if progress_callback:
-                progress_value = int((processed_files / total_to_validate) * 100)
-                progress_callback(progress_value)
+                processed_files = 0
+                
+                for file_path, expected in expected_checksums.items():
+                    entry = inventory.get(file_path)
+                    if (entry is None or entry.error is not None) and not os.path.exists(file_path):
+                        results['missing_files'].append(file_path)
+                        processed_files += 1
+                        continue
+                    
+                    if status_callback:
+                        rel_path = os.path.relpath(file_path, folder_path)
+                        status_callback(f"Validating: {rel_path}")
+                    
+                    # Calculate actual checksums in one read
+                    actual = self._calculate_checksums(file_path, list(expected), count_callback)
+                    
+                    # Compare checksums
+                    invalid = self._compare_checksums(folder_path, file_path, expected, actual)
+                    if invalid is None:
+                        results['valid_files'] += 1
+                    else:
+                        results['invalid_files'].append(invalid)
+                    self._record_fixity(fixity_cache, signatures, file_path, expected, invalid)
+                    
+                    # Update progress
+                    processed_files += 1
+                    if count_callback:
+                        count_callback(1, 0)
+                    if progress_callback:
+                        progress_value = int((processed_files / len(expected_checksums)) * 100)
+                        progress_callback(progress_value)
+        finally:
+            # Verifications made so far are kept, even if cancelled
+            if fixity_cache:
+                fixity_cache.commit()
+                fixity_cache.close()
         
         # Final status update
         if status_callback:
@@ -260,25 +360,205 @@ class ChecksumGenerator:
             missing_count = len(results['missing_files'])
             
             status_message = f"Validation complete: {valid_count} valid, {invalid_count} invalid, {missing_count} missing"
+            if self.fixity_cache_path:
+                status_message += (f", {len(results['skipped_files'])} skipped (unchanged and verified "
+                                   f"in the last {self.fixity_max_age_days} days)")
             status_callback(status_message)
         
         return results
     
-    def _calculate_checksum(self, file_path, algorithm='sha256'):
-        """Calculate checksum for a file"""
-        if algorithm == 'sha256':
-            hasher = hashlib.sha256()
-        elif algorithm == 'sha1':
-            hasher = hashlib.sha1()
-        elif algorithm == 'md5':
-            hasher = hashlib.md5()
+    def _validate_in_parallel(self, expected_checksums, inventory, folder_path, results,
+                              progress_callback=None, status_callback=None, count_callback=None,
+                              fixity_cache=None, signatures=None):
+        """
+        Verify files on per-device thread pools
+        
+        Each storage device (st_dev) gets its own pool, limited to
+        rotational_workers threads for spinning disks so their heads aren't
+        thrashed, and to workers threads otherwise. Files are reported as they
+        finish; invalid files are put back in manifest order at the end.
+        """
+        total_to_validate = len(expected_checksums)
+        processed_files = 0
+        
+        # Split off missing files, noting the device of everything else
+        jobs = []
+        for index, (file_path, expected) in enumerate(expected_checksums.items()):
+            entry = inventory.get(file_path)
+            if entry is not None and entry.error is None:
+                device = entry.device
+            else:
+                try:
+                    device = os.stat(file_path).st_dev
+                except OSError:
+                    results['missing_files'].append(file_path)
+                    processed_files += 1
+                    continue
+            jobs.append((index, file_path, expected, device))
+        
+        def verify(job):
+            _, file_path, expected, _ = job
+            return self._calculate_checksums(file_path, list(expected), count_callback)
+        
+        invalid_files = []
+        with DevicePool(self.workers, device_of=lambda job: job[3],
+                        rotational_workers=self.rotational_workers) as pool:
+            for job, actual in unordered_map(pool, verify, jobs, max_pending=self.workers * 4):
+                index, file_path, expected, _ = job
+                
+                if status_callback:
+                    rel_path = os.path.relpath(file_path, folder_path)
+                    status_callback(f"Validating: {rel_path}")
+                
+                invalid = self._compare_checksums(folder_path, file_path, expected, actual)
+                if invalid is None:
+                    results['valid_files'] += 1
+                else:
+                    invalid_files.append((index, invalid))
+                self._record_fixity(fixity_cache, signatures, file_path, expected, invalid)
+                
+                # Update progress
+                processed_files += 1
+                if count_callback:
+                    count_callback(1, 0)
+                if progress_callback:
+                    progress_value = int((processed_files / total_to_validate) * 100)
+                    progress_callback(progress_value)
+        
+        invalid_files.sort(key=lambda item: item[0])
+        results['invalid_files'].extend(invalid for _, invalid in invalid_files)
+    
+    def _plan_fixity(self, expected_checksums, inventory, fixity_cache, signatures, results):
+        """
+        Choose the files to read when validating with a fixity cache
+        
+        Files that changed, were never verified, or were last verified more
+        than fixity_max_age_days ago are all read. Of the others, a random
+        sample sized by sample_size() is read (results['sampled_files']) and
+        the rest are trusted (results['skipped_files']). The signature of
+        every file is put in signatures, to be recorded once it is verified.
+        
+        Returns:
+            The expected_checksums of the files to read, in the same order
+        """
+        verified_since = time.time() - self.fixity_max_age_days * 24 * 60 * 60
+        current = []
+        for file_path, expected in expected_checksums.items():
+            signature = self._signature(inventory, file_path)
+            signatures[file_path] = signature
+            if signature is not None and fixity_cache.is_current(file_path, signature, expected,
+                                                                 verified_since):
+                current.append(file_path)
+        
+        sampled = set(random.sample(current, sample_size(len(current), self.fixity_confidence,
+                                                         self.fixity_margin)))
+        results['sampled_files'] = [file_path for file_path in current if file_path in sampled]
+        results['skipped_files'] = [file_path for file_path in current if file_path not in sampled]
+        
+        skipped = set(results['skipped_files'])
+        return {file_path: expected for file_path, expected in expected_checksums.items()
+                if file_path not in skipped}
+    
+    def _signature(self, inventory, file_path):
+        """Return a file's (size, mtime_ns, inode), or None if it can't be stat'ed"""
+        entry = inventory.get(file_path)
+        if entry is not None and entry.error is None:
+            return entry.signature()
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    
+    def _record_fixity(self, fixity_cache, signatures, file_path, expected, invalid):
+        """Record a verified file in the fixity cache, or forget one that failed"""
+        if fixity_cache is None or signatures.get(file_path) is None:
+            return
+        if invalid is None:
+            fixity_cache.record(file_path, signatures[file_path], expected)
         else:
-            hasher = hashlib.sha256()  # Default to SHA-256
+            fixity_cache.forget(file_path)
+    
+    def _algorithm_for_checksum(self, expected_checksum):
+        """Determine algorithm from checksum length"""
+        if len(expected_checksum) == 64:  # SHA-256
+            return 'sha256'
+        elif len(expected_checksum) == 40:  # SHA-1
+            return 'sha1'
+        elif len(expected_checksum) == 32:  # MD5
+            return 'md5'
+        elif len(expected_checksum) == 128:  # SHA-512 (BLAKE2b is only known by file name)
+            return 'sha512'
+        return 'sha256'  # Default to SHA-256
+    
+    def _result_checksum(self, algorithm, digests):
+        """The value stored in results['checksums'] for the algorithm argument given"""
+        if isinstance(algorithm, str):
+            return digests[algorithm]
+        return digests
+    
+    def _compare_checksums(self, folder_path, file_path, expected, actual):
+        """
+        Return None if all checksums match, otherwise the invalid file record
+        
+        Args:
+            expected: Dict of {algorithm: expected checksum}
+            actual: Dict of {algorithm: calculated checksum}
+        """
+        for algorithm, expected_checksum in expected.items():
+            if actual[algorithm].lower() == expected_checksum.lower():
+                continue
+            
+            rel_path = os.path.relpath(file_path, folder_path)
+            return {
+                'path': rel_path,
+                'algorithm': algorithm,
+                'expected': expected_checksum,
+                'actual': actual[algorithm]
+            }
+        return None
+    
+    def _iter_checksums(self, entries, algorithms, count_callback=None):
+        """Yield a dict of {algorithm: checksum} for each inventory entry, in order"""
+        if self.workers <= 1:
+            for entry in entries:
+                yield self._calculate_checksums(entry.path, algorithms, count_callback)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from ordered_map(executor,
+                                   lambda entry: self._calculate_checksums(entry.path, algorithms,
+                                                                           count_callback),
+                                   entries,
+                                   size_of=lambda entry: entry.size or 0,
+                                   max_inflight_bytes=self.max_inflight_bytes,
+                                   max_pending=self.workers * 4)
+    
+    def _calculate_checksum(self, file_path, algorithm='sha256', count_callback=None):
+        """Calculate checksum for a file, passing the bytes read to count_callback"""
+        return self._calculate_checksums(file_path, [algorithm], count_callback)[algorithm]
+    
+    def _calculate_checksums(self, file_path, algorithms, count_callback=None):
+        """
+        Calculate several checksums for a file from a single read
+        
+        Each buffer is fed to every hasher before the next one is read;
+        FileHasher picks how the file is read (mmap, readinto or
+        hashlib.file_digest) from its size and filesystem.
+        
+        Returns:
+            Dict of {algorithm: checksum}
+        """
+        hashers = {}
+        for algorithm in algorithms:
+            if algorithm in CHECKSUM_ALGORITHMS:
+                hashers[algorithm] = hashlib.new(algorithm)
+            else:
+                hashers[algorithm] = hashlib.sha256()  # Default to SHA-256
         
-        with open(file_path, 'rb') as f:
-            buffer = f.read(self.buffer_size)
-            while len(buffer) > 0:
-                hasher.update(buffer)
-                buffer = f.read(self.buffer_size)
+        # Stop between buffers if the operation is paused or cancelled
+        checkpoint = self.cancel_token.checkpoint if self.cancel_token else None
+        self.file_hasher.hash(file_path, list(hashers.values()), count_callback, checkpoint,
+                              buffer_size=self.buffer_size)
         
-        return hasher.hexdigest()
\ No newline at end of file
+        return {algorithm: hasher.hexdigest() for algorithm, hasher in hashers.items()}
\ No newline at end of file
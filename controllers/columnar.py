@@ -0,0 +1,133 @@
+import os
+import importlib.util
+
+# pandas and pyarrow are only imported once a columnar report is written;
+# pyarrow is optional and only needed for these exports
+
+# Column file formats and their file extensions
+COLUMNAR_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather'
+}
+
+# Report column kinds -> (pandas dtype, pyarrow type name)
+COLUMN_KINDS = {
+    'string': ('string', 'string'),
+    'int': ('Int64', 'int64'),
+    'float': ('Float64', 'float64'),
+    'bool': ('boolean', 'bool_')
+}
+
+
+def is_available():
+    """Return True if the columnar formats can be written, without importing pyarrow"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+class ColumnarReportWriter:
+    """
+    Write report rows to a Parquet or Feather file with typed columns
+
+    Used like csv.DictWriter, with the same row dicts. Rows are collected
+    into batches, typed through pandas (empty strings become nulls and
+    Yes/No flags become booleans) and appended to a zstd-compressed file,
+    so memory use doesn't grow with the number of rows.
+
+    The file is written under a temporary name and only replaces path once
+    it is closed. Leaving a with block through an exception discards it.
+    """
+
+    def __init__(self, path, columns, file_format='parquet', batch_size=65536):
+        """
+        Args:
+            path: File to write
+            columns: Dict of column name -> 'string', 'int', 'float' or 'bool'
+            file_format: 'parquet' or 'feather'
+            batch_size: Rows typed and written at a time
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet and Feather reports") from None
+        if file_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format: {file_format}")
+
+        self.path = path
+        self.temp_path = path + '.partial'
+        self.columns = columns
+        self.batch_size = batch_size
+        self.rows = []
+
+        self.schema = pa.schema([(name, getattr(pa, COLUMN_KINDS[kind][1])())
+                                 for name, kind in columns.items()])
+
+        if file_format == 'parquet':
+            self.writer = pq.ParquetWriter(self.temp_path, self.schema, compression='zstd')
+        else:
+            # Feather V2 is the Arrow IPC file format
+            options = pa.ipc.IpcWriteOptions(compression='zstd')
+            self.writer = pa.ipc.new_file(self.temp_path, self.schema, options=options)
+
+    def writerow(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self._write_batch()
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        self._write_batch()
+        self.writer.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        """Abandon the file, keeping any previous version of path"""
+        self.rows = []
+        self.writer.close()
+        os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def _write_batch(self):
+        if not self.rows:
+            return
+
+        import pandas as pd
+        import pyarrow as pa
+
+        frame = pd.DataFrame.from_records(self.rows, columns=list(self.columns))
+        self.rows = []
+
+        for name, kind in self.columns.items():
+            frame[name] = self._typed_column(frame[name], kind)
+
+        table = pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def _typed_column(self, column, kind):
+        """Convert a column of CSV row values to its pandas dtype"""
+        import pandas as pd
+
+        dtype = COLUMN_KINDS[kind][0]
+
+        if kind == 'string':
+            return column.where(column != '', None).astype(dtype)
+        if kind == 'bool':
+            return column.map({'Yes': True, 'No': False}).astype(dtype)
+
+        # Numbers - blanks, 'Unknown' and the like become nulls
+        column = pd.to_numeric(column, errors='coerce')
+        if kind == 'int':
+            column = column.round()
+        return column.astype(dtype)
@@ -0,0 +1,78 @@
+import sqlite3
+from itertools import groupby
+
+
+class DuplicateIndex:
+    """
+    Pixel fingerprints of the TIFFs seen by a scan, grouped into duplicates
+
+    Records are added as a scan streams them and kept in a temporary SQLite
+    database on disk (deleted when the index is closed), so finding the
+    groups doesn't need every fingerprint of a large collection in memory.
+    Can be used as a context manager.
+    """
+
+    def __init__(self):
+        # An empty name opens a private temporary database
+        self.connection = sqlite3.connect('')
+        self.connection.execute("""
+            CREATE TABLE images (
+                fingerprint TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER,
+                compression TEXT,
+                width INTEGER,
+                height INTEGER
+            )
+        """)
+        self.indexed = False
+
+    def add(self, record):
+        """Add a TIFF metadata record; records without a pixel_fingerprint are ignored"""
+        fingerprint = record.get('pixel_fingerprint')
+        if not fingerprint:
+            return
+
+        self.connection.execute(
+            "INSERT INTO images (fingerprint, path, size, compression, width, height) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (fingerprint, record['rel_path'], record.get('size'), record.get('compression'),
+             record.get('width'), record.get('height')))
+
+    def counts(self):
+        """Return (groups, files): the number of duplicate groups and the files in them"""
+        self._index()
+        groups, files = self.connection.execute(
+            "SELECT COUNT(*), SUM(copies) FROM "
+            "(SELECT COUNT(*) AS copies FROM images GROUP BY fingerprint HAVING copies > 1)").fetchone()
+        return groups, files or 0
+
+    def groups(self):
+        """
+        Yield (fingerprint, images) for every fingerprint shared by more than
+        one file, where images is a list of (path, size, compression, width,
+        height) tuples ordered by path
+        """
+        self._index()
+        rows = self.connection.execute(
+            "SELECT fingerprint, path, size, compression, width, height FROM images "
+            "WHERE fingerprint IN "
+            "(SELECT fingerprint FROM images GROUP BY fingerprint HAVING COUNT(*) > 1) "
+            "ORDER BY fingerprint, path")
+        for fingerprint, group in groupby(rows, key=lambda row: row[0]):
+            yield fingerprint, [row[1:] for row in group]
+
+    def _index(self):
+        # Built once all records are in, which is faster than keeping it up to date
+        if not self.indexed:
+            self.connection.execute("CREATE INDEX images_fingerprint ON images (fingerprint)")
+            self.indexed = True
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,106 @@
+import os
+import math
+import time
+import sqlite3
+from statistics import NormalDist
+
+
+class FixityCache:
+    """
+    Persistent record of when each file's checksums were last verified, stored in SQLite
+
+    Each row keeps a file's (size, mtime, inode) signature at the time it
+    was verified against a checksum, so validation can tell which files have
+    not changed since and were verified recently enough to be trusted
+    without reading them again.
+    """
+
+    def __init__(self, db_path):
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS fixity (
+                path TEXT NOT NULL,
+                algorithm TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                inode INTEGER,
+                verified_at REAL NOT NULL,
+                PRIMARY KEY (path, algorithm)
+            );
+        """)
+        self.connection.commit()
+
+    def is_current(self, path, signature, expected, verified_since):
+        """
+        Return True if the file was verified against every expected checksum
+        since verified_since and its signature hasn't changed
+
+        Args:
+            path: Path of the file
+            signature: The file's current (size, mtime_ns, inode)
+            expected: Dict of {algorithm: expected checksum}
+            verified_since: Oldest verification time (seconds since the epoch) to trust
+        """
+        rows = self.connection.execute(
+            "SELECT algorithm, checksum, size, mtime_ns, inode, verified_at FROM fixity WHERE path = ?",
+            (os.path.abspath(path),)).fetchall()
+        verified = {row[0]: row[1:] for row in rows}
+
+        for algorithm, checksum in expected.items():
+            row = verified.get(algorithm)
+            if row is None or row[0] != checksum.lower():
+                return False
+            if tuple(row[1:4]) != tuple(signature) or row[4] < verified_since:
+                return False
+        return True
+
+    def record(self, path, signature, checksums, verified_at=None):
+        """
+        Record that a file with signature matched checksums
+
+        Args:
+            checksums: Dict of {algorithm: checksum} that were verified
+            verified_at: Time of the verification (defaults to now)
+        """
+        if verified_at is None:
+            verified_at = time.time()
+        path = os.path.abspath(path)
+        size, mtime_ns, inode = signature
+
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO fixity (path, algorithm, checksum, size, mtime_ns, inode, verified_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, algorithm, checksum.lower(), size, mtime_ns, inode, verified_at)
+             for algorithm, checksum in checksums.items()])
+
+    def forget(self, path):
+        """Drop a file's verifications, e.g. after it failed one"""
+        self.connection.execute("DELETE FROM fixity WHERE path = ?", (os.path.abspath(path),))
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def sample_size(population, confidence=0.95, margin=0.05):
+    """
+    Number of files to check at random so the failure rate found is within
+    margin of the true rate, with the given confidence
+
+    Uses Cochran's formula for a proportion (assuming the worst case, 50%)
+    with the finite population correction, e.g. 370 of 10,000 files at 95%
+    confidence and a 5% margin.
+    """
+    if population <= 0:
+        return 0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    n0 = z * z * 0.25 / (margin * margin)
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / population)))
@@ -0,0 +1,204 @@
+import os
+import mmap
+import hashlib
+
+from controllers.buffers import BUFFER_POOL
+
+# Files at least this large are memory-mapped, on local filesystems
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# Files smaller than this are handed to hashlib.file_digest when only one
+# algorithm is needed. Off by default: file_digest allocates a new 256KB
+# buffer per call, which benchmarks/bench_hashing.py measured as slower than
+# readinto into a reused buffer for every file size
+FILE_DIGEST_THRESHOLD = 0
+
+# readinto buffer sizes; network filesystems get fewer, larger requests
+LOCAL_BUFFER_SIZE = 1024 * 1024
+NETWORK_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Bytes of a mapped file hashed between progress updates and cancellation checks
+MMAP_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Filesystem types (from /proc/self/mountinfo) whose files are read over the
+# network. These are never memory-mapped: a dropped connection or a file
+# truncated elsewhere would crash the process with SIGBUS. FUSE filesystems
+# are treated the same way.
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', 'ceph', 'glusterfs',
+                       'lustre', 'gpfs', 'beegfs', '9p', 'davfs'}
+
+STRATEGIES = ('file_digest', 'readinto', 'mmap')
+
+
+class FileHasher:
+    """
+    Feeds files to hashlib objects, reading each with the strategy that suits it
+
+    'mmap' maps large files on local filesystems and hashes the mapping in
+    place, without copying it into Python. 'file_digest' hands files below
+    file_digest_threshold to hashlib.file_digest. Everything else is read
+    with 'readinto' into a buffer from a BufferPool. Reads are hinted as
+    sequential (posix_fadvise / madvise) where the platform supports it.
+    """
+
+    def __init__(self, mmap_threshold=MMAP_THRESHOLD, file_digest_threshold=FILE_DIGEST_THRESHOLD,
+                 buffer_pool=BUFFER_POOL):
+        """
+        Args:
+            mmap_threshold: Smallest file that is memory-mapped
+            file_digest_threshold: Files below this use hashlib.file_digest
+                                   when a single hash is calculated
+            buffer_pool: BufferPool the readinto buffers come from
+        """
+        self.mmap_threshold = mmap_threshold
+        self.file_digest_threshold = file_digest_threshold
+        self.buffer_pool = buffer_pool
+
+    def choose(self, size, filesystem, hasher_count=1):
+        """
+        Return the strategy for a file
+
+        Args:
+            size: File size in bytes
+            filesystem: Filesystem type, as returned by filesystem_type()
+            hasher_count: Number of hashes calculated from the one read
+        """
+        if hasher_count == 1 and size < self.file_digest_threshold and _HAS_FILE_DIGEST:
+            return 'file_digest'
+        if size >= self.mmap_threshold and is_local_filesystem(filesystem):
+            return 'mmap'
+        return 'readinto'
+
+    def hash(self, file_path, hashers, count_callback=None, checkpoint=None, drop_cache=False,
+             buffer_size=None, strategy=None):
+        """
+        Update every hash object in hashers with the contents of a file
+
+        Args:
+            file_path: File to read
+            hashers: List of hashlib objects, all updated from a single read
+            count_callback: Function to call with (0, bytes) as data is hashed
+            checkpoint: Function called between buffers, e.g. to pause or cancel
+            drop_cache: Evict the file from the page cache first, so it is
+                        read back from the disk (where posix_fadvise exists)
+            buffer_size: readinto buffer size, instead of the default for the
+                         file's filesystem
+            strategy: Strategy to use instead of choosing one (for benchmarks)
+
+        Returns:
+            The strategy that was used
+        """
+        if checkpoint:
+            checkpoint()
+
+        with open(file_path, 'rb', buffering=0) as f:
+            fd = f.fileno()
+            stat = os.fstat(fd)
+            filesystem = filesystem_type(stat.st_dev)
+            if strategy is None:
+                strategy = self.choose(stat.st_size, filesystem, len(hashers))
+            if strategy == 'mmap' and stat.st_size == 0:
+                strategy = 'readinto'  # Empty files can't be mapped
+            if strategy == 'file_digest' and not _HAS_FILE_DIGEST:
+                strategy = 'readinto'  # Python before 3.11
+
+            if drop_cache and hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+            if strategy == 'mmap':
+                self._hash_mapped(f, hashers, count_callback, checkpoint)
+                return strategy
+
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+            if strategy == 'file_digest':
+                for hasher in hashers:
+                    f.seek(0)
+                    hashlib.file_digest(f, lambda: hasher)
+                if count_callback:
+                    count_callback(0, f.tell())
+            else:
+                if buffer_size is None:
+                    buffer_size = LOCAL_BUFFER_SIZE if is_local_filesystem(filesystem) else NETWORK_BUFFER_SIZE
+                self._hash_read(f, hashers, buffer_size, count_callback, checkpoint)
+
+        return strategy
+
+    def _hash_read(self, f, hashers, buffer_size, count_callback, checkpoint):
+        with self.buffer_pool.buffer(buffer_size) as buffer:
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+
+                with buffer[:count] as data:
+                    for hasher in hashers:
+                        hasher.update(data)
+                if count_callback:
+                    count_callback(0, count)
+
+                # Stop between buffers if the operation is paused or cancelled
+                if checkpoint:
+                    checkpoint()
+
+    def _hash_mapped(self, f, hashers, count_callback, checkpoint):
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+
+            with memoryview(mapped) as view:
+                for start in range(0, len(view), MMAP_CHUNK_SIZE):
+                    with view[start:start + MMAP_CHUNK_SIZE] as data:
+                        for hasher in hashers:
+                            hasher.update(data)
+                        if count_callback:
+                            count_callback(0, len(data))
+
+                    # Stop between chunks if the operation is paused or cancelled
+                    if checkpoint:
+                        checkpoint()
+
+
+def is_local_filesystem(filesystem):
+    """Return True for filesystem types known to be on a local disk"""
+    return (filesystem != 'unknown' and filesystem not in NETWORK_FILESYSTEMS
+            and not filesystem.startswith('fuse'))
+
+
+def filesystem_type(device):
+    """
+    Return the type of the filesystem with st_dev device (e.g. 'ext4', 'nfs4')
+
+    Linux lists mounts with their device numbers in /proc/self/mountinfo.
+    Elsewhere, or for a device that isn't listed, 'unknown' is returned.
+    """
+    if not hasattr(os, 'major'):
+        return 'unknown'
+
+    key = (os.major(device), os.minor(device))
+    if key not in _filesystems:
+        # Mounted since the table was last read, or not listed at all
+        _filesystems.update(_read_mountinfo())
+        _filesystems.setdefault(key, 'unknown')
+    return _filesystems[key]
+
+
+def _read_mountinfo():
+    filesystems = {}
+    try:
+        with open('/proc/self/mountinfo') as f:
+            for line in f:
+                # "36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw"
+                fields, _, rest = line.partition(' - ')
+                major, minor = fields.split()[2].split(':')
+                filesystems[(int(major), int(minor))] = rest.split()[0]
+    except (OSError, ValueError, IndexError):
+        pass
+    return filesystems
+
+
+# (major, minor) device number -> filesystem type, filled in as devices are seen
+_filesystems = {}
+
+_HAS_FILE_DIGEST = hasattr(hashlib, 'file_digest')
@@ -0,0 +1,118 @@
+import os
+
+
+class FileEntry:
+    """A file found while walking a tree, with its stat results cached"""
+
+    __slots__ = ('path', 'name', 'dirpath', 'size', 'mtime_ns', 'inode', 'device', 'error')
+
+    def __init__(self, dirpath, name):
+        self.path = os.path.join(dirpath, name)
+        self.name = name
+        self.dirpath = dirpath
+        self.size = None
+        self.mtime_ns = None
+        self.inode = None
+        self.device = None
+        self.error = None  # OSError raised by stat, if any
+
+    def signature(self):
+        """Return the (size, mtime_ns, inode) tuple used to detect changed files"""
+        return (self.size, self.mtime_ns, self.inode)
+
+    def get_size(self):
+        """Return the file size, raising the original stat error if there was one"""
+        if self.error is not None:
+            raise self.error
+        return self.size
+
+
+class FileInventory:
+    """
+    Single-pass listing of a directory tree built with os.scandir
+
+    Directories are listed in the same order os.walk (top-down) would yield
+    them, with their files in scandir order, so code moved over from os.walk
+    produces identical output. Each file is stat'ed exactly once; size, mtime,
+    inode and device are kept on the entry so callers never stat again.
+    Like os.walk, unreadable directories are skipped and symlinked
+    directories are listed but not descended into.
+
+    An optional CancellationToken is checked before each directory is listed.
+    """
+
+    def __init__(self, root, cancel_token=None):
+        self.root = root
+        self.directories = []  # (dirpath, [FileEntry, ...]) in walk order
+        self.total_files = 0
+        self.total_size = 0
+        self._by_path = None
+
+        self._build(cancel_token)
+
+    def _build(self, cancel_token=None):
+        pending = [self.root]
+
+        while pending:
+            dirpath = pending.pop()
+
+            if cancel_token:
+                cancel_token.checkpoint()
+
+            try:
+                with os.scandir(dirpath) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            files = []
+            subdirs = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+
+                if is_dir:
+                    try:
+                        if not entry.is_symlink():
+                            subdirs.append(os.path.join(dirpath, entry.name))
+                    except OSError:
+                        pass
+                    continue
+
+                file_entry = FileEntry(dirpath, entry.name)
+                try:
+                    st = entry.stat()
+                    file_entry.size = st.st_size
+                    file_entry.mtime_ns = st.st_mtime_ns
+                    file_entry.inode = st.st_ino
+                    file_entry.device = st.st_dev
+                    self.total_size += st.st_size
+                except OSError as e:
+                    file_entry.error = e
+                files.append(file_entry)
+
+            self.directories.append((dirpath, files))
+            self.total_files += len(files)
+
+            # Push in reverse so subdirectories are visited in listing order
+            pending.extend(reversed(subdirs))
+
+    def walk(self):
+        """Yield (dirpath, files) pairs in os.walk order"""
+        return iter(self.directories)
+
+    def files(self):
+        """Yield every FileEntry in walk order"""
+        for _, files in self.directories:
+            yield from files
+
+    def get(self, path):
+        """Return the FileEntry for path, or None if it wasn't found"""
+        if self._by_path is None:
+            self._by_path = {os.path.normpath(entry.path): entry for entry in self.files()}
+        return self._by_path.get(os.path.normpath(path))
+
+    def __len__(self):
+        return self.total_files
@@ -0,0 +1,111 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+
+class TransferJournal:
+    """
+    Append-only record of transfer progress, kept in the destination's logs
+
+    Two kinds of line are written, both keyed on the file's path relative to
+    the transfer root and the source's size and mtime when it was copied:
+
+    - 'verified': the file was copied and its checksum verified, along with
+      the digest and the destination's size and mtime at that point
+    - 'checkpoint': the first 'offset' bytes of a large file were written and
+      flushed to disk, along with the SHA256 of those bytes
+
+    Only the latest line per file matters. The journal is compacted to those
+    lines whenever it is opened.
+    """
+
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+        self.entries = {}  # rel_path -> latest entry
+
+        self._load()
+        self._compact()
+        self.file = open(self.journal_path, 'a')
+
+    def _load(self):
+        if not os.path.exists(self.journal_path):
+            return
+
+        with open(self.journal_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry['rel_path']] = entry
+                except (ValueError, KeyError, TypeError):
+                    # A line cut short by a crash - ignore it
+                    continue
+
+    def _compact(self):
+        temp_path = self.journal_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(temp_path, self.journal_path)
+
+    def verified_entry(self, rel_path, size, mtime_ns=None):
+        """
+        Return the 'verified' entry for a source file, if it is unchanged
+
+        With mtime_ns left as None only the size has to match.
+        """
+        entry = self._matching_entry(rel_path, size, mtime_ns)
+        if entry and entry['event'] == 'verified':
+            return entry
+        return None
+
+    def checkpoint_entry(self, rel_path, size, mtime_ns):
+        """Return the latest 'checkpoint' entry for a source file, if it is unchanged"""
+        entry = self._matching_entry(rel_path, size, mtime_ns)
+        if entry and entry['event'] == 'checkpoint':
+            return entry
+        return None
+
+    def _matching_entry(self, rel_path, size, mtime_ns):
+        with self.lock:
+            entry = self.entries.get(rel_path)
+        if entry and entry['size'] == size and mtime_ns in (None, entry['mtime_ns']):
+            return entry
+        return None
+
+    def record_checkpoint(self, rel_path, size, mtime_ns, offset, sha256):
+        """Record that the first offset bytes are safely on disk"""
+        self._write({
+            'event': 'checkpoint',
+            'rel_path': rel_path,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'offset': offset,
+            'sha256': sha256
+        }, sync=True)
+
+    def record_verified(self, rel_path, size, mtime_ns, sha256, dest_size, dest_mtime_ns):
+        """Record that a file was copied and verified"""
+        self._write({
+            'event': 'verified',
+            'rel_path': rel_path,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'dest_size': dest_size,
+            'dest_mtime_ns': dest_mtime_ns,
+            'time': datetime.now().isoformat()
+        })
+
+    def _write(self, entry, sync=False):
+        with self.lock:
+            self.entries[entry['rel_path']] = entry
+            self.file.write(json.dumps(entry) + '\n')
+            self.file.flush()
+            if sync:
+                os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,508 @@
+import os
+import struct
+
+from controllers.pixels import pixel_fingerprint, verify_pixels
+from controllers.tiff_header import TiffHeaderError, read_first_ifd
+
+# TIFF tag values and how they're reported
+COMPRESSION_TYPES = {
+    1: 'Uncompressed',
+    2: 'CCITT 1D',
+    3: 'CCITT Group 3',
+    4: 'CCITT Group 4',
+    5: 'LZW',
+    6: 'JPEG (old)',
+    7: 'JPEG',
+    8: 'Adobe Deflate',
+    9: 'JBIG B&W',
+    10: 'JBIG Color',
+    32773: 'PackBits',
+    32946: 'Deflate',
+    34712: 'JPEG 2000'
+}
+
+PHOTOMETRIC_TYPES = {
+    0: 'WhiteIsZero',
+    1: 'BlackIsZero',
+    2: 'RGB',
+    3: 'Palette',
+    4: 'Mask',
+    5: 'CMYK',
+    6: 'YCbCr',
+    8: 'CIELab',
+    9: 'ICCLab'
+}
+
+PLANAR_TYPES = {
+    1: 'Chunky',
+    2: 'Planar'
+}
+
+# Image mode for each photometric interpretation
+PHOTOMETRIC_MODES = {
+    'BlackIsZero': 'Grayscale',
+    'WhiteIsZero': 'Grayscale (Inverted)',
+    'RGB': 'RGB',
+    'Palette': 'Palette',
+    'CMYK': 'CMYK',
+    'YCbCr': 'YCbCr',
+    'CIELab': 'Lab',
+    'ICCLab': 'Lab'
+}
+
+# TIFF field types: SHORT, LONG or LONG8 integers, RATIONAL and ASCII
+INTEGER_TYPES = (3, 4, 16)
+RATIONAL_TYPES = (5,)
+ASCII_TYPES = (2,)
+
+# Tags whose values the header reader needs (the rest are only checked for
+# presence) and the field types it can use them in. A tag stored as any
+# other type (an XResolution written as a SHORT, say) sends the file to
+# tifffile instead.
+HEADER_TAG_TYPES = {
+    256: INTEGER_TYPES,   # ImageWidth
+    257: INTEGER_TYPES,   # ImageLength
+    258: INTEGER_TYPES,   # BitsPerSample
+    259: INTEGER_TYPES,   # Compression
+    262: INTEGER_TYPES,   # PhotometricInterpretation
+    277: INTEGER_TYPES,   # SamplesPerPixel
+    282: RATIONAL_TYPES,  # XResolution
+    283: RATIONAL_TYPES,  # YResolution
+    284: INTEGER_TYPES,   # PlanarConfiguration
+    296: INTEGER_TYPES,   # ResolutionUnit
+    305: ASCII_TYPES,     # Software
+    306: ASCII_TYPES,     # DateTime
+    322: INTEGER_TYPES,   # TileWidth
+    323: INTEGER_TYPES,   # TileLength
+}
+HEADER_TAGS = frozenset(HEADER_TAG_TYPES)
+
+
+def scan_file(task, deep_validation=False, decode_threads=1, fingerprint=False):
+    """
+    Process a single file found by Scanner.scan
+    
+    This is the unit of work handed to the extraction pool, so it stays a
+    module-level function and only returns picklable values. Status messages
+    are returned rather than sent to a callback so the scanner can emit them
+    in walk order, wherever the file was processed.
+    
+    Args:
+        task: (rel_path, entry) tuple of the folder path relative to the scan
+              root and the file's inventory FileEntry
+        deep_validation: Also decode every strip or tile of a TIFF, adding
+                         the verify_pixels fields to its record
+        decode_threads: Threads decoding the segments of one TIFF
+        fingerprint: Also add the pixel_fingerprint of a TIFF to its record
+        
+    Returns:
+        (kind, file_size, record, messages, error) tuple where kind is 'tiff',
+        'non_tiff', 'unreadable' or None if the file could not be processed
+    """
+    rel_path, entry = task
+    filename = entry.name
+    file_path = entry.path
+    messages = []
+    
+    try:
+        # Check if file is a TIFF
+        if filename.lower().endswith(('.tif', '.tiff')):
+            # Get file size (stat'ed once by the inventory)
+            file_size = entry.get_size()
+            
+            metadata, unreadable = extract_tiff_metadata(file_path, filename, rel_path,
+                                                         file_size, messages)
+            if unreadable is not None:
+                return 'unreadable', file_size, unreadable, messages, None
+            
+            # Decode the pixel data, which reading the header doesn't touch
+            if deep_validation:
+                metadata.update(verify_pixels(file_path, decode_threads))
+                if metadata['pixel_check'] != 'OK':
+                    messages.append(f"Pixel data of {filename}: {metadata['pixel_error']}")
+            
+            # Hash the decoded pixels, to find copies saved differently
+            if fingerprint:
+                try:
+                    metadata['pixel_fingerprint'] = pixel_fingerprint(file_path, decode_threads)
+                except Exception as e:
+                    messages.append(f"Could not fingerprint {filename}: {e}")
+            
+            return 'tiff', file_size, metadata, messages, None
+        
+        # Non-TIFF file
+        file_size = entry.get_size()
+        return 'non_tiff', file_size, {
+            'filename': filename,
+            'path': file_path,
+            'rel_path': os.path.join(rel_path, filename),
+            'size': file_size
+        }, messages, None
+    
+    except Exception as e:
+        # Handle file access errors
+        return None, 0, None, messages, str(e)
+
+
+def scan_files(tasks, deep_validation=False, decode_threads=1, fingerprint=False):
+    """Process a chunk of files with scan_file, for handing to a worker process"""
+    return [scan_file(task, deep_validation, decode_threads, fingerprint) for task in tasks]
+
+
+def extract_tiff_metadata(file_path, filename, rel_path, file_size, messages):
+    """
+    Extract metadata from a TIFF file
+    
+    The header and first IFD are read directly where possible. Files that
+    can't be read that way go through tifffile, falling back to Pillow.
+    
+    Args:
+        file_path: Full path to the TIFF file
+        filename: Name of the file
+        rel_path: Path of the containing folder relative to the scan root
+        file_size: Size of the file in bytes
+        messages: List to append status messages to
+        
+    Returns:
+        (metadata, unreadable) tuple. unreadable is a non-TIFF file record if
+        neither tifffile nor Pillow could open the file, otherwise None
+    """
+    # Initialize metadata dictionary with basic file info
+    metadata = {
+        'filename': filename,
+        'path': file_path,
+        'rel_path': os.path.join(rel_path, filename),
+        'size': file_size,
+        'width': 0,
+        'height': 0,
+        'format': 'TIFF',
+        'mode': '',
+        'dpi_x': 0,
+        'dpi_y': 0,
+        'bit_depth': 0,
+        'color_profile': 'Unknown',
+        'compression': 'Unknown',
+        'software': 'Unknown',
+        'datetime': 'Unknown',
+        'tiff_version': 'Unknown',
+        'subfile_type': 'Unknown',
+        'planar_config': 'Unknown',
+        'samples_per_pixel': 0,
+        'photometric': 'Unknown',
+        'xmp': 'No',
+        'exif': 'No',
+        'iptc': 'No',
+        'is_bigtiff': 'No',
+        'is_tiled': 'No',
+        'tile_width': 0,
+        'tile_height': 0
+    }
+    
+    # Read the tags straight from the first IFD if the file allows it,
+    # otherwise fall back to tifffile, which reads the files the header
+    # reader rejects (and reports the errors of those it can't)
+    try:
+        _extract_from_header(file_path, metadata)
+        return metadata, None
+    except (TiffHeaderError, OSError, struct.error):
+        pass
+    
+    # Otherwise try to extract metadata using tifffile, which (with numpy)
+    # is only loaded once a file needs it
+    tifffile_success = False
+    try:
+        import numpy as np
+        import tifffile
+        
+        with tifffile.TiffFile(file_path) as tif:
+            tifffile_success = True
+            
+            # Get basic image dimensions from first page
+            if len(tif.pages) > 0:
+                page = tif.pages[0]
+                metadata['width'] = page.imagewidth
+                metadata['height'] = page.imagelength
+                
+                # Get samples per pixel and bit depth
+                metadata['samples_per_pixel'] = page.samplesperpixel
+                metadata['bits_per_sample'] = page.bitspersample
+                
+                # Calculate total bit depth
+                try:
+                    if isinstance(page.bitspersample, (list, tuple, np.ndarray)):
+                        metadata['bit_depth'] = sum(page.bitspersample)
+                    else:
+                        metadata['bit_depth'] = page.bitspersample * page.samplesperpixel
+                        
+                    # Store bits_per_sample for reporting
+                    if isinstance(page.bitspersample, (list, tuple, np.ndarray)):
+                        metadata['bits_per_sample'] = ','.join(str(b) for b in page.bitspersample)
+                    else:
+                        metadata['bits_per_sample'] = str(page.bitspersample)
+                except (TypeError, ValueError):
+                    metadata['bit_depth'] = 0
+                    metadata['bits_per_sample'] = 'Unknown'
+                
+                # Get photometric interpretation (tifffile gives enums; the
+                # reports use the tag values, as the header reader does)
+                if 262 in page.tags:
+                    photometric = int(page.photometric)
+                    metadata['photometric'] = PHOTOMETRIC_TYPES.get(
+                        photometric, f'Unknown ({photometric})')
+                
+                # Get planar configuration
+                planar_config = int(page.planarconfig)
+                metadata['planar_config'] = PLANAR_TYPES.get(
+                    planar_config, f'Unknown ({planar_config})')
+                
+                # Get resolution (DPI)
+                if hasattr(page, 'tags') and 282 in page.tags and 283 in page.tags:
+                    x_resolution = page.tags[282].value
+                    y_resolution = page.tags[283].value
+                    
+                    # Handle tuple resolution values (convert to float), leaving
+                    # the DPI unset for a zero denominator
+                    if isinstance(x_resolution, tuple) and len(x_resolution) == 2:
+                        x_resolution = (float(x_resolution[0]) / float(x_resolution[1])
+                                        if x_resolution[1] else 0)
+                    if isinstance(y_resolution, tuple) and len(y_resolution) == 2:
+                        y_resolution = (float(y_resolution[0]) / float(y_resolution[1])
+                                        if y_resolution[1] else 0)
+                    
+                    # Check resolution unit
+                    resolution_unit = 2  # Default is inches
+                    if 296 in page.tags:
+                        resolution_unit = page.tags[296].value
+                    
+                    # Convert resolution to DPI if needed
+                    if not x_resolution or not y_resolution:
+                        pass
+                    elif resolution_unit == 1:  # No unit, use as is
+                        metadata['dpi_x'] = float(x_resolution)
+                        metadata['dpi_y'] = float(y_resolution)
+                    elif resolution_unit == 2:  # Inches
+                        metadata['dpi_x'] = float(x_resolution)
+                        metadata['dpi_y'] = float(y_resolution)
+                    elif resolution_unit == 3:  # Centimeters
+                        # Convert from pixels/cm to pixels/inch
+                        metadata['dpi_x'] = float(x_resolution) * 2.54
+                        metadata['dpi_y'] = float(y_resolution) * 2.54
+                
+                # Get compression
+                compression = int(page.compression)
+                metadata['compression'] = COMPRESSION_TYPES.get(
+                    compression, f'Unknown ({compression})')
+                
+                # Check if image is tiled
+                if page.is_tiled:
+                    metadata['is_tiled'] = 'Yes'
+                    metadata['tile_width'] = page.tilewidth
+                    metadata['tile_height'] = page.tilelength
+                
+                # Get software and datetime information
+                software = _ascii_tag(page, 305)
+                if software:
+                    metadata['software'] = software
+                datetime_value = _ascii_tag(page, 306)
+                if datetime_value:
+                    metadata['datetime'] = datetime_value
+                
+                # Check for embedded metadata blocks: XMP, EXIF IFD and IPTC
+                metadata['xmp'] = 'Yes' if 700 in page.tags else 'No'
+                metadata['exif'] = 'Yes' if 34665 in page.tags else 'No'
+                metadata['iptc'] = 'Yes' if 33723 in page.tags else 'No'
+                
+                # Color profile information
+                if 34675 in page.tags:  # ICC profile tag
+                    metadata['color_profile'] = 'ICC Profile Present'
+                else:
+                    metadata['color_profile'] = 'No ICC Profile'
+            
+            # Check if it's a BigTIFF
+            metadata['is_bigtiff'] = 'Yes' if tif.is_bigtiff else 'No'
+            
+            # Check TIFF version
+            metadata['tiff_version'] = f"{tif.byteorder} {tif.tiff.version}"
+            
+            # Set mode based on photometric interpretation
+            metadata['mode'] = PHOTOMETRIC_MODES.get(metadata['photometric'], metadata['mode'])
+            
+    except Exception as tiff_error:
+        # If tifffile fails, fall back to Pillow
+        messages.append(f"tifffile extraction failed for {filename}, falling back to Pillow")
+    
+    # If tifffile failed, try with Pillow
+    if not tifffile_success:
+        try:
+            from PIL import Image
+            
+            with Image.open(file_path) as img:
+                metadata['width'] = img.width
+                metadata['height'] = img.height
+                metadata['format'] = img.format
+                metadata['mode'] = img.mode
+
+                # Extract DPI information
+                try:
+                    dpi = img.info.get('dpi', (0, 0))
+                    metadata['dpi_x'] = dpi[0]
+                    metadata['dpi_y'] = dpi[1]
+                except Exception:
+                    metadata['dpi_x'] = 0
+                    metadata['dpi_y'] = 0
+                
+                # Extract bit depth
+                if img.mode == '1':
+                    metadata['bit_depth'] = 1  # Binary
+                elif img.mode == 'L':
+                    metadata['bit_depth'] = 8  # Grayscale
+                elif img.mode == 'P':
+                    metadata['bit_depth'] = 8  # Palette
+                elif img.mode == 'RGB':
+                    metadata['bit_depth'] = 24  # RGB
+                elif img.mode == 'RGBA':
+                    metadata['bit_depth'] = 32  # RGBA
+                elif img.mode == 'CMYK':
+                    metadata['bit_depth'] = 32  # CMYK
+                elif img.mode == 'I':
+                    metadata['bit_depth'] = 32  # 32-bit integer
+                elif img.mode == 'F':
+                    metadata['bit_depth'] = 32  # 32-bit float
+                else:
+                    metadata['bit_depth'] = 0  # Unknown
+                
+                # Extract color profile
+                try:
+                    if 'icc_profile' in img.info:
+                        metadata['color_profile'] = 'ICC Profile Present'
+                    else:
+                        metadata['color_profile'] = 'No ICC Profile'
+                except Exception:
+                    metadata['color_profile'] = 'Unknown'
+                
+                # Extract compression
+                try:
+                    if hasattr(img, 'tag'):
+                        # For PIL's TiffImagePlugin
+                        compression = img.tag.get(259, None)
+                        if compression:
+                            compression_value = compression[0]
+                            metadata['compression'] = COMPRESSION_TYPES.get(compression_value, f'Unknown ({compression_value})')
+                        else:
+                            metadata['compression'] = 'Unknown'
+                    else:
+                        metadata['compression'] = 'Unknown'
+                except Exception:
+                    metadata['compression'] = 'Unknown'
+        except Exception as pil_error:
+            # If both tifffile and Pillow fail, add to non-TIFF files with error
+            return None, {
+                'filename': filename,
+                'path': file_path,
+                'rel_path': os.path.join(rel_path, filename),
+                'size': file_size,
+                'error': f"tifffile error: {str(tiff_error)}, PIL error: {str(pil_error)}"
+            }
+    
+    return metadata, None
+
+
+def _ascii_tag(page, code):
+    """Return an ASCII tag of a tifffile page as the header reader would, or None"""
+    tag = page.tags.get(code)
+    if tag is None or not isinstance(tag.value, str):
+        return None
+    return tag.value.strip()
+
+
+def _extract_from_header(file_path, metadata):
+    """
+    Fill in metadata from a TIFF's header and first IFD, without tifffile
+    
+    Raises:
+        TiffHeaderError: If the file needs a full parser
+    """
+    header = read_first_ifd(file_path, HEADER_TAGS)
+    tags = header.tags
+    
+    # Only values of the expected types are used as they are below
+    for code, field_type in header.types.items():
+        if field_type not in HEADER_TAG_TYPES[code]:
+            raise TiffHeaderError(f"Tag {code} has unexpected field type {field_type}")
+    
+    if not tags.get(256) or not tags.get(257):
+        raise TiffHeaderError("No image dimensions")
+    
+    # Basic image dimensions
+    metadata['width'] = header.first(256)
+    metadata['height'] = header.first(257)
+    
+    # Samples per pixel and bit depth (a single value if all samples agree)
+    samples_per_pixel = header.first(277, 1)
+    if samples_per_pixel < 1:
+        raise TiffHeaderError(f"Implausible samples per pixel ({samples_per_pixel})")
+    bits_per_sample = tags.get(258) or (1,)
+    if len(bits_per_sample) > 1:
+        bits_per_sample = bits_per_sample[:samples_per_pixel]
+    
+    metadata['samples_per_pixel'] = samples_per_pixel
+    if len(set(bits_per_sample)) > 1:
+        metadata['bit_depth'] = sum(bits_per_sample)
+        metadata['bits_per_sample'] = ','.join(str(b) for b in bits_per_sample)
+    else:
+        metadata['bit_depth'] = bits_per_sample[0] * samples_per_pixel
+        metadata['bits_per_sample'] = str(bits_per_sample[0])
+    
+    # Photometric interpretation and planar configuration
+    if 262 in tags:
+        photometric = header.first(262)
+        metadata['photometric'] = PHOTOMETRIC_TYPES.get(photometric, f'Unknown ({photometric})')
+    
+    planar_config = header.first(284, 1)
+    metadata['planar_config'] = PLANAR_TYPES.get(planar_config, f'Unknown ({planar_config})')
+    
+    # Resolution (DPI)
+    x_resolution = header.first(282)
+    y_resolution = header.first(283)
+    if x_resolution and y_resolution and x_resolution[1] and y_resolution[1]:
+        x_resolution = float(x_resolution[0]) / float(x_resolution[1])
+        y_resolution = float(y_resolution[0]) / float(y_resolution[1])
+        
+        resolution_unit = header.first(296, 2)  # Default is inches
+        if resolution_unit in (1, 2):
+            metadata['dpi_x'] = x_resolution
+            metadata['dpi_y'] = y_resolution
+        elif resolution_unit == 3:  # Centimeters
+            metadata['dpi_x'] = x_resolution * 2.54
+            metadata['dpi_y'] = y_resolution * 2.54
+    
+    # Compression
+    compression = header.first(259, 1)
+    metadata['compression'] = COMPRESSION_TYPES.get(compression, f'Unknown ({compression})')
+    
+    # Tiling
+    if 322 in tags:
+        metadata['is_tiled'] = 'Yes'
+        metadata['tile_width'] = header.first(322, 0)
+        metadata['tile_height'] = header.first(323, 0)
+    
+    # Software and date/time
+    if tags.get(305):
+        metadata['software'] = tags[305]
+    if tags.get(306):
+        metadata['datetime'] = tags[306]
+    
+    # Embedded metadata blocks: XMP, EXIF IFD and IPTC
+    metadata['xmp'] = 'Yes' if 700 in tags else 'No'
+    metadata['exif'] = 'Yes' if 34665 in tags else 'No'
+    metadata['iptc'] = 'Yes' if 33723 in tags else 'No'
+    
+    # Container format
+    metadata['is_bigtiff'] = 'Yes' if header.is_bigtiff else 'No'
+    metadata['tiff_version'] = f"{header.byteorder} {header.version}"
+    
+    # Color profile
+    metadata['color_profile'] = 'ICC Profile Present' if 34675 in tags else 'No ICC Profile'
+    
+    # Mode based on photometric interpretation
+    metadata['mode'] = PHOTOMETRIC_MODES.get(metadata['photometric'], metadata['mode'])
@@ -0,0 +1,141 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def ordered_map(executor, fn, items, size_of=None, max_inflight_bytes=None, max_pending=None):
+    """
+    Run fn over items on an executor and yield the results in item order
+
+    Work is submitted ahead of the consumer, but only while the bytes of the
+    submitted-but-not-yet-consumed items stay under max_inflight_bytes and
+    there are fewer than max_pending of them. An item larger than the whole
+    budget is still run, on its own. Exceptions raised by fn are re-raised
+    when their result is reached, just as a plain loop would raise them.
+
+    Args:
+        executor: concurrent.futures executor to submit work to
+        fn: Function called with each item
+        items: Iterable of items
+        size_of: Function returning the size in bytes of an item
+        max_inflight_bytes: Limit on the total size of items in flight
+        max_pending: Limit on the number of items in flight
+    """
+    pending = deque()
+    inflight_bytes = 0
+
+    try:
+        for item in items:
+            size = size_of(item) if size_of else 0
+
+            # Wait for the oldest results until the new item fits the budget
+            while pending and (
+                    (max_inflight_bytes is not None and inflight_bytes + size > max_inflight_bytes)
+                    or (max_pending is not None and len(pending) >= max_pending)):
+                future, done_size = pending.popleft()
+                inflight_bytes -= done_size
+                yield future.result()
+
+            pending.append((executor.submit(fn, item), size))
+            inflight_bytes += size
+
+            # Hand back anything already finished so progress keeps moving
+            while pending and pending[0][0].done():
+                future, done_size = pending.popleft()
+                inflight_bytes -= done_size
+                yield future.result()
+
+        while pending:
+            future, done_size = pending.popleft()
+            inflight_bytes -= done_size
+            yield future.result()
+    finally:
+        # Don't leave queued work running if the consumer stopped early
+        for future, _ in pending:
+            future.cancel()
+
+
+def unordered_map(executor, fn, items, max_pending=None):
+    """
+    Run fn over items on an executor and yield (item, result) as each finishes
+
+    At most max_pending items are submitted at once, so arbitrarily long
+    inputs don't turn into an equally long list of futures.
+    """
+    pending = {}
+
+    try:
+        for item in items:
+            if max_pending is not None and len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+
+            pending[executor.submit(fn, item)] = item
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def is_rotational(device):
+    """
+    Return True if st_dev belongs to a spinning disk
+
+    Only Linux exposes this (through sysfs); everywhere else, and for network
+    or virtual filesystems, the device is treated as solid state.
+    """
+    sysfs = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+
+    # Partitions don't have a queue of their own; their parent disk does
+    for queue in (os.path.join(sysfs, 'queue'), os.path.join(sysfs, '..', 'queue')):
+        try:
+            with open(os.path.join(queue, 'rotational')) as f:
+                return f.read().strip() == '1'
+        except (OSError, ValueError):
+            continue
+
+    return False
+
+
+class DevicePool:
+    """
+    Executor that runs each item on a thread pool belonging to its device
+
+    Every device gets up to max_workers threads, or rotational_workers if it
+    is a spinning disk, so slow disks aren't seeked to death while fast ones
+    still run wide.
+    """
+
+    def __init__(self, max_workers, device_of, rotational_workers=1):
+        self.max_workers = max_workers
+        self.device_of = device_of
+        self.rotational_workers = rotational_workers
+        self.pools = {}
+
+    def submit(self, fn, item):
+        device = self.device_of(item)
+
+        pool = self.pools.get(device)
+        if pool is None:
+            workers = self.max_workers
+            if hasattr(os, 'major') and is_rotational(device):
+                workers = min(workers, self.rotational_workers)
+            pool = self.pools[device] = ThreadPoolExecutor(max_workers=max(1, workers))
+
+        return pool.submit(fn, item)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown(wait=True)
+        return False
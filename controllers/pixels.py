@@ -0,0 +1,274 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.parallel import ordered_map
+
+# tifffile and numpy are only imported once a file's pixels are read
+
+# Compressed bytes each file may have read ahead of its decoders
+PIXEL_MAX_INFLIGHT_BYTES = 64 * 1024 * 1024
+
+# Fields verify_pixels adds to a metadata record
+PIXEL_FIELDS = ('pixel_check', 'pixel_error', 'failed_page', 'failed_segment', 'failed_offset')
+
+# TIFF compression code for uncompressed data
+UNCOMPRESSED = 1
+
+# Bytes of an uncompressed strip hashed at a time by pixel_fingerprint
+RAW_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def verify_pixels(file_path, threads=1, max_inflight_bytes=PIXEL_MAX_INFLIGHT_BYTES):
+    """
+    Decode every strip or tile of every page of a TIFF file, stopping at the
+    first one that fails
+
+    Each segment is checked to lie within the file and, if compressed, read
+    and decoded. Uncompressed segments are only checked to lie within the
+    file: decoding them can't fail any other way, and reading them would
+    only repeat what checksum validation does. Segments are decoded by
+    threads workers (the codecs release the GIL) with at most
+    max_inflight_bytes of compressed data read ahead, and each decoded
+    segment is discarded as soon as it is checked.
+
+    Args:
+        file_path: TIFF file to verify
+        threads: Segments decoded at once
+        max_inflight_bytes: Limit on the compressed bytes read but not yet decoded
+
+    Returns:
+        Dict with 'pixel_check' of 'OK', 'Failed' or 'Unsupported' (no codec
+        for the compression). Otherwise 'pixel_error' describes the problem
+        and, where it lies in a segment, 'failed_page', 'failed_segment'
+        (the strip or tile index within the page) and 'failed_offset' (the
+        segment's byte offset in the file) locate it.
+    """
+    import tifffile
+
+    file_size = os.path.getsize(file_path)
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    read_at = _reader(fd)
+    try:
+        with tifffile.TiffFile(file_path) as tif:
+            segments = _segments(tif)
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                results = ordered_map(executor, lambda segment: _check_segment(read_at, file_size, segment),
+                                      segments, size_of=_compressed_size,
+                                      max_inflight_bytes=max_inflight_bytes,
+                                      max_pending=threads * 4)
+                try:
+                    for result in results:
+                        if result is not None:
+                            return result
+                finally:
+                    results.close()
+    except Exception as e:
+        # The IFDs themselves couldn't be read
+        return {'pixel_check': 'Failed', 'pixel_error': str(e)}
+    finally:
+        os.close(fd)
+
+    return {'pixel_check': 'OK'}
+
+
+def pixel_fingerprint(file_path, threads=1, max_inflight_bytes=PIXEL_MAX_INFLIGHT_BYTES):
+    """
+    Return a SHA-256 of the decoded pixels of a TIFF's first page
+
+    The digest covers the image's dimensions, sample type and its samples
+    in row-major, interleaved, little-endian order, so it is the same
+    whatever the compression, strip or tile layout, planar configuration,
+    byte order or tags the image was saved with. Only lossless re-encodings
+    match: a JPEG copy decodes to different pixels.
+
+    The image is never held in memory at once. Compressed strips or tiles
+    are decoded by threads workers, as verify_pixels does, and each band of
+    rows (one strip, or one row of tiles) is hashed and dropped as soon as
+    its segments are in. Uncompressed strips are hashed straight from the
+    file, RAW_CHUNK_SIZE bytes at a time, so memory use is bounded by the
+    largest compressed band however large the image is.
+
+    Args:
+        file_path: TIFF file to fingerprint
+        threads: Segments decoded at once
+        max_inflight_bytes: Limit on the compressed bytes read but not yet decoded
+
+    Raises:
+        ValueError: If the pixels can't be decoded or the page layout isn't supported
+    """
+    import numpy as np
+    import tifffile
+
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    read_at = _reader(fd)
+    try:
+        with tifffile.TiffFile(file_path) as tif:
+            page = tif.pages[0]
+            planes, depth, height, width, samples = page.shaped
+            if depth != 1:
+                raise ValueError("volumetric images can't be fingerprinted")
+            if page.dtype is None:
+                raise ValueError(f"unsupported sample format {page.sampleformat!r}")
+
+            # Samples are hashed little-endian, whatever the file's byte order
+            dtype = np.dtype(page.dtype).newbyteorder('<')
+            digest = hashlib.sha256(f"{height}x{width}x{planes * samples} {dtype.str}\n".encode())
+
+            if _is_raw(page, planes):
+                file_dtype = dtype.newbyteorder(tif.byteorder)
+                for chunk in _raw_chunks(page, read_at, width * samples * dtype.itemsize):
+                    digest.update(np.frombuffer(chunk, file_dtype).astype(dtype, copy=False))
+            else:
+                for band in _bands(page, read_at, dtype, threads, max_inflight_bytes):
+                    digest.update(band)
+    finally:
+        os.close(fd)
+
+    return digest.hexdigest()
+
+
+def _is_raw(page, planes):
+    """Return True if a page's strips hold its samples exactly as they are hashed"""
+    from tifffile import PHOTOMETRIC
+
+    return (page.compression == UNCOMPRESSED and not page.is_tiled and planes == 1
+            and page.fillorder == 1 and page.photometric != PHOTOMETRIC.YCBCR
+            and page.bitspersample == page.dtype.itemsize * 8)
+
+
+def _raw_chunks(page, read_at, row_bytes):
+    """Yield the bytes of an uncompressed page's strips in whole samples"""
+    height = page.imagelength
+    rows_per_strip = min(page.rowsperstrip, height)
+    # Whole rows, so chunks split at sample boundaries
+    chunk_size = max(1, RAW_CHUNK_SIZE // row_bytes) * row_bytes
+
+    for index, offset in enumerate(page.dataoffsets):
+        # The byte count may include padding; the rows are what's hashed
+        remaining = min(rows_per_strip, height - index * rows_per_strip) * row_bytes
+        while remaining > 0:
+            count = min(chunk_size, remaining)
+            chunk = read_at(count, offset)
+            if len(chunk) < count:
+                raise ValueError(f"strip {index} ends past the end of the file")
+            yield chunk
+            offset += count
+            remaining -= count
+
+
+def _bands(page, read_at, dtype, threads, max_inflight_bytes):
+    """
+    Yield a page's pixels as C-contiguous (rows, width, samples) arrays of
+    dtype, one strip or row of tiles at a time, from the top
+    """
+    import numpy as np
+
+    planes, _, height, width, samples = page.shaped
+    if page.is_tiled:
+        band_height, segment_width = page.tilelength, page.tilewidth
+    else:
+        band_height, segment_width = min(page.rowsperstrip, height), width
+    across = -(-width // segment_width)
+    bands = -(-height // band_height)
+
+    offsets, bytecounts = page.dataoffsets, page.databytecounts
+    if len(offsets) != planes * bands * across:
+        raise ValueError(f"expected {planes * bands * across} segments, found {len(offsets)}")
+
+    # Segments are stored plane by plane; take each band's from every plane
+    order = (plane * bands * across + band * across + column
+             for band in range(bands) for plane in range(planes) for column in range(across))
+
+    def decode(index):
+        if not offsets[index] or not bytecounts[index]:
+            raise ValueError(f"segment {index} has no data")
+        data = read_at(bytecounts[index], offsets[index])
+        return page.decode(data, index, jpegtables=page.jpegtables, jpegheader=page.jpegheader)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = ordered_map(executor, decode, order, size_of=lambda index: bytecounts[index],
+                              max_inflight_bytes=max_inflight_bytes, max_pending=threads * 4)
+        try:
+            band = None
+            for data, (plane, _, y, x, _), _ in results:
+                if band is None:
+                    rows = min(band_height, height - y)
+                    band = np.empty((rows, width, planes * samples), dtype)
+                    missing = planes * across
+
+                # Tiles are padded past the image's right and bottom edges
+                columns = min(segment_width, width - x)
+                band[:, x:x + columns, plane * samples:(plane + 1) * samples] = data[0, :rows, :columns]
+
+                missing -= 1
+                if not missing:
+                    yield band
+                    band = None
+        finally:
+            results.close()
+
+
+def _reader(fd):
+    """Return a function reading (count, offset) from fd that threads can share"""
+    if hasattr(os, 'pread'):
+        return lambda count, offset: os.pread(fd, count, offset)
+
+    # Windows has no pread, so seeks and reads take turns
+    lock = threading.Lock()
+
+    def read_at(count, offset):
+        with lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, count)
+    return read_at
+
+
+def _segments(tif):
+    """Yield (page index, page, segment index, offset, byte count) for every segment"""
+    from tifffile import TIFF
+
+    for page_index, page in enumerate(tif.pages):
+        if page.compression != UNCOMPRESSED and page.compression not in TIFF.DECOMPRESSORS:
+            # Checked by _check_segment, so it is reported in file order
+            yield page_index, page, None, None, None
+            continue
+
+        for segment_index, (offset, bytecount) in enumerate(zip(page.dataoffsets, page.databytecounts)):
+            yield page_index, page, segment_index, offset, bytecount
+
+
+def _compressed_size(segment):
+    page, bytecount = segment[1], segment[4]
+    if bytecount is None or page.compression == UNCOMPRESSED:
+        return 0  # Never read
+    return bytecount
+
+
+def _check_segment(read_at, file_size, segment):
+    """Return None if a segment is intact, otherwise the failure as a verify_pixels result"""
+    page_index, page, segment_index, offset, bytecount = segment
+
+    if segment_index is None:
+        return {'pixel_check': 'Unsupported', 'failed_page': page_index,
+                'pixel_error': f"No decoder for {page.compression!r} compression"}
+
+    def failure(error):
+        return {'pixel_check': 'Failed', 'pixel_error': error, 'failed_page': page_index,
+                'failed_segment': segment_index, 'failed_offset': offset}
+
+    kind = 'tile' if page.is_tiled else 'strip'
+    if not offset or not bytecount:
+        return failure(f"{kind} has no data")
+    if offset + bytecount > file_size:
+        return failure(f"{kind} ends {offset + bytecount - file_size} bytes past the end of the file")
+    if page.compression == UNCOMPRESSED:
+        return None
+
+    try:
+        data = read_at(bytecount, offset)
+        page.decode(data, segment_index, jpegtables=page.jpegtables, jpegheader=page.jpegheader)
+    except Exception as e:
+        return failure(f"{kind} failed to decode: {type(e).__name__}: {e}")
+    return None
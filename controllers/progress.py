@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+
+
+class ProgressReporter:
+    """
+    Coalesces a worker's progress and status updates to a fixed frame rate
+
+    Controllers report on every file and every buffer. Wrapping their
+    callbacks with percent() and status() passes those updates on at most
+    frame_rate times a second, with the latest value of each, and drops
+    percentages that haven't changed as integers. count() keeps track of
+    the files and bytes finished, and each frame passes the files/s and
+    MB/s over the last rate_window seconds to rate_callback.
+
+    Updates are only passed on when another one arrives, so anything still
+    held back is lost unless flush() is called once the work is done. All
+    methods can be called from any thread; the callbacks are called from
+    whichever thread completes a frame, outside the reporter's lock.
+    """
+
+    def __init__(self, rate_callback=None, frame_rate=20, rate_window=5.0, clock=time.monotonic):
+        """
+        Args:
+            rate_callback: Function called with (files_per_second, mb_per_second)
+            frame_rate: Maximum number of times a second updates are passed on
+            rate_window: Seconds of history the rates are averaged over
+            clock: Function returning the time in seconds
+        """
+        self.rate_callback = rate_callback
+        self.interval = 1.0 / frame_rate
+        self.rate_window = rate_window
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.channels = []
+        self.last_frame = None
+
+        # Throughput counters, and (time, files, bytes) at recent frames
+        self.files = 0
+        self.bytes = 0
+        self.files_per_second = 0.0
+        self.mb_per_second = 0.0
+        self.samples = deque()
+
+    def percent(self, callback):
+        """Return a progress callback passing changed integer percentages on to callback"""
+        channel = _Channel(callback, dedupe=True)
+        self.channels.append(channel)
+        return lambda value: self._update(channel, int(value))
+
+    def status(self, callback):
+        """Return a status callback passing the latest message on to callback"""
+        channel = _Channel(callback, dedupe=False)
+        self.channels.append(channel)
+        return lambda message: self._update(channel, message)
+
+    def count(self, files=0, size=0):
+        """Add finished files and bytes to the throughput counters"""
+        with self.lock:
+            self.files += files
+            self.bytes += size
+            calls = self._due_frame()
+        _call_all(calls)
+
+    def flush(self):
+        """Pass on every update still held back"""
+        with self.lock:
+            calls = self._frame(self.clock())
+        _call_all(calls)
+
+    def _update(self, channel, value):
+        with self.lock:
+            if channel.dedupe and value == channel.sent and channel.pending is _NOTHING:
+                return
+            channel.pending = value
+            calls = self._due_frame()
+        _call_all(calls)
+
+    def _due_frame(self):
+        """Return the calls of a frame if one is due, otherwise nothing"""
+        now = self.clock()
+        if self.last_frame is not None and now - self.last_frame < self.interval:
+            return []
+        return self._frame(now)
+
+    def _frame(self, now):
+        """Take the pending updates and the current rates as a list of calls"""
+        self.last_frame = now
+
+        calls = []
+        for channel in self.channels:
+            value, channel.pending = channel.pending, _NOTHING
+            if value is _NOTHING or (channel.dedupe and value == channel.sent):
+                continue
+            channel.sent = value
+            calls.append((channel.callback, (value,)))
+
+        if self.rate_callback:
+            self.samples.append((now, self.files, self.bytes))
+            while len(self.samples) > 2 and self.samples[1][0] <= now - self.rate_window:
+                self.samples.popleft()
+
+            start, start_files, start_bytes = self.samples[0]
+            if now > start:
+                self.files_per_second = (self.files - start_files) / (now - start)
+                self.mb_per_second = (self.bytes - start_bytes) / (now - start) / (1024 * 1024)
+            calls.append((self.rate_callback, (self.files_per_second, self.mb_per_second)))
+
+        return calls
+
+
+class _Channel:
+    """One wrapped callback and its held-back value"""
+
+    __slots__ = ('callback', 'dedupe', 'pending', 'sent')
+
+    def __init__(self, callback, dedupe):
+        self.callback = callback
+        self.dedupe = dedupe
+        self.pending = _NOTHING
+        self.sent = _NOTHING
+
+
+def _call_all(calls):
+    for callback, args in calls:
+        callback(*args)
+
+
+# Stand-in for "no value", since None is a valid update
+_NOTHING = object()
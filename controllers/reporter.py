@@ -1,11 +1,76 @@
 import os
 import csv
-import pandas as pd
+import contextlib
 import datetime
 
+from controllers.cancellation import atomic_write
+from controllers.columnar import COLUMNAR_FORMATS, ColumnarReportWriter
+from controllers.duplicates import DuplicateIndex
+
+# Columns of the reports and their types in the Parquet/Feather exports
+NON_TIFF_COLUMNS = {
+    'filename': 'string', 'path': 'string', 'size_bytes': 'int', 'size_mb': 'float',
+    'error': 'string'
+}
+TIFF_METADATA_COLUMNS = {
+    'filename': 'string', 'path': 'string', 'size_mb': 'float', 'size_gb': 'float',
+    'width': 'int', 'height': 'int', 'dpi_x': 'float', 'dpi_y': 'float',
+    'mode': 'string', 'photometric': 'string', 'bit_depth': 'int',
+    'bits_per_sample': 'string', 'samples_per_pixel': 'int',
+    'color_profile': 'string', 'compression': 'string', 'planar_config': 'string',
+    'tiff_version': 'string', 'is_bigtiff': 'bool', 'is_tiled': 'bool',
+    'tile_width': 'int', 'tile_height': 'int',
+    'software': 'string', 'datetime': 'string', 'xmp': 'bool', 'exif': 'bool', 'iptc': 'bool'
+}
+# Added to the TIFF metadata report when the scan decoded the pixel data
+PIXEL_CHECK_COLUMNS = {
+    'pixel_check': 'string', 'pixel_error': 'string', 'failed_page': 'int',
+    'failed_segment': 'int', 'failed_offset': 'int'
+}
+# Added to the TIFF metadata report when the scan fingerprinted the pixels
+FINGERPRINT_COLUMNS = {
+    'pixel_fingerprint': 'string'
+}
+DUPLICATE_GROUP_COLUMNS = {
+    'group': 'int', 'copies': 'int', 'pixel_fingerprint': 'string', 'filename': 'string',
+    'path': 'string', 'size_mb': 'float', 'compression': 'string', 'width': 'int', 'height': 'int'
+}
+FOLDER_COUNT_COLUMNS = {
+    'folder_path': 'string', 'full_path': 'string', 'tiff_count': 'int',
+    'total_size_mb': 'float', 'total_size_gb': 'float', 'avg_file_size_mb': 'float'
+}
+
+# Columns of the CSV reports
+NON_TIFF_FIELDNAMES = list(NON_TIFF_COLUMNS)
+TIFF_METADATA_FIELDNAMES = list(TIFF_METADATA_COLUMNS)
+FOLDER_COUNT_FIELDNAMES = list(FOLDER_COUNT_COLUMNS)
+DUPLICATE_GROUP_FIELDNAMES = list(DUPLICATE_GROUP_COLUMNS)
+
 class Reporter:
-    def __init__(self):
-        pass
+    def __init__(self, columnar_format=None, deep_validation=False, fingerprint=False):
+        """
+        Args:
+            columnar_format: 'parquet' or 'feather' to also write each per-file
+                             and folder report in that format (needs pyarrow),
+                             or None for CSV only
+            deep_validation: Add the pixel validation columns to the TIFF
+                             metadata report and a section to the summary,
+                             for records from a Scanner with deep_validation
+            fingerprint: Add the pixel_fingerprint column and write the
+                         duplicate group report, for records from a Scanner
+                         with fingerprint
+        """
+        if columnar_format is not None and columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format: {columnar_format}")
+        self.columnar_format = columnar_format
+        self.deep_validation = deep_validation
+        self.fingerprint = fingerprint
+        
+        self.tiff_columns = dict(TIFF_METADATA_COLUMNS)
+        if deep_validation:
+            self.tiff_columns.update(PIXEL_CHECK_COLUMNS)
+        if fingerprint:
+            self.tiff_columns.update(FINGERPRINT_COLUMNS)
     
     def generate_all_reports(self, scan_results, output_folder, 
                            progress_callback=None, status_callback=None):
@@ -55,22 +120,110 @@ class Reporter:
         if progress_callback:
             progress_callback(int((completed_reports / total_reports) * 100))
         
+        # Generate the duplicate group report
+        duplicates = None
+        if self.fingerprint:
+            if status_callback:
+                status_callback("Generating duplicate image report...")
+            
+            duplicates = self.generate_duplicate_report(scan_results, output_folder)
+        
         # Generate a summary report
         if status_callback:
             status_callback("Generating summary report...")
         
-        self.generate_summary_report(scan_results, output_folder)
+        self.generate_summary_report(scan_results, output_folder, duplicates)
         
         if status_callback:
             status_callback("All reports generated successfully.")
     
+    def generate_streaming_reports(self, records, scan_results, output_folder,
+                                   status_callback=None):
+        """
+        Generate all reports from records as a scan produces them
+        
+        TIFF metadata and non-TIFF rows are written as each record arrives and
+        the summary statistics are accumulated alongside, so no record needs
+        to be kept. The folder count and summary reports (and the duplicate
+        group report, whose fingerprints are indexed on disk meanwhile) are
+        written once records is exhausted.
+        
+        Each report replaces any previous version only once it is complete,
+        so if records raises (a cancelled scan, say) the old reports are kept.
+        
+        Args:
+            records: Iterable of (kind, record) tuples from Scanner.iter_scan
+            scan_results: The scanning Scanner's results, whose folders are
+                          complete once records is exhausted
+            output_folder: Folder to save reports
+            status_callback: Function to call with status messages
+            
+        Returns:
+            SummaryStatistics of the collection
+        """
+        # Statistics need numpy and pandas, which are slow to import
+        from controllers.statistics import SummaryStatistics
+        
+        # Ensure output directory exists
+        os.makedirs(output_folder, exist_ok=True)
+        
+        statistics = SummaryStatistics()
+        duplicates = DuplicateIndex() if self.fingerprint else None
+        
+        tiff_file = os.path.join(output_folder, 'tiff_metadata_report.csv')
+        non_tiff_file = os.path.join(output_folder, 'non_tiff_files.csv')
+        with atomic_write(tiff_file, newline='') as tiff_csv, \
+                atomic_write(non_tiff_file, newline='') as non_tiff_csv, \
+                self._columnar_writer(output_folder, 'tiff_metadata_report',
+                                      self.tiff_columns) as tiff_columnar, \
+                self._columnar_writer(output_folder, 'non_tiff_files',
+                                      NON_TIFF_COLUMNS) as non_tiff_columnar:
+            tiff_writer = csv.DictWriter(tiff_csv, fieldnames=list(self.tiff_columns))
+            tiff_writer.writeheader()
+            non_tiff_writer = csv.DictWriter(non_tiff_csv, fieldnames=NON_TIFF_FIELDNAMES)
+            non_tiff_writer.writeheader()
+            
+            for kind, record in records:
+                if kind == 'tiff':
+                    row = self._tiff_metadata_row(record)
+                    tiff_writer.writerow(row)
+                    if tiff_columnar:
+                        tiff_columnar.writerow(row)
+                    statistics.add_tiff(record)
+                    if duplicates:
+                        duplicates.add(record)
+                else:
+                    row = self._non_tiff_row(record)
+                    non_tiff_writer.writerow(row)
+                    if non_tiff_columnar:
+                        non_tiff_columnar.writerow(row)
+                    statistics.add_non_tiff(record)
+        
+        # Folder totals are only final now the scan is complete
+        if status_callback:
+            status_callback("Generating folder count and summary reports...")
+        
+        statistics.add_folders(scan_results['folders'])
+        self.generate_folder_count_report(scan_results, output_folder)
+        if duplicates:
+            with duplicates:
+                self.write_duplicate_report(duplicates, output_folder)
+                statistics.add_duplicates(*duplicates.counts())
+        self.write_summary_report(statistics, output_folder)
+        
+        if status_callback:
+            status_callback("All reports generated successfully.")
+        
+        return statistics
+    
     def generate_folder_count_report(self, scan_results, output_folder):
         """Generate CSV listing folders and TIFF counts (only for folders containing TIFFs)"""
         output_file = os.path.join(output_folder, 'folder_count_report.csv')
         
-        with open(output_file, 'w', newline='') as csvfile:
-            fieldnames = ['folder_path', 'full_path', 'tiff_count', 'total_size_mb', 'total_size_gb', 'avg_file_size_mb']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with atomic_write(output_file, newline='') as csvfile, \
+                self._columnar_writer(output_folder, 'folder_count_report',
+                                      FOLDER_COUNT_COLUMNS) as columnar:
+            writer = csv.DictWriter(csvfile, fieldnames=FOLDER_COUNT_FIELDNAMES)
             
             writer.writeheader()
             
@@ -78,214 +231,253 @@ class Reporter:
                 # Skip folders that don't contain any TIFF files
                 if folder_info['tiff_count'] <= 0:
                     continue
-                    
-                # Calculate average file size
-                avg_size_mb = (folder_info['total_size'] / folder_info['tiff_count']) / (1024 * 1024)
-                
-                # Calculate sizes in MB and GB with 2 decimal places
-                size_mb = round(folder_info['total_size'] / (1024 * 1024), 2)
-                size_gb = round(folder_info['total_size'] / (1024 * 1024 * 1024), 2)
-                avg_size_mb = round(avg_size_mb, 2)
                 
-                writer.writerow({
-                    'folder_path': folder_info['rel_path'] or '(root)',
-                    'full_path': folder_info['path'],
-                    'tiff_count': folder_info['tiff_count'],
-                    'total_size_mb': size_mb,
-                    'total_size_gb': size_gb,
-                    'avg_file_size_mb': avg_size_mb
-                })
+                row = self._folder_count_row(folder_info)
+                writer.writerow(row)
+                if columnar:
+                    columnar.writerow(row)
+    
+    def _folder_count_row(self, folder_info):
+        """Return the folder count report row for a folder containing TIFFs"""
+        # Calculate average file size
+        avg_size_mb = (folder_info['total_size'] / folder_info['tiff_count']) / (1024 * 1024)
+        
+        # Calculate sizes in MB and GB with 2 decimal places
+        size_mb = round(folder_info['total_size'] / (1024 * 1024), 2)
+        size_gb = round(folder_info['total_size'] / (1024 * 1024 * 1024), 2)
+        avg_size_mb = round(avg_size_mb, 2)
+        
+        return {
+            'folder_path': folder_info['rel_path'] or '(root)',
+            'full_path': folder_info['path'],
+            'tiff_count': folder_info['tiff_count'],
+            'total_size_mb': size_mb,
+            'total_size_gb': size_gb,
+            'avg_file_size_mb': avg_size_mb
+        }
     
     def generate_non_tiff_report(self, scan_results, output_folder):
         """Generate CSV listing non-TIFF files"""
         output_file = os.path.join(output_folder, 'non_tiff_files.csv')
         
-        with open(output_file, 'w', newline='') as csvfile:
-            fieldnames = ['filename', 'path', 'size_bytes', 'size_mb', 'error']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with atomic_write(output_file, newline='') as csvfile, \
+                self._columnar_writer(output_folder, 'non_tiff_files',
+                                      NON_TIFF_COLUMNS) as columnar:
+            writer = csv.DictWriter(csvfile, fieldnames=NON_TIFF_FIELDNAMES)
             
             writer.writeheader()
             
             for file_info in scan_results['non_tiff_files']:
-                # Calculate size in MB with 2 decimal places
-                size_mb = round(file_info['size'] / (1024 * 1024), 2)
-                
-                writer.writerow({
-                    'filename': file_info['filename'],
-                    'path': file_info['rel_path'],
-                    'size_bytes': file_info['size'],
-                    'size_mb': size_mb,
-                    'error': file_info.get('error', '')
-                })
+                row = self._non_tiff_row(file_info)
+                writer.writerow(row)
+                if columnar:
+                    columnar.writerow(row)
+    
+    def _non_tiff_row(self, file_info):
+        """Return the non-TIFF report row for a file record"""
+        # Calculate size in MB with 2 decimal places
+        size_mb = round(file_info['size'] / (1024 * 1024), 2)
+        
+        return {
+            'filename': file_info['filename'],
+            'path': file_info['rel_path'],
+            'size_bytes': file_info['size'],
+            'size_mb': size_mb,
+            'error': file_info.get('error', '')
+        }
     
     def generate_tiff_metadata_report(self, scan_results, output_folder):
         """Generate CSV with comprehensive TIFF metadata"""
         output_file = os.path.join(output_folder, 'tiff_metadata_report.csv')
         
-        with open(output_file, 'w', newline='') as csvfile:
-            # Expanded fieldnames to include all the new metadata
-            fieldnames = [
-                'filename', 'path', 'size_mb', 'size_gb', 
-                'width', 'height', 'dpi_x', 'dpi_y',
-                'mode', 'photometric', 'bit_depth', 'bits_per_sample', 'samples_per_pixel',
-                'color_profile', 'compression', 'planar_config',
-                'tiff_version', 'is_bigtiff', 'is_tiled', 'tile_width', 'tile_height',
-                'software', 'datetime', 'xmp', 'exif', 'iptc'
-            ]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        with atomic_write(output_file, newline='') as csvfile, \
+                self._columnar_writer(output_folder, 'tiff_metadata_report',
+                                      self.tiff_columns) as columnar:
+            writer = csv.DictWriter(csvfile, fieldnames=list(self.tiff_columns))
             
             writer.writeheader()
             
             for file_info in scan_results['tiff_files']:
-                # Calculate sizes with 2 decimal places
-                size_mb = round(file_info['size'] / (1024 * 1024), 2)
-                size_gb = round(file_info['size'] / (1024 * 1024 * 1024), 2)
-                
-                # Prepare row with all metadata fields
-                row = {
-                    'filename': file_info['filename'],
-                    'path': file_info['rel_path'],
-                    'size_mb': size_mb,
-                    'size_gb': size_gb,
-                    'width': file_info.get('width', ''),
-                    'height': file_info.get('height', ''),
-                    'dpi_x': file_info.get('dpi_x', ''),
-                    'dpi_y': file_info.get('dpi_y', ''),
-                    'mode': file_info.get('mode', ''),
-                    'photometric': file_info.get('photometric', ''),
-                    'bit_depth': file_info.get('bit_depth', ''),
-                    'bits_per_sample': file_info.get('bits_per_sample', ''),
-                    'samples_per_pixel': file_info.get('samples_per_pixel', ''),
-                    'color_profile': file_info.get('color_profile', ''),
-                    'compression': file_info.get('compression', ''),
-                    'planar_config': file_info.get('planar_config', ''),
-                    'tiff_version': file_info.get('tiff_version', ''),
-                    'is_bigtiff': file_info.get('is_bigtiff', ''),
-                    'is_tiled': file_info.get('is_tiled', ''),
-                    'tile_width': file_info.get('tile_width', ''),
-                    'tile_height': file_info.get('tile_height', ''),
-                    'software': file_info.get('software', ''),
-                    'datetime': file_info.get('datetime', ''),
-                    'xmp': file_info.get('xmp', ''),
-                    'exif': file_info.get('exif', ''),
-                    'iptc': file_info.get('iptc', '')
-                }
-                
+                row = self._tiff_metadata_row(file_info)
                 writer.writerow(row)
-                
-    def generate_summary_report(self, scan_results, output_folder):
-        """Generate a summary report with preservation statistics"""
-        output_file = os.path.join(output_folder, 'preservation_summary.csv')
+                if columnar:
+                    columnar.writerow(row)
+    
+    def _tiff_metadata_row(self, file_info):
+        """Return the TIFF metadata report row for a metadata record"""
+        # Calculate sizes with 2 decimal places
+        size_mb = round(file_info['size'] / (1024 * 1024), 2)
+        size_gb = round(file_info['size'] / (1024 * 1024 * 1024), 2)
         
-        # Calculate summary statistics
-        total_tiff_files = len(scan_results['tiff_files'])
-        total_non_tiff_files = len(scan_results['non_tiff_files'])
-        total_folders = len(scan_results['folders'])
-        
-        # DPI statistics
-        dpi_counts = {'300+': 0, '200-299': 0, '100-199': 0, '<100': 0, 'Unknown': 0}
-        for file_info in scan_results['tiff_files']:
-            try:
-                dpi_x = float(file_info.get('dpi_x', 0))
-                dpi_y = float(file_info.get('dpi_y', 0))
-                
-                # Handle tuple DPI values if they still exist
-                if isinstance(dpi_x, tuple) and len(dpi_x) == 2:
-                    dpi_x = float(dpi_x[0]) / float(dpi_x[1])
-                if isinstance(dpi_y, tuple) and len(dpi_y) == 2:
-                    dpi_y = float(dpi_y[0]) / float(dpi_y[1])
-                
-                dpi = max(dpi_x, dpi_y)
+        # Prepare row with all metadata fields
+        row = {
+            'filename': file_info['filename'],
+            'path': file_info['rel_path'],
+            'size_mb': size_mb,
+            'size_gb': size_gb,
+            'width': file_info.get('width', ''),
+            'height': file_info.get('height', ''),
+            'dpi_x': file_info.get('dpi_x', ''),
+            'dpi_y': file_info.get('dpi_y', ''),
+            'mode': file_info.get('mode', ''),
+            'photometric': file_info.get('photometric', ''),
+            'bit_depth': file_info.get('bit_depth', ''),
+            'bits_per_sample': file_info.get('bits_per_sample', ''),
+            'samples_per_pixel': file_info.get('samples_per_pixel', ''),
+            'color_profile': file_info.get('color_profile', ''),
+            'compression': file_info.get('compression', ''),
+            'planar_config': file_info.get('planar_config', ''),
+            'tiff_version': file_info.get('tiff_version', ''),
+            'is_bigtiff': file_info.get('is_bigtiff', ''),
+            'is_tiled': file_info.get('is_tiled', ''),
+            'tile_width': file_info.get('tile_width', ''),
+            'tile_height': file_info.get('tile_height', ''),
+            'software': file_info.get('software', ''),
+            'datetime': file_info.get('datetime', ''),
+            'xmp': file_info.get('xmp', ''),
+            'exif': file_info.get('exif', ''),
+            'iptc': file_info.get('iptc', '')
+        }
+        
+        # Where the first bad strip or tile is, for files that failed
+        if self.deep_validation:
+            for column in PIXEL_CHECK_COLUMNS:
+                row[column] = file_info.get(column, '')
+        
+        if self.fingerprint:
+            row['pixel_fingerprint'] = file_info.get('pixel_fingerprint', '')
+        
+        return row
                 
-                if dpi >= 300:
-                    dpi_counts['300+'] += 1
-                elif dpi >= 200:
-                    dpi_counts['200-299'] += 1
-                elif dpi >= 100:
-                    dpi_counts['100-199'] += 1
-                elif dpi > 0:
-                    dpi_counts['<100'] += 1
-                else:
-                    dpi_counts['Unknown'] += 1
-            except (TypeError, ValueError):
-                # Handle any conversion errors
-                dpi_counts['Unknown'] += 1
-        
-        # Compression statistics
-        compression_counts = {}
-        for file_info in scan_results['tiff_files']:
-            compression = file_info.get('compression', 'Unknown')
-            if compression not in compression_counts:
-                compression_counts[compression] = 0
-            compression_counts[compression] += 1
-        
-        # Color profile statistics
-        profile_counts = {}
-        for file_info in scan_results['tiff_files']:
-            profile = file_info.get('color_profile', 'Unknown')
-            if profile not in profile_counts:
-                profile_counts[profile] = 0
-            profile_counts[profile] += 1
-        
-        # Bit depth statistics
-        bit_depth_counts = {}
-        for file_info in scan_results['tiff_files']:
-            try:
-                bit_depth = int(file_info.get('bit_depth', 0))
-                if bit_depth not in bit_depth_counts:
-                    bit_depth_counts[bit_depth] = 0
-                bit_depth_counts[bit_depth] += 1
-            except (TypeError, ValueError):
-                # Handle any conversion errors
-                if 'Unknown' not in bit_depth_counts:
-                    bit_depth_counts['Unknown'] = 0
-                bit_depth_counts['Unknown'] += 1
-        
-        # Calculate total size
-        total_size_bytes = sum(folder['total_size'] for folder in scan_results['folders'].values())
-        total_size_gb = round(total_size_bytes / (1024 * 1024 * 1024), 2)
+    def generate_duplicate_report(self, scan_results, output_folder):
+        """
+        Generate CSV grouping the TIFF files whose pixels are identical
+        
+        Returns:
+            (groups, files) tuple of the number of duplicate groups and the
+            files in them
+        """
+        with DuplicateIndex() as duplicates:
+            for file_info in scan_results['tiff_files']:
+                duplicates.add(file_info)
+            
+            self.write_duplicate_report(duplicates, output_folder)
+            return duplicates.counts()
+    
+    def write_duplicate_report(self, duplicates, output_folder):
+        """Write the duplicate group report from a DuplicateIndex"""
+        output_file = os.path.join(output_folder, 'duplicate_groups.csv')
+        
+        with atomic_write(output_file, newline='') as csvfile, \
+                self._columnar_writer(output_folder, 'duplicate_groups',
+                                      DUPLICATE_GROUP_COLUMNS) as columnar:
+            writer = csv.DictWriter(csvfile, fieldnames=DUPLICATE_GROUP_FIELDNAMES)
+            
+            writer.writeheader()
+            
+            # One row per file, numbered by group
+            for group, (fingerprint, images) in enumerate(duplicates.groups(), 1):
+                for path, size, compression, width, height in images:
+                    row = {
+                        'group': group,
+                        'copies': len(images),
+                        'pixel_fingerprint': fingerprint,
+                        'filename': os.path.basename(path),
+                        'path': path,
+                        'size_mb': round(size / (1024 * 1024), 2) if size is not None else '',
+                        'compression': compression or '',
+                        'width': width if width is not None else '',
+                        'height': height if height is not None else ''
+                    }
+                    writer.writerow(row)
+                    if columnar:
+                        columnar.writerow(row)
+    
+    def _columnar_writer(self, output_folder, report_name, columns):
+        """
+        Return a ColumnarReportWriter for a report, to be used as a context
+        manager alongside its CSV, or a null context if columnar output is off
+        """
+        if self.columnar_format is None:
+            return contextlib.nullcontext()
+        
+        output_file = os.path.join(output_folder, report_name + COLUMNAR_FORMATS[self.columnar_format])
+        return ColumnarReportWriter(output_file, columns, self.columnar_format)
+    
+    def generate_summary_report(self, scan_results, output_folder, duplicates=None):
+        """
+        Generate a summary report with preservation statistics
+        
+        Args:
+            duplicates: (groups, files) tuple from generate_duplicate_report
+        """
+        from controllers.statistics import SummaryStatistics
+        
+        statistics = SummaryStatistics.from_results(scan_results)
+        if duplicates:
+            statistics.add_duplicates(*duplicates)
+        self.write_summary_report(statistics, output_folder)
+    
+    def write_summary_report(self, statistics, output_folder):
+        """Write the preservation summary report from SummaryStatistics"""
+        output_file = os.path.join(output_folder, 'preservation_summary.csv')
         
         # Write the summary
-        with open(output_file, 'w', newline='') as csvfile:
+        with atomic_write(output_file, newline='') as csvfile:
             writer = csv.writer(csvfile)
             
             # Basic statistics
             writer.writerow(['Digital Preservation Summary'])
             writer.writerow([])
             writer.writerow(['File Statistics', ''])
-            writer.writerow(['Total TIFF Files', total_tiff_files])
-            writer.writerow(['Total Non-TIFF Files', total_non_tiff_files])
-            writer.writerow(['Total Folders', total_folders])
-            writer.writerow(['Total Size (GB)', total_size_gb])
+            writer.writerow(['Total TIFF Files', statistics.total_tiff_files])
+            writer.writerow(['Total Non-TIFF Files', statistics.total_non_tiff_files])
+            writer.writerow(['Total Folders', statistics.total_folders])
+            writer.writerow(['Total Size (GB)', statistics.total_size_gb])
             writer.writerow([])
             
             # DPI Distribution
             writer.writerow(['DPI Distribution', ''])
-            for dpi_range, count in dpi_counts.items():
-                percentage = round((count / total_tiff_files * 100), 2) if total_tiff_files > 0 else 0
+            for dpi_range, count in statistics.dpi_counts.items():
+                percentage = statistics.percentage(count, 2)
                 writer.writerow([f"{dpi_range} DPI", f"{count} ({percentage}%)"])
             writer.writerow([])
             
             # Compression Distribution
             writer.writerow(['Compression Distribution', ''])
-            for compression, count in compression_counts.items():
-                percentage = round((count / total_tiff_files * 100), 2) if total_tiff_files > 0 else 0
+            for compression, count in statistics.compression_counts.items():
+                percentage = statistics.percentage(count, 2)
                 writer.writerow([compression, f"{count} ({percentage}%)"])
             writer.writerow([])
             
             # Color Profile Distribution
             writer.writerow(['Color Profile Distribution', ''])
-            for profile, count in profile_counts.items():
-                percentage = round((count / total_tiff_files * 100), 2) if total_tiff_files > 0 else 0
+            for profile, count in statistics.profile_counts.items():
+                percentage = statistics.percentage(count, 2)
                 writer.writerow([profile, f"{count} ({percentage}%)"])
             writer.writerow([])
             
             # Bit Depth Distribution
             writer.writerow(['Bit Depth Distribution', ''])
-            for bit_depth, count in bit_depth_counts.items():
-                percentage = round((count / total_tiff_files * 100), 2) if total_tiff_files > 0 else 0
+            for bit_depth, count in statistics.bit_depth_counts.items():
+                percentage = statistics.percentage(count, 2)
                 writer.writerow([str(bit_depth) + " bit", f"{count} ({percentage}%)"])
             
+            # Pixel validation results
+            if self.deep_validation:
+                writer.writerow([])
+                writer.writerow(['Pixel Validation', ''])
+                for result, count in statistics.pixel_check_counts.items():
+                    percentage = statistics.percentage(count, 2)
+                    writer.writerow([result, f"{count} ({percentage}%)"])
+            
+            # Identical images saved as different files
+            if self.fingerprint:
+                writer.writerow([])
+                writer.writerow(['Duplicate Images', ''])
+                writer.writerow(['Duplicate Groups', statistics.duplicate_groups])
+                writer.writerow(['Files in Duplicate Groups', statistics.duplicate_files])
+            
             # Add timestamp
             writer.writerow([])
             writer.writerow(['Report generated', datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
\ No newline at end of file
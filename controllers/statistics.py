@@ -0,0 +1,206 @@
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from models.tiff_metadata import TiffRecord
+
+# DPI buckets, highest first, and their lower bounds
+DPI_RANGES = ['300+', '200-299', '100-199', '<100', 'Unknown']
+DPI_LOWER_BOUNDS = [300, 200, 100]
+
+
+class SummaryStatistics:
+    """
+    Collection statistics for the summary reports
+
+    Records can be added one at a time while a scan is still streaming.
+    They are buffered, and every distribution is computed from a batch at
+    once: each field is read into a column in one pass and counted with
+    numpy/pandas, so no per-record Python code runs beyond the append.
+
+    Distributions are kept in the order their values were first seen.
+    """
+
+    batch_size = 16384
+
+    def __init__(self):
+        self.total_tiff_files = 0
+        self.total_non_tiff_files = 0
+        self._dpi_counts = dict.fromkeys(DPI_RANGES, 0)
+        self._compression_counts = {}
+        self._profile_counts = {}
+        self._bit_depth_counts = {}
+        self._pixel_check_counts = {}
+
+        # TIFF records not yet counted
+        self._batch = []
+
+        # Folder statistics, filled in by add_folders once a scan is complete
+        self.total_folders = 0
+        self.asset_folders = 0
+        self.total_size_bytes = 0
+
+        # Identical images, filled in by add_duplicates for fingerprinted scans
+        self.duplicate_groups = 0
+        self.duplicate_files = 0
+
+    @classmethod
+    def from_results(cls, scan_results):
+        """Compute the statistics of a completed Scanner.results dict"""
+        statistics = cls()
+        statistics.add_tiffs(scan_results['tiff_files'])
+        statistics.total_non_tiff_files = len(scan_results['non_tiff_files'])
+        statistics.add_folders(scan_results['folders'])
+        return statistics
+
+    def add_tiff(self, file_info):
+        """Count one TIFF metadata record"""
+        self.total_tiff_files += 1
+        self._batch.append(file_info)
+        if len(self._batch) >= self.batch_size:
+            self._count_batch()
+
+    def add_tiffs(self, records):
+        """Count a list of TIFF metadata records in one batch"""
+        self._count_batch()
+        self.total_tiff_files += len(records)
+        self._batch = list(records)
+        self._count_batch()
+
+    def add_non_tiff(self, file_info):
+        """Count one non-TIFF file record"""
+        self.total_non_tiff_files += 1
+
+    def add_folders(self, folders):
+        """Take the folder totals from Scanner.results['folders']"""
+        self.total_folders = len(folders)
+        self.asset_folders = sum(1 for folder in folders.values() if folder['tiff_count'] > 0)
+        self.total_size_bytes = sum(folder['total_size'] for folder in folders.values())
+
+    def add_duplicates(self, groups, files):
+        """Take the duplicate counts from a DuplicateIndex"""
+        self.duplicate_groups = groups
+        self.duplicate_files = files
+
+    @property
+    def dpi_counts(self):
+        """Files per DPI range, from the larger of each file's resolutions"""
+        self._count_batch()
+        return self._dpi_counts
+
+    @property
+    def compression_counts(self):
+        self._count_batch()
+        return self._compression_counts
+
+    @property
+    def profile_counts(self):
+        self._count_batch()
+        return self._profile_counts
+
+    @property
+    def bit_depth_counts(self):
+        """Files per bit depth, with 'Unknown' for values that aren't numbers"""
+        self._count_batch()
+        return self._bit_depth_counts
+
+    @property
+    def pixel_check_counts(self):
+        """Files per pixel validation result, for records from a deep scan"""
+        self._count_batch()
+        return {result: count for result, count in self._pixel_check_counts.items()
+                if result is not None}
+
+    @property
+    def total_size_gb(self):
+        return round(self.total_size_bytes / (1024 * 1024 * 1024), 2)
+
+    @property
+    def avg_file_size_mb(self):
+        if self.total_tiff_files == 0:
+            return 0
+        return round((self.total_size_bytes / self.total_tiff_files) / (1024 * 1024), 2)
+
+    def percentage(self, count, digits):
+        """Return count as a percentage of the TIFF files, rounded to digits"""
+        if self.total_tiff_files == 0:
+            return 0
+        return round((count / self.total_tiff_files * 100), digits)
+
+    def _count_batch(self):
+        """Add the buffered records to the distributions"""
+        if not self._batch:
+            return
+
+        dpi_x, dpi_y, compression, profile, bit_depth, pixel_check = _columns(self._batch, (
+            ('dpi_x', 0),
+            ('dpi_y', 0),
+            ('compression', 'Unknown'),
+            ('color_profile', 'Unknown'),
+            ('bit_depth', 0),
+            ('pixel_check', None)
+        ))
+        self._batch = []
+
+        # DPI - anything that isn't a number (or is NaN) on either axis is Unknown
+        dpi = np.maximum(_to_numbers(dpi_x), _to_numbers(dpi_y))
+        ranges = np.full(len(dpi), len(DPI_RANGES) - 1)
+        ranges[dpi > 0] = len(DPI_LOWER_BOUNDS)
+        for index in reversed(range(len(DPI_LOWER_BOUNDS))):
+            ranges[dpi >= DPI_LOWER_BOUNDS[index]] = index
+        for dpi_range, count in zip(DPI_RANGES, np.bincount(ranges, minlength=len(DPI_RANGES))):
+            self._dpi_counts[dpi_range] += int(count)
+
+        _count_values(self._compression_counts, compression)
+        _count_values(self._profile_counts, profile)
+        _count_values(self._pixel_check_counts, pixel_check)
+
+        # Bit depth - whole numbers, with infinity standing in for Unknown
+        depths = np.trunc(_to_numbers(bit_depth))
+        depths[~np.isfinite(depths)] = np.inf
+        codes, uniques = pd.factorize(depths)
+        for value, count in zip(uniques, np.bincount(codes, minlength=len(uniques))):
+            key = int(value) if np.isfinite(value) else 'Unknown'
+            self._bit_depth_counts[key] = self._bit_depth_counts.get(key, 0) + int(count)
+
+
+def _columns(records, fields):
+    """Read each (key, default) field of every record into a list"""
+    record_types = set(map(type, records))
+
+    # Batches of one kind are read without a Python-level loop
+    if record_types == {TiffRecord}:
+        getter = getattr
+    elif record_types == {dict}:
+        getter = dict.get
+    else:
+        return [[record.get(key, default) for record in records] for key, default in fields]
+
+    return [list(map(getter, records, repeat(key), repeat(default))) for key, default in fields]
+
+
+def _to_numbers(values):
+    """Convert a column to float64, with NaN for anything that isn't a number"""
+    try:
+        return np.fromiter(values, dtype=np.float64, count=len(values))
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _count_values(counts, values):
+    """Add the number of times each value occurs to counts, in order of appearance"""
+    codes, uniques = pd.factorize(np.array(values, dtype=object))
+
+    # factorize skips missing values, but a plain dict would count None too
+    if (codes < 0).any():
+        values = [_MISSING if value is None else value for value in values]
+        codes, uniques = pd.factorize(np.array(values, dtype=object))
+
+    for value, count in zip(uniques, np.bincount(codes[codes >= 0], minlength=len(uniques))):
+        value = None if value is _MISSING else value
+        counts[value] = counts.get(value, 0) + int(count)
+
+
+# Stand-in for None while counting values
+_MISSING = object()
@@ -0,0 +1,193 @@
+import os
+import struct
+
+
+class TiffHeaderError(Exception):
+    """Raised when a file isn't a TIFF that read_first_ifd can handle"""
+
+
+# TIFF field type -> (struct format of one value, size in bytes, values per item)
+FIELD_TYPES = {
+    1: ('B', 1, 1),   # BYTE
+    2: ('s', 1, 1),   # ASCII
+    3: ('H', 2, 1),   # SHORT
+    4: ('I', 4, 1),   # LONG
+    5: ('I', 8, 2),   # RATIONAL
+    6: ('b', 1, 1),   # SBYTE
+    7: ('B', 1, 1),   # UNDEFINED
+    8: ('h', 2, 1),   # SSHORT
+    9: ('i', 4, 1),   # SLONG
+    10: ('i', 8, 2),  # SRATIONAL
+    11: ('f', 4, 1),  # FLOAT
+    12: ('d', 8, 1),  # DOUBLE
+    13: ('I', 4, 1),  # IFD
+    16: ('Q', 8, 1),  # LONG8
+    17: ('q', 8, 1),  # SLONG8
+    18: ('Q', 8, 1),  # IFD8
+}
+
+# Limits that keep a corrupt header from turning into huge reads
+MAX_ENTRIES = 4096
+MAX_VALUE_BYTES = 64 * 1024
+
+
+class TiffHeader:
+    """
+    The header and first IFD of a TIFF file
+
+    tags maps every tag code in the IFD to its value: a str for ASCII tags,
+    otherwise a tuple (of (numerator, denominator) pairs for rationals).
+    Tags that weren't asked for are present with a value of None, so their
+    presence can still be checked without reading them. types maps the
+    codes of the tags that were read to their TIFF field types.
+    """
+
+    __slots__ = ('byteorder', 'version', 'tags', 'types')
+
+    def __init__(self, byteorder, version, tags, types):
+        self.byteorder = byteorder
+        self.version = version
+        self.tags = tags
+        self.types = types
+
+    @property
+    def is_bigtiff(self):
+        return self.version == 43
+
+    def first(self, code, default=None):
+        """Return the first value of a tag, or default if it's missing"""
+        value = self.tags.get(code)
+        if not value:
+            return default
+        return value[0]
+
+
+def read_first_ifd(file_path, wanted):
+    """
+    Read the header and first IFD of a classic or BigTIFF file
+
+    Only the header, the IFD's entries and the out-of-line values of the
+    wanted tags are read, so the cost doesn't depend on the size of the
+    file or on how many pages it has.
+
+    Args:
+        file_path: Path to the TIFF file
+        wanted: Collection of tag codes whose values should be decoded
+
+    Returns:
+        TiffHeader
+
+    Raises:
+        TiffHeaderError: If the file isn't a well-formed TIFF, including any
+                         offset or value that would lie past its end
+    """
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        header = f.read(16)
+
+        if header[:2] == b'II':
+            byteorder = '<'
+        elif header[:2] == b'MM':
+            byteorder = '>'
+        else:
+            raise TiffHeaderError("Not a TIFF file")
+
+        if len(header) < 8:
+            raise TiffHeaderError("Truncated header")
+
+        version = struct.unpack(byteorder + 'H', header[2:4])[0]
+        if version == 42:
+            ifd_offset = struct.unpack(byteorder + 'I', header[4:8])[0]
+            count_format, entry_format, offset_format = 'H', 'HHI4s', 'I'
+        elif version == 43:
+            if len(header) < 16:
+                raise TiffHeaderError("Truncated header")
+            offset_size, reserved = struct.unpack(byteorder + 'HH', header[4:8])
+            if offset_size != 8 or reserved != 0:
+                raise TiffHeaderError("Unsupported BigTIFF offset size")
+            ifd_offset = struct.unpack(byteorder + 'Q', header[8:16])[0]
+            count_format, entry_format, offset_format = 'Q', 'HHQ8s', 'Q'
+        else:
+            raise TiffHeaderError(f"Unknown TIFF version {version}")
+
+        if ifd_offset == 0:
+            raise TiffHeaderError("No image file directory")
+
+        # Entry count, then all the entries in one read
+        count_size = struct.calcsize(count_format)
+        if ifd_offset + count_size > file_size:
+            raise TiffHeaderError("Image file directory is past the end of the file")
+        f.seek(ifd_offset)
+        data = f.read(count_size)
+        if len(data) < count_size:
+            raise TiffHeaderError("Truncated image file directory")
+
+        entry_count = struct.unpack(byteorder + count_format, data)[0]
+        if entry_count == 0 or entry_count > MAX_ENTRIES:
+            raise TiffHeaderError(f"Implausible number of tags ({entry_count})")
+
+        entry_size = struct.calcsize(byteorder + entry_format)
+        if ifd_offset + count_size + entry_count * entry_size > file_size:
+            raise TiffHeaderError("Truncated image file directory")
+        data = f.read(entry_count * entry_size)
+        if len(data) < entry_count * entry_size:
+            raise TiffHeaderError("Truncated image file directory")
+
+        tags = {}
+        types = {}
+        for code, field_type, count, value_field in struct.iter_unpack(byteorder + entry_format, data):
+            # Every entry is checked, read or not, as a full parser would drop
+            # a tag it couldn't read rather than report it as present
+            if field_type not in FIELD_TYPES:
+                raise TiffHeaderError(f"Unknown field type {field_type} for tag {code}")
+
+            value_format, item_size, per_item = FIELD_TYPES[field_type]
+            size = count * item_size
+            if size > file_size:
+                raise TiffHeaderError(f"Tag {code} is implausibly large")
+
+            # Values that fit in the entry are stored in it, others at an offset
+            value_offset = None
+            if size > len(value_field):
+                value_offset = struct.unpack(byteorder + offset_format, value_field)[0]
+                if value_offset + size > file_size:
+                    raise TiffHeaderError(f"Value of tag {code} is past the end of the file")
+
+            if code not in wanted:
+                tags[code] = None
+                continue
+
+            if size > MAX_VALUE_BYTES:
+                raise TiffHeaderError(f"Tag {code} is implausibly large")
+
+            if value_offset is None:
+                raw = value_field[:size]
+            else:
+                f.seek(value_offset)
+                raw = f.read(size)
+                if len(raw) < size:
+                    raise TiffHeaderError(f"Value of tag {code} is past the end of the file")
+
+            tags[code] = _decode_value(byteorder, field_type, value_format, count * per_item, raw)
+            types[code] = field_type
+
+    return TiffHeader(byteorder, version, tags, types)
+
+
+def _decode_value(byteorder, field_type, value_format, value_count, raw):
+    """Convert the raw bytes of a tag to a str or tuple"""
+    if field_type == 2:
+        # ASCII - NUL terminated, though not always
+        text = raw.split(b'\0', 1)[0]
+        try:
+            return text.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            return text.decode('latin-1').strip()
+
+    try:
+        values = struct.unpack(f"{byteorder}{value_count}{value_format}", raw)
+    except struct.error as e:
+        raise TiffHeaderError(f"Malformed tag value: {e}") from e
+    if field_type in (5, 10):
+        return tuple(zip(values[0::2], values[1::2]))
+    return values
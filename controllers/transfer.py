@@ -1,14 +1,62 @@
 import os
+import sys
+import errno
 import shutil
 import hashlib
 import time
 import logging
+import queue
+import threading
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.buffers import BUFFER_POOL
+from controllers.cancellation import OperationCancelled
+from controllers.hashing import FileHasher
+from controllers.inventory import FileInventory
+from controllers.journal import TransferJournal
+from controllers.parallel import unordered_map
+
+# Errors meaning a kernel-side copy can't be used between two files
+ZERO_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EBADF}
+if hasattr(errno, 'ENOTSUP'):
+    ZERO_COPY_UNSUPPORTED.add(errno.ENOTSUP)
 
 class FileTransferManager:
-    def __init__(self):
+    def __init__(self, workers=1, queue_depth=2, copy_mode='auto', sync_mode='journal',
+                 cancel_token=None):
+        """
+        Args:
+            workers: Number of files transferred at the same time
+            queue_depth: Buffers a file's reader may get ahead of its writer
+            copy_mode: 'auto' copies in the kernel (copy_file_range/sendfile)
+                       where the OS and filesystems allow it and falls back
+                       to buffered copying otherwise; 'buffered' always
+                       copies through Python buffers
+            sync_mode: How files already at the destination are recognised
+                       and skipped: 'journal' skips files this destination's
+                       journal recorded as verified; 'size_mtime' also skips
+                       files whose destination has the source's size and
+                       modification time; 'manifest' hashes each source and
+                       skips it if the digest matches the one the journal
+                       recorded for its (unmodified) destination
+            cancel_token: Optional CancellationToken checked between files and
+                          buffers. Cancelling raises OperationCancelled once
+                          the files in flight have been abandoned.
+        """
         self.buffer_size = 16 * 1024 * 1024  # 16MB buffer
+        self.buffer_pool = BUFFER_POOL  # Where copy and hash buffers come from
+        self.file_hasher = FileHasher(buffer_pool=self.buffer_pool)  # Reads files for verification
         self.max_retries = 3
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.copy_mode = copy_mode
+        self.sync_mode = sync_mode
+        self.cancel_token = cancel_token
+        self.checkpoint_interval = 256 * 1024 * 1024  # Journal large files every 256MB
+        
+        # Journal of verified files and checkpoints, under the destination's logs
+        self.journal = None
         
         # Set up logging
         self.log_file = None
@@ -18,16 +66,26 @@ class FileTransferManager:
     def transfer_files(self, source_path, dest_path, 
                       overall_progress_callback=None,
                       file_progress_callback=None,
-                      status_callback=None):
+                      status_callback=None,
+                      count_callback=None):
         """
         Transfer files from source to destination with integrity verification
         
+        Files already at the destination are skipped according to sync_mode,
+        and large files that were partly copied resume from their last
+        checkpoint. Copied files keep the source's modification time.
+        
+        If the transfer is cancelled, OperationCancelled is raised. Verified
+        files stay recorded in the journal; a file cut off mid-copy is removed,
+        unless it was checkpointed, in which case the next transfer resumes it.
+        
         Args:
             source_path: Source directory
             dest_path: Destination directory
             overall_progress_callback: Function for overall progress updates
             file_progress_callback: Function for current file progress updates
             status_callback: Function for status message updates
+            count_callback: Function called with (files, bytes) copied
             
         Returns:
             Dictionary with transfer statistics
@@ -43,7 +101,10 @@ class FileTransferManager:
             'total_size': 0,  # in bytes
             'total_size_mb': 0,  # in MB
             'errors': 0,
-            'retries': 0
+            'retries': 0,
+            'files_skipped': 0,
+            'bytes_skipped': 0,
+            'bytes_copied': 0
         }
         
         # Get file list with sizes
@@ -53,23 +114,23 @@ class FileTransferManager:
         if status_callback:
             status_callback("Scanning source directory...")
         
-        for root, _, files in os.walk(source_path):
-            for filename in files:
-                file_path = os.path.join(root, filename)
-                rel_path = os.path.relpath(file_path, source_path)
-                
-                try:
-                    file_size = os.path.getsize(file_path)
-                    files_to_transfer.append({
-                        'source': file_path,
-                        'destination': os.path.join(dest_path, rel_path),
-                        'rel_path': rel_path,
-                        'size': file_size
-                    })
-                    total_size += file_size
-                except Exception as e:
-                    self.logger.error(f"Error getting size for {file_path}: {str(e)}")
-                    results['errors'] += 1
+        for entry in FileInventory(source_path, self.cancel_token).files():
+            file_path = entry.path
+            rel_path = os.path.relpath(file_path, source_path)
+            
+            try:
+                file_size = entry.get_size()
+                files_to_transfer.append({
+                    'source': file_path,
+                    'destination': os.path.join(dest_path, rel_path),
+                    'rel_path': rel_path,
+                    'size': file_size,
+                    'mtime_ns': entry.mtime_ns
+                })
+                total_size += file_size
+            except Exception as e:
+                self.logger.error(f"Error getting size for {file_path}: {str(e)}")
+                results['errors'] += 1
         
         if len(files_to_transfer) == 0:
             message = "No files found to transfer"
@@ -78,6 +139,60 @@ class FileTransferManager:
             self.logger.info(message)
             return results
         
+        self.journal = TransferJournal(os.path.join(dest_path, 'logs', 'transfer_journal.jsonl'))
+        try:
+            self._transfer_with_journal(dest_path, source_path, files_to_transfer, total_size, results,
+                                        overall_progress_callback, file_progress_callback,
+                                        status_callback, count_callback)
+        except OperationCancelled:
+            self.logger.info(f"Transfer cancelled after {results['files_transferred']} files")
+            raise
+        finally:
+            self.journal.close()
+            self.journal = None
+        
+        # Finalize results
+        results['end_time'] = datetime.now()
+        results['duration'] = (results['end_time'] - results['start_time']).total_seconds()
+        results['total_size_mb'] = results['total_size'] / (1024 * 1024)
+        
+        # Final log
+        self.logger.info(f"Transfer complete: {results['files_transferred']} files, "
+                         f"{results['total_size_mb']:.2f} MB, {results['errors']} errors, "
+                         f"{results['files_skipped']} unchanged files "
+                         f"({results['bytes_skipped'] / (1024 * 1024):.2f} MB) skipped")
+        
+        # Final status update
+        if status_callback:
+            status_callback(f"Transfer complete: {results['files_transferred']} files transferred")
+        
+        return results
+    
+    def _transfer_with_journal(self, dest_path, source_path, files_to_transfer, total_size, results,
+                               overall_progress_callback=None, file_progress_callback=None,
+                               status_callback=None, count_callback=None):
+        """Skip files that are unchanged at the destination and transfer the rest"""
+        if self.sync_mode == 'manifest' and status_callback:
+            status_callback("Comparing source files with the transfer journal...")
+        
+        remaining = []
+        for file_info in files_to_transfer:
+            self._checkpoint()
+            if self._is_unchanged(file_info):
+                results['files_skipped'] += 1
+                results['bytes_skipped'] += file_info['size']
+                total_size -= file_info['size']
+            else:
+                remaining.append(file_info)
+        
+        if results['files_skipped']:
+            message = (f"Skipping {results['files_skipped']} unchanged files "
+                       f"({results['bytes_skipped'] / (1024*1024):.2f} MB)")
+            if status_callback:
+                status_callback(message)
+            self.logger.info(message)
+        files_to_transfer = remaining
+        
         # Create destination directories as needed
         self._create_destination_dirs(source_path, dest_path, files_to_transfer)
         
@@ -85,6 +200,89 @@ class FileTransferManager:
         if status_callback:
             status_callback(f"Transferring {len(files_to_transfer)} files ({total_size / (1024*1024):.2f} MB)")
         
+        if self.workers > 1:
+            self._transfer_concurrently(files_to_transfer, total_size, results,
+                                        overall_progress_callback, file_progress_callback,
+                                        status_callback, count_callback)
+        else:
+            self._transfer_sequentially(files_to_transfer, total_size, results,
+                                        overall_progress_callback, file_progress_callback,
+                                        status_callback, count_callback)
+    
+    def _is_unchanged(self, file_info):
+        """Return True if file_info's destination already matches its source"""
+        if self.sync_mode == 'manifest':
+            return self._matches_manifest(file_info)
+        
+        if self._already_verified(file_info):
+            return True
+        
+        if self.sync_mode == 'size_mtime':
+            try:
+                dest_stat = os.stat(file_info['destination'])
+            except OSError:
+                return False
+            return (dest_stat.st_size == file_info['size']
+                    and dest_stat.st_mtime_ns == file_info['mtime_ns'])
+        
+        return False
+    
+    def _matches_manifest(self, file_info):
+        """
+        Return True if the source hashes to the digest the journal recorded
+        for its destination, and the destination hasn't changed since
+        
+        The source's mtime isn't trusted either way: a touched but identical
+        file is skipped (and re-recorded so later runs needn't hash it), and
+        a modified file with its old size and mtime is still copied.
+        """
+        entry = self.journal.verified_entry(file_info['rel_path'], file_info['size'])
+        if entry is None:
+            return False
+        
+        try:
+            dest_stat = os.stat(file_info['destination'])
+        except OSError:
+            return False
+        
+        if (dest_stat.st_size != entry['dest_size']
+                or dest_stat.st_mtime_ns != entry['dest_mtime_ns']):
+            return False
+        
+        try:
+            source_checksum = self._calculate_checksum(file_info['source'])
+        except OSError as e:
+            self.logger.error(f"Error reading {file_info['source']}: {str(e)}")
+            return False
+        
+        if source_checksum != entry['sha256']:
+            return False
+        
+        if entry['mtime_ns'] != file_info['mtime_ns']:
+            self.journal.record_verified(file_info['rel_path'], file_info['size'],
+                                         file_info['mtime_ns'], source_checksum,
+                                         dest_stat.st_size, dest_stat.st_mtime_ns)
+        return True
+    
+    def _already_verified(self, file_info):
+        """Return True if the journal shows this exact file was verified at its destination"""
+        entry = self.journal.verified_entry(file_info['rel_path'], file_info['size'],
+                                            file_info['mtime_ns'])
+        if entry is None:
+            return False
+        
+        try:
+            dest_stat = os.stat(file_info['destination'])
+        except OSError:
+            return False
+        
+        return (dest_stat.st_size == entry['dest_size']
+                and dest_stat.st_mtime_ns == entry['dest_mtime_ns'])
+    
+    def _transfer_sequentially(self, files_to_transfer, total_size, results,
+                               overall_progress_callback=None, file_progress_callback=None,
+                               status_callback=None, count_callback=None):
+        """Transfer files one at a time, in order"""
         # Track progress
         transferred_size = 0
         
@@ -107,60 +305,132 @@ class FileTransferManager:
                 source_file, 
                 dest_file, 
                 file_size,
-                file_progress_callback
+                file_progress_callback,
+                rel_path=rel_path,
+                mtime_ns=file_info['mtime_ns'],
+                count_callback=count_callback
             )
             
             # Update statistics
             if success:
                 results['files_transferred'] += 1
                 results['total_size'] += file_size
+                results['bytes_copied'] += file_size
                 results['retries'] += retries
+                if count_callback:
+                    count_callback(1, 0)
             else:
                 results['errors'] += 1
             
             # Update overall progress
             transferred_size += file_size
             if overall_progress_callback:
-                progress = int((transferred_size / total_size) * 100)
+                progress = int((transferred_size / total_size) * 100) if total_size > 0 else 100
                 overall_progress_callback(progress)
+    
+    def _transfer_concurrently(self, files_to_transfer, total_size, results,
+                               overall_progress_callback=None, file_progress_callback=None,
+                               status_callback=None, count_callback=None):
+        """
+        Transfer up to self.workers files at a time
         
-        # Finalize results
-        results['end_time'] = datetime.now()
-        results['duration'] = (results['end_time'] - results['start_time']).total_seconds()
-        results['total_size_mb'] = results['total_size'] / (1024 * 1024)
-        
-        # Final log
-        self.logger.info(f"Transfer complete: {results['files_transferred']} files, "
-                         f"{results['total_size_mb']:.2f} MB, {results['errors']} errors")
+        Each file keeps its own retry loop. Overall progress counts the bytes
+        of finished and in-flight files; file progress covers all the files
+        currently in flight, as if they were one.
+        """
+        progress = TransferProgress(total_size, overall_progress_callback, file_progress_callback)
         
-        # Final status update
-        if status_callback:
-            status_callback(f"Transfer complete: {results['files_transferred']} files transferred")
+        def transfer(file_info):
+            rel_path = file_info['rel_path']
+            file_size = file_info['size']
+            
+            # Update status
+            if status_callback:
+                status_callback(f"Copying: {rel_path} ({file_size / (1024*1024):.2f} MB)")
+            
+            # Ensure destination directory exists
+            os.makedirs(os.path.dirname(file_info['destination']), exist_ok=True)
+            
+            progress.start(rel_path, file_size)
+            try:
+                return self._transfer_file_with_verification(
+                    file_info['source'],
+                    file_info['destination'],
+                    file_size,
+                    lambda value: progress.update(rel_path, value),
+                    rel_path=rel_path,
+                    mtime_ns=file_info['mtime_ns'],
+                    count_callback=count_callback
+                )
+            finally:
+                progress.finish(rel_path)
         
-        return results
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for file_info, (success, retries) in unordered_map(executor, transfer, files_to_transfer,
+                                                               max_pending=self.workers * 2):
+                # Update statistics
+                if success:
+                    results['files_transferred'] += 1
+                    results['total_size'] += file_info['size']
+                    results['bytes_copied'] += file_info['size']
+                    results['retries'] += retries
+                    if count_callback:
+                        count_callback(1, 0)
+                else:
+                    results['errors'] += 1
     
     def _transfer_file_with_verification(self, source_file, dest_file, file_size,
-                                        file_progress_callback=None):
+                                        file_progress_callback=None, rel_path=None, mtime_ns=None,
+                                        count_callback=None):
         """
         Transfer a single file with checksum verification and retry logic
         
+        When a journal is open and rel_path/mtime_ns identify the source, large
+        files are checkpointed as they are written, the first attempt resumes
+        from the last checkpoint, and verified files are recorded. Bytes are
+        passed to count_callback as they are copied.
+        
         Returns:
             (success, retries) tuple
         """
         retries = 0
         max_retries = self.max_retries
         
+        journaled = self.journal is not None and rel_path is not None
+        checkpoint = None
+        resume = None
+        if journaled:
+            if file_size >= self.checkpoint_interval:
+                def checkpoint(offset, hasher):
+                    self.journal.record_checkpoint(rel_path, file_size, mtime_ns,
+                                                   offset, hasher.hexdigest())
+            resume = self._resume_point(source_file, dest_file, rel_path, file_size, mtime_ns)
+        
         while retries <= max_retries:
+            # Only the first attempt resumes; retries start from byte zero
+            attempt_resume, resume = resume, None
+            
             try:
-                # Copy the file with progress updates
-                self._copy_with_progress(source_file, dest_file, file_size, file_progress_callback)
+                self._checkpoint()
+                
+                # Copy the file with progress updates, hashing the source as it's read
+                source_checksum = self._copy_with_progress(source_file, dest_file, file_size,
+                                                           file_progress_callback,
+                                                           resume=attempt_resume,
+                                                           checkpoint=checkpoint,
+                                                           count_callback=count_callback)
                 
-                # Verify the file integrity
-                source_checksum = self._calculate_checksum(source_file)
-                dest_checksum = self._calculate_checksum(dest_file)
+                # Verify the file integrity against what actually reached the disk
+                dest_checksum = self._calculate_checksum(dest_file, drop_cache=True)
                 
                 if source_checksum == dest_checksum:
-                    # Transfer succeeded
+                    # Transfer succeeded - keep the source's modification time
+                    if mtime_ns is not None:
+                        os.utime(dest_file, ns=(os.stat(dest_file).st_atime_ns, mtime_ns))
+                    if journaled:
+                        dest_stat = os.stat(dest_file)
+                        self.journal.record_verified(rel_path, file_size, mtime_ns, source_checksum,
+                                                     dest_stat.st_size, dest_stat.st_mtime_ns)
                     if retries > 0:
                         self.logger.info(f"Transfer of {dest_file} succeeded after {retries} retries")
                     return True, retries
@@ -182,6 +452,13 @@ class FileTransferManager:
                 # Wait briefly before retry
                 time.sleep(1)
                 
+            except OperationCancelled:
+                # Don't leave an unverified copy that looks complete; a
+                # checkpointed one is kept for the next transfer to resume
+                if checkpoint is None and os.path.exists(dest_file):
+                    os.remove(dest_file)
+                raise
+                
             except Exception as e:
                 retries += 1
                 self.logger.error(f"Error transferring {source_file} to {dest_file}: {str(e)}")
@@ -195,35 +472,279 @@ class FileTransferManager:
         
         return False, retries
     
-    def _copy_with_progress(self, source_file, dest_file, file_size, progress_callback=None):
-        """Copy a file with progress updates"""
-        copied_size = 0
-        
-        with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
-            while True:
-                buffer = src.read(self.buffer_size)
-                if not buffer:
+    def _resume_point(self, source_file, dest_file, rel_path, file_size, mtime_ns):
+        """
+        Find where a partial copy of this file can continue from
+        
+        The source is re-read up to the journal's last checkpoint to rebuild
+        the running SHA256, which also proves those bytes are the ones that
+        were copied. The destination's prefix isn't re-read here; the full
+        verification after the copy catches any damage to it.
+        
+        Returns:
+            (offset, hasher) tuple, or None to copy from the start
+        """
+        entry = self.journal.checkpoint_entry(rel_path, file_size, mtime_ns)
+        if entry is None:
+            return None
+        
+        offset = entry['offset']
+        try:
+            if os.path.getsize(dest_file) < offset:
+                return None
+        except OSError:
+            return None
+        
+        hasher = hashlib.sha256()
+        remaining = offset
+        with open(source_file, 'rb', buffering=0) as f, \
+                self.buffer_pool.buffer(self.buffer_size) as buffer:
+            while remaining > 0:
+                self._checkpoint()
+                count = f.readinto(buffer[:min(self.buffer_size, remaining)])
+                if not count:
                     break
+                hasher.update(buffer[:count])
+                remaining -= count
+        
+        if remaining > 0 or hasher.hexdigest() != entry['sha256']:
+            return None
+        
+        self.logger.info(f"Resuming {dest_file} from byte {offset}")
+        return offset, hasher
+    
+    def _copy_with_progress(self, source_file, dest_file, file_size, progress_callback=None,
+                            resume=None, checkpoint=None, count_callback=None):
+        """
+        Copy a file with progress updates
+        
+        Uses the kernel-side copy when copy_mode allows it, otherwise (or if
+        it isn't supported between these files) a buffered copy.
+        
+        Args:
+            resume: Optional (offset, hasher) to continue a partial copy from,
+                    where hasher has already been fed the first offset bytes
+            checkpoint: Optional function called with (offset, hasher) each
+                        time another checkpoint_interval bytes are on disk
+            count_callback: Optional function called with (0, bytes) for
+                            each chunk copied
+        
+        Returns:
+            SHA256 checksum of the source data
+        """
+        if self.copy_mode == 'auto' and file_size > 0:
+            checksum = self._zero_copy_with_progress(source_file, dest_file, file_size,
+                                                     progress_callback, resume, checkpoint,
+                                                     count_callback)
+            if checksum is not None:
+                return checksum
+        
+        return self._buffered_copy_with_progress(source_file, dest_file, file_size,
+                                                 progress_callback, resume, checkpoint,
+                                                 count_callback)
+    
+    def _open_destination(self, dest_file, offset):
+        """Open dest_file for writing from offset, discarding anything after it"""
+        if offset == 0:
+            return open(dest_file, 'wb')
+        
+        dst = open(dest_file, 'r+b')
+        dst.truncate(offset)
+        dst.seek(offset)
+        return dst
+    
+    def _zero_copy_with_progress(self, source_file, dest_file, file_size, progress_callback=None,
+                                 resume=None, checkpoint=None, count_callback=None):
+        """
+        Copy a file inside the kernel, in buffer_size chunks for progress
+        
+        copy_file_range is tried first (it can reflink on XFS and btrfs),
+        then sendfile. Each chunk is hashed with a pread (into a pooled
+        buffer) of the range just copied, which the kernel copy has normally
+        left in the page cache.
+        
+        Returns:
+            SHA256 checksum of the source data, or None if neither call
+            works for these files and nothing was copied
+        """
+        copy_functions = []
+        if hasattr(os, 'copy_file_range'):
+            copy_functions.append(lambda src_fd, dst_fd, offset, count: os.copy_file_range(
+                src_fd, dst_fd, count, offset_src=offset, offset_dst=offset))
+        if hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+            copy_functions.append(lambda src_fd, dst_fd, offset, count: os.sendfile(
+                dst_fd, src_fd, offset, count))
+        
+        start_offset, start_hasher = resume or (0, hashlib.sha256())
+        
+        with open(source_file, 'rb') as src, self._open_destination(dest_file, start_offset) as dst, \
+                self.buffer_pool.buffer(self.buffer_size) as buffer:
+            src_fd = src.fileno()
+            dst_fd = dst.fileno()
+            
+            for copy in copy_functions:
+                hasher = start_hasher.copy()
+                copied_size = start_offset
+                last_checkpoint = start_offset
+                
+                try:
+                    while True:
+                        self._checkpoint()
+                        count = copy(src_fd, dst_fd, copied_size, self.buffer_size)
+                        if count == 0:
+                            break
+                        
+                        hasher.update(self._pread(src_fd, buffer, count, copied_size))
+                        copied_size += count
+                        if count_callback:
+                            count_callback(0, count)
+                        
+                        if checkpoint and copied_size - last_checkpoint >= self.checkpoint_interval:
+                            os.fsync(dst_fd)
+                            checkpoint(copied_size, hasher)
+                            last_checkpoint = copied_size
+                        
+                        if progress_callback:
+                            progress = int((copied_size / file_size) * 100)
+                            progress_callback(min(progress, 100))
+                except OSError as e:
+                    # Not supported for this pair of files - try the next way
+                    if copied_size == start_offset and e.errno in ZERO_COPY_UNSUPPORTED:
+                        continue
+                    raise
                 
-                dst.write(buffer)
-                copied_size += len(buffer)
+                # Some filesystems report success but copy nothing
+                if copied_size == start_offset:
+                    continue
                 
-                if progress_callback:
-                    progress = int((copied_size / file_size) * 100) if file_size > 0 else 100
-                    progress_callback(progress)
+                dst.flush()
+                os.fsync(dst_fd)
+                return hasher.hexdigest()
+        
+        return None
     
-    def _calculate_checksum(self, file_path):
-        """Calculate SHA256 checksum for a file"""
-        hasher = hashlib.sha256()
+    def _buffered_copy_with_progress(self, source_file, dest_file, file_size, progress_callback=None,
+                                     resume=None, checkpoint=None, count_callback=None):
+        """
+        Copy a file through Python buffers with progress updates
+        
+        A reader thread fills a bounded queue of buffers while this thread
+        writes them, so reading the next buffer overlaps writing the last.
+        Buffers are read into with readinto and come from the buffer pool,
+        which they go back to once written. The source is hashed from the
+        same buffers that are written, so it only has to be read once. The
+        destination is flushed to disk before returning so its cached pages
+        can be dropped for verification.
+        
+        Returns:
+            SHA256 checksum of the source data
+        """
+        copied_size, hasher = resume or (0, hashlib.sha256())
+        last_checkpoint = copied_size
+        
+        buffers = queue.Queue(maxsize=self.queue_depth)
+        stop_reading = threading.Event()
+        
+        def read_source(src):
+            # Hand over each buffer (or the error that ended reading), giving
+            # up if the writer has stopped taking them
+            def put(item):
+                while not stop_reading.is_set():
+                    try:
+                        buffers.put(item, timeout=0.1)
+                        return True
+                    except queue.Full:
+                        continue
+                return False
+            
+            try:
+                while True:
+                    buffer = self.buffer_pool.acquire(self.buffer_size)
+                    try:
+                        count = src.readinto(buffer)
+                    except Exception:
+                        self.buffer_pool.release(buffer)
+                        raise
+                    if not put((buffer, count)):
+                        self.buffer_pool.release(buffer)
+                        break
+                    if not count:
+                        break
+            except Exception as e:
+                put(e)
+        
+        with open(source_file, 'rb', buffering=0) as src, \
+                self._open_destination(dest_file, copied_size) as dst:
+            src.seek(copied_size)
+            reader = threading.Thread(target=read_source, args=(src,), daemon=True)
+            reader.start()
+            
+            try:
+                while True:
+                    self._checkpoint()
+                    item = buffers.get()
+                    if isinstance(item, Exception):
+                        raise item
+                    buffer, count = item
+                    try:
+                        if not count:
+                            break
+                        with memoryview(buffer) as view, view[:count] as data:
+                            dst.write(data)
+                            hasher.update(data)
+                    finally:
+                        self.buffer_pool.release(buffer)
+                    copied_size += count
+                    if count_callback:
+                        count_callback(0, count)
+                    
+                    if checkpoint and copied_size - last_checkpoint >= self.checkpoint_interval:
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                        checkpoint(copied_size, hasher)
+                        last_checkpoint = copied_size
+                    
+                    if progress_callback:
+                        progress = int((copied_size / file_size) * 100) if file_size > 0 else 100
+                        progress_callback(progress)
+                
+                dst.flush()
+                os.fsync(dst.fileno())
+            finally:
+                stop_reading.set()
+                reader.join()
+                
+                # Return the buffers read but never written, if the copy stopped early
+                while not buffers.empty():
+                    item = buffers.get_nowait()
+                    if not isinstance(item, Exception):
+                        self.buffer_pool.release(item[0])
         
-        with open(file_path, 'rb') as f:
-            buffer = f.read(self.buffer_size)
-            while len(buffer) > 0:
-                hasher.update(buffer)
-                buffer = f.read(self.buffer_size)
+        return hasher.hexdigest()
+    
+    def _pread(self, fd, buffer, count, offset):
+        """Read count bytes at offset into a pooled buffer; return a view of what was read"""
+        if hasattr(os, 'preadv'):
+            return buffer[:os.preadv(fd, [buffer[:count]], offset)]
+        return os.pread(fd, count, offset)
+    
+    def _calculate_checksum(self, file_path, drop_cache=False):
+        """
+        Calculate SHA256 checksum for a file
         
+        With drop_cache, the file's pages are evicted from the page cache first
+        (where posix_fadvise is available) so the data is read back from the
+        disk rather than from the copy still sitting in memory.
+        """
+        hasher = hashlib.sha256()
+        self.file_hasher.hash(file_path, [hasher], checkpoint=self._checkpoint, drop_cache=drop_cache)
         return hasher.hexdigest()
     
+    def _checkpoint(self):
+        """Wait while the transfer is paused, and stop it if it was cancelled"""
+        if self.cancel_token:
+            self.cancel_token.checkpoint()
+    
     def _create_destination_dirs(self, source_path, dest_path, files_to_transfer):
         """Create all necessary destination directories"""
         directories = set()
@@ -255,4 +776,59 @@ class FileTransferManager:
         self.logger.addHandler(file_handler)
         
         # Log transfer start
-        self.logger.info(f"Transfer started at {datetime.now()}")
\ No newline at end of file
+        self.logger.info(f"Transfer started at {datetime.now()}")
+
+
+class TransferProgress:
+    """
+    Combines the progress of files being transferred at the same time
+    
+    Worker threads report each file's percentage; overall and file progress
+    callbacks are called (under a lock) whenever the combined integer
+    percentage changes.
+    """
+    
+    def __init__(self, total_size, overall_progress_callback=None, file_progress_callback=None):
+        self.total_size = total_size
+        self.overall_progress_callback = overall_progress_callback
+        self.file_progress_callback = file_progress_callback
+        
+        self.lock = threading.Lock()
+        self.active = {}  # rel_path -> [file_size, copied bytes]
+        self.finished_size = 0
+        self.last_overall = None
+        self.last_file = None
+    
+    def start(self, rel_path, file_size):
+        with self.lock:
+            self.active[rel_path] = [file_size, 0]
+            self._report()
+    
+    def update(self, rel_path, percent):
+        with self.lock:
+            file_size = self.active[rel_path][0]
+            self.active[rel_path][1] = file_size * percent // 100
+            self._report()
+    
+    def finish(self, rel_path):
+        with self.lock:
+            file_size, _ = self.active.pop(rel_path)
+            self.finished_size += file_size
+            self._report()
+    
+    def _report(self):
+        active_size = sum(size for size, _ in self.active.values())
+        active_copied = sum(copied for _, copied in self.active.values())
+        
+        if self.overall_progress_callback:
+            done = self.finished_size + active_copied
+            overall = int((done / self.total_size) * 100) if self.total_size > 0 else 100
+            if overall != self.last_overall:
+                self.last_overall = overall
+                self.overall_progress_callback(overall)
+        
+        if self.file_progress_callback and self.active:
+            current = int((active_copied / active_size) * 100) if active_size > 0 else 100
+            if current != self.last_file:
+                self.last_file = current
+                self.file_progress_callback(current)
@@ -1,7 +1,9 @@
 import sys
 import os
+import json
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from views.main_window import MainWindow
 
 def resource_path(relative_path):
@@ -14,6 +16,12 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+def write_startup_report(path, app):
+    """Record the modules loaded to show the window, then quit (for benchmarks/bench_startup.py)"""
+    with open(path, 'w') as f:
+        json.dump({'modules': sorted(sys.modules)}, f)
+    app.quit()
+
 def main():
     # Enable high DPI scaling
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -38,7 +46,14 @@ def main():
     window = MainWindow()
     window.show()
     
+    # Startup benchmark: quit as soon as the event loop has shown the window
+    startup_report = os.environ.get('TIFF_TOOL_STARTUP_REPORT')
+    if startup_report:
+        QTimer.singleShot(0, lambda: write_startup_report(startup_report, app))
+    
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Required for the scanner's worker processes in the PyInstaller build
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
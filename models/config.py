@@ -0,0 +1,30 @@
+import os
+
+# Worker processes used for TIFF metadata extraction (leave a core for the UI)
+SCAN_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Metadata catalog kept in the reports folder so rescans only parse changed files
+SCAN_CATALOG_NAME = 'scan_catalog.db'
+
+# Threads hashing files at once, and how many bytes they may read ahead
+CHECKSUM_WORKERS = min(8, os.cpu_count() or 1)
+CHECKSUM_MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+
+# Algorithms selected by default when generating checksums (all of them are
+# calculated from a single read of each file)
+CHECKSUM_DEFAULT_ALGORITHMS = ['sha256']
+
+# Threads validating files on the same spinning disk (solid-state and network
+# volumes use CHECKSUM_WORKERS)
+CHECKSUM_ROTATIONAL_WORKERS = 1
+
+# Local record of when each file was last verified. Validation using it only
+# reads files that changed or weren't verified in the last FIXITY_MAX_AGE_DAYS,
+# plus a random sample of the rest sized for the given confidence and margin
+FIXITY_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.tiff_preservation_tool', 'fixity_cache.db')
+FIXITY_MAX_AGE_DAYS = 90
+FIXITY_SAMPLE_CONFIDENCE = 0.95
+FIXITY_SAMPLE_MARGIN = 0.05
+
+# Files transferred at the same time
+TRANSFER_WORKERS = 4
@@ -0,0 +1,87 @@
+import os
+import sys
+from collections.abc import Mapping
+
+# Fields of a TIFF metadata record, in the order extract_tiff_metadata sets
+# them, then the pixel validation results and fingerprint a scan can add
+# (see controllers.pixels). 'filename' isn't stored; it is always the last
+# part of 'path'.
+FIELDS = (
+    'path', 'rel_path', 'size', 'width', 'height', 'format', 'mode',
+    'dpi_x', 'dpi_y', 'bit_depth', 'color_profile', 'compression',
+    'software', 'datetime', 'tiff_version', 'subfile_type', 'planar_config',
+    'samples_per_pixel', 'photometric', 'xmp', 'exif', 'iptc', 'is_bigtiff',
+    'is_tiled', 'tile_width', 'tile_height', 'bits_per_sample',
+    'pixel_check', 'pixel_error', 'failed_page', 'failed_segment', 'failed_offset',
+    'pixel_fingerprint'
+)
+
+FIELD_SET = frozenset(FIELDS)
+
+# String fields with only a handful of distinct values across a collection.
+# These are interned so every record shares one copy of each value.
+CATEGORICAL_FIELDS = frozenset((
+    'format', 'mode', 'color_profile', 'compression', 'software',
+    'tiff_version', 'subfile_type', 'planar_config', 'photometric',
+    'xmp', 'exif', 'iptc', 'is_bigtiff', 'is_tiled', 'bits_per_sample',
+    'pixel_check'
+))
+
+
+class TiffRecord(Mapping):
+    """
+    Metadata for one TIFF file found by Scanner
+
+    Behaves as a read-only dict of the metadata (record['width'],
+    record.get('software', ''), dict(record)) but stores each field in a
+    slot instead of a hash table, and shares the strings of categorical
+    fields between records, so large scans take a fraction of the memory.
+    A field that was never set is missing, just as it would be from a dict.
+    """
+
+    __slots__ = FIELDS
+
+    @classmethod
+    def from_dict(cls, metadata):
+        """Create a record from a metadata dict as built by extract_tiff_metadata"""
+        record = cls()
+        for key, value in metadata.items():
+            if key == 'filename':
+                continue
+            if key in CATEGORICAL_FIELDS and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(record, key, value)
+        return record
+
+    def get(self, key, default=None):
+        # Reads the slot directly; Mapping.get would go through __getitem__
+        if key in FIELD_SET:
+            return getattr(self, key, default)
+        return super().get(key, default)
+
+    def to_dict(self):
+        """Return the metadata as a plain dict"""
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key == 'filename':
+            return os.path.basename(self['path'])
+        if key not in FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        if hasattr(self, 'path'):
+            yield 'filename'
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"TiffRecord({self.to_dict()!r})"
@@ -1,9 +1,19 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QFileDialog, QLineEdit, QProgressBar,
-                            QMessageBox, QRadioButton, QButtonGroup)
+                            QMessageBox, QRadioButton, QButtonGroup, QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
-from controllers.checksum import ChecksumGenerator
+from controllers.cancellation import CancellationToken, OperationCancelled
+from controllers.checksum import ChecksumGenerator, CHECKSUM_ALGORITHMS
+from controllers.progress import ProgressReporter
+from models.config import (CHECKSUM_WORKERS, CHECKSUM_MAX_INFLIGHT_BYTES,
+                           CHECKSUM_ROTATIONAL_WORKERS, CHECKSUM_DEFAULT_ALGORITHMS,
+                           FIXITY_CACHE_PATH, FIXITY_MAX_AGE_DAYS, FIXITY_SAMPLE_CONFIDENCE,
+                           FIXITY_SAMPLE_MARGIN)
+
+# How each algorithm is shown in the UI
+ALGORITHM_LABELS = {'md5': "MD5", 'sha1': "SHA1", 'sha256': "SHA256", 'sha512': "SHA512",
+                    'blake2b': "BLAKE2b"}
 
 class ChecksumTab(QWidget):
     def __init__(self):
@@ -45,6 +55,11 @@ class ChecksumTab(QWidget):
         
         main_layout.addLayout(mode_layout)
         
+        # Validation can trust files the fixity cache shows are unchanged
+        self.fixity_check = QCheckBox(
+            f"When validating, only sample unchanged files verified in the last {FIXITY_MAX_AGE_DAYS} days")
+        main_layout.addWidget(self.fixity_check)
+        
         # Output format options
         format_layout = QVBoxLayout()
         format_layout.addWidget(QLabel("Output Format:"))
@@ -63,11 +78,41 @@ class ChecksumTab(QWidget):
         
         main_layout.addLayout(format_layout)
         
+        # Algorithms to generate, all calculated from one read of each file
+        algorithm_layout = QHBoxLayout()
+        algorithm_layout.addWidget(QLabel("Algorithms:"))
+        
+        self.algorithm_checks = {}
+        for algorithm in CHECKSUM_ALGORITHMS:
+            check = QCheckBox(ALGORITHM_LABELS[algorithm])
+            check.setChecked(algorithm in CHECKSUM_DEFAULT_ALGORITHMS)
+            check.stateChanged.connect(self.update_action_text)
+            algorithm_layout.addWidget(check)
+            self.algorithm_checks[algorithm] = check
+        algorithm_layout.addStretch(1)
+        
+        main_layout.addLayout(algorithm_layout)
+        
         # Action button
-        self.action_btn = QPushButton("Generate SHA256 Checksums")
+        self.action_btn = QPushButton()
         self.action_btn.clicked.connect(self.process_checksums)
         main_layout.addWidget(self.action_btn)
         
+        # Pause and cancel buttons, only enabled while a run is in progress
+        control_layout = QHBoxLayout()
+        
+        self.pause_btn = QPushButton("Pause")
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        control_layout.addWidget(self.pause_btn)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        control_layout.addWidget(self.cancel_btn)
+        
+        main_layout.addLayout(control_layout)
+        
         # Progress section
         progress_layout = QVBoxLayout()
         progress_layout.addWidget(QLabel("Progress:"))
@@ -78,12 +123,23 @@ class ChecksumTab(QWidget):
         self.status_label = QLabel("Ready")
         progress_layout.addWidget(self.status_label)
         
+        self.rate_label = QLabel("")
+        progress_layout.addWidget(self.rate_label)
+        
         main_layout.addLayout(progress_layout)
         
         # Add stretch to push widgets to the top
         main_layout.addStretch(1)
         
         self.setLayout(main_layout)
+        self.update_action_text()
+    
+    def selected_algorithms(self):
+        return [algorithm for algorithm, check in self.algorithm_checks.items() if check.isChecked()]
+    
+    def update_action_text(self):
+        labels = " + ".join(ALGORITHM_LABELS[algorithm] for algorithm in self.selected_algorithms())
+        self.action_btn.setText(f"Generate {labels} Checksums" if labels else "Generate Checksums")
     
     def browse_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder")
@@ -102,17 +158,28 @@ class ChecksumTab(QWidget):
         # Determine format
         format_type = "per_folder" if self.per_folder_radio.isChecked() else "consolidated"
         
+        # Validation takes the algorithms from the checksum file names
+        algorithms = self.selected_algorithms()
+        if mode == "generate" and not algorithms:
+            QMessageBox.warning(self, "No Algorithm Selected",
+                               "Please select at least one checksum algorithm.")
+            return
+        
         # Create worker thread
         self.worker = ChecksumWorker(
             self.folder_path.text(),
             mode=mode,
-            format_type=format_type
+            format_type=format_type,
+            algorithms=algorithms,
+            use_fixity_cache=self.fixity_check.isChecked()
         )
         
         # Connect signals
         self.worker.progress.connect(self.update_progress)
         self.worker.status.connect(self.update_status)
+        self.worker.rate.connect(self.update_rate)
         self.worker.finished.connect(self.on_finished)
+        self.rate_label.setText("")
         
         # Update button text based on mode
         if mode == "generate":
@@ -127,16 +194,43 @@ class ChecksumTab(QWidget):
         self.validate_radio.setEnabled(False)
         self.per_folder_radio.setEnabled(False)
         self.consolidated_radio.setEnabled(False)
+        self.fixity_check.setEnabled(False)
+        for check in self.algorithm_checks.values():
+            check.setEnabled(False)
+        self.pause_btn.setText("Pause")
+        self.pause_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(True)
         
         # Start worker
         self.worker.start()
     
+    def toggle_pause(self):
+        """Pause the running worker between buffers, or let it carry on"""
+        cancel_token = self.worker.cancel_token
+        if cancel_token.is_paused:
+            cancel_token.resume()
+            self.pause_btn.setText("Pause")
+        else:
+            cancel_token.pause()
+            self.pause_btn.setText("Resume")
+            self.update_status("Paused")
+    
+    def cancel(self):
+        """Stop the running worker; it finishes with success False"""
+        self.worker.cancel_token.cancel()
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.update_status("Cancelling...")
+    
     def update_progress(self, value):
         self.progress_bar.setValue(value)
     
     def update_status(self, message):
         self.status_label.setText(message)
     
+    def update_rate(self, files_per_second, mb_per_second):
+        self.rate_label.setText(f"{files_per_second:.1f} files/s, {mb_per_second:.1f} MB/s")
+    
     def on_finished(self, success, results=None):
         # Re-enable UI elements
         self.action_btn.setEnabled(True)
@@ -145,25 +239,38 @@ class ChecksumTab(QWidget):
         self.validate_radio.setEnabled(True)
         self.per_folder_radio.setEnabled(True)
         self.consolidated_radio.setEnabled(True)
+        self.fixity_check.setEnabled(True)
+        for check in self.algorithm_checks.values():
+            check.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
         
         # Reset button text
         mode = "generate" if self.generate_radio.isChecked() else "validate"
         if mode == "generate":
-            self.action_btn.setText("Generate SHA256 Checksums")
+            self.update_action_text()
         else:
-            self.action_btn.setText("Validate SHA256 Checksums")
+            self.action_btn.setText("Validate Checksums")
         
         if success:
             if mode == "generate":
                 QMessageBox.information(self, "Success", 
                                       "Checksums generated successfully.")
             else:
+                skipped = ""
+                if results and results.get('skipped_files'):
+                    skipped = (f" {len(results['skipped_files'])} unchanged files verified recently "
+                               f"were skipped.")
                 if results and 'invalid_files' in results and results['invalid_files']:
                     msg = f"Validation complete. {len(results['invalid_files'])} files failed checksum validation."
-                    QMessageBox.warning(self, "Validation Results", msg)
+                    QMessageBox.warning(self, "Validation Results", msg + skipped)
                 else:
                     QMessageBox.information(self, "Success", 
-                                          "All files passed checksum validation.")
+                                          "All files passed checksum validation." + skipped)
+        elif self.worker.cancel_token.is_cancelled:
+            QMessageBox.information(self, "Cancelled",
+                                  "Checksum processing was cancelled. Checksum files "
+                                  "already written are complete.")
         else:
             QMessageBox.critical(self, "Error", 
                                "An error occurred during checksum processing.")
@@ -172,37 +279,64 @@ class ChecksumTab(QWidget):
 class ChecksumWorker(QThread):
     progress = pyqtSignal(int)
     status = pyqtSignal(str)
+    rate = pyqtSignal(float, float)  # files/s, MB/s
     finished = pyqtSignal(bool, object)
     
-    def __init__(self, folder_path, mode="generate", format_type="per_folder"):
+    def __init__(self, folder_path, mode="generate", format_type="per_folder", algorithms=None,
+                 use_fixity_cache=False):
         super().__init__()
         self.folder_path = folder_path
         self.mode = mode
         self.format_type = format_type
+        self.algorithms = algorithms or list(CHECKSUM_DEFAULT_ALGORITHMS)
+        self.use_fixity_cache = use_fixity_cache
+        self.cancel_token = CancellationToken()
     
     def run(self):
         try:
-            generator = ChecksumGenerator()
+            generator = ChecksumGenerator(workers=CHECKSUM_WORKERS,
+                                          max_inflight_bytes=CHECKSUM_MAX_INFLIGHT_BYTES,
+                                          rotational_workers=CHECKSUM_ROTATIONAL_WORKERS,
+                                          cancel_token=self.cancel_token,
+                                          fixity_cache_path=FIXITY_CACHE_PATH if self.use_fixity_cache else None,
+                                          fixity_max_age_days=FIXITY_MAX_AGE_DAYS,
+                                          fixity_confidence=FIXITY_SAMPLE_CONFIDENCE,
+                                          fixity_margin=FIXITY_SAMPLE_MARGIN)
+            
+            # Coalesce the per-file and per-buffer updates before they
+            # become signals to the UI thread
+            progress_reporter = ProgressReporter(rate_callback=self.rate.emit)
+            progress_callback = progress_reporter.percent(self.progress.emit)
+            status_callback = progress_reporter.status(self.status.emit)
             
             if self.mode == "generate":
-                self.status.emit("Generating SHA256 checksums...")
+                labels = ", ".join(ALGORITHM_LABELS[algorithm] for algorithm in self.algorithms)
+                self.status.emit(f"Generating {labels} checksums...")
                 result = generator.generate_checksums(
                     self.folder_path,
-                    algorithm="sha256",
+                    algorithm=self.algorithms,
                     format_type=self.format_type,
-                    progress_callback=self.progress.emit,
-                    status_callback=self.status.emit
+                    progress_callback=progress_callback,
+                    status_callback=status_callback,
+                    count_callback=progress_reporter.count
                 )
+                progress_reporter.flush()
                 self.finished.emit(True, result)
             else:
                 self.status.emit("Validating checksums...")
                 result = generator.validate_checksums(
                     self.folder_path,
-                    progress_callback=self.progress.emit,
-                    status_callback=self.status.emit
+                    progress_callback=progress_callback,
+                    status_callback=status_callback,
+                    count_callback=progress_reporter.count
                 )
+                progress_reporter.flush()
                 self.finished.emit(True, result)
             
+        except OperationCancelled:
+            self.status.emit("Cancelled")
+            self.finished.emit(False, None)
+            
         except Exception as e:
             self.status.emit(f"Error: {str(e)}")
             self.finished.emit(False, None)
\ No newline at end of file
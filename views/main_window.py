@@ -1,16 +1,22 @@
-from PyQt5.QtWidgets import QMainWindow, QTabWidget
+import importlib
+
+from PyQt5.QtWidgets import QMainWindow, QTabWidget, QWidget, QVBoxLayout
 from PyQt5.QtCore import Qt
 
-from views.reports_tab import ReportsTab
-from views.checksum_tab import ChecksumTab
-from views.transfer_tab import TransferTab
+# Tabs in display order: (attribute, title, module, class). Each tab's module
+# is only imported, and the tab only built, when it is first shown.
+TABS = [
+    ('reports_tab', "Reports", 'views.reports_tab', 'ReportsTab'),
+    ('checksum_tab', "Checksums", 'views.checksum_tab', 'ChecksumTab'),
+    ('transfer_tab', "File Transfer", 'views.transfer_tab', 'TransferTab'),
+]
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         
         self.init_ui()
-        
+    
     def init_ui(self):
         # Set window properties
         self.setWindowTitle('TIFF Preservation Tool')
@@ -19,19 +25,33 @@ class MainWindow(QMainWindow):
         # Create tab widget and ensure it doesn't apply custom styling to the tab bar
         self.tabs = QTabWidget()
         
-        # Create tab pages
-        self.reports_tab = ReportsTab()
-        self.checksum_tab = ChecksumTab()
-        self.transfer_tab = TransferTab()
+        # Add an empty page per tab, filled in when the tab is first shown
+        self.pages = []
+        for attribute, title, _, _ in TABS:
+            setattr(self, attribute, None)
+            page = QWidget()
+            layout = QVBoxLayout(page)
+            layout.setContentsMargins(0, 0, 0, 0)
+            self.pages.append(page)
+            self.tabs.addTab(page, title)
         
-        # Add tabs with fixed width
-        self.tabs.addTab(self.reports_tab, "Reports")
-        self.tabs.addTab(self.checksum_tab, "Checksums")
-        self.tabs.addTab(self.transfer_tab, "File Transfer")
+        self.tabs.currentChanged.connect(self.build_tab)
+        self.build_tab(self.tabs.currentIndex())
         
         # Make sure tab bar spans full width and tabs have equal width
         self.tabs.setUsesScrollButtons(False)  # Important: disable scroll buttons
         self.tabs.tabBar().setExpanding(True)  # Make tabs expand to fill width
         
         # Set the tab widget as the central widget
-        self.setCentralWidget(self.tabs)
\ No newline at end of file
+        self.setCentralWidget(self.tabs)
+    
+    def build_tab(self, index):
+        """Import and build the tab at index, if it hasn't been built yet"""
+        attribute, _, module_name, class_name = TABS[index]
+        if getattr(self, attribute) is not None:
+            return
+        
+        tab_class = getattr(importlib.import_module(module_name), class_name)
+        tab = tab_class()
+        self.pages[index].layout().addWidget(tab)
+        setattr(self, attribute, tab)
\ No newline at end of file
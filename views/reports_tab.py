@@ -1,13 +1,18 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QFileDialog, QLineEdit, QProgressBar,
-                            QMessageBox, QFrame, QGroupBox, QTextBrowser, QSizePolicy)
+                            QMessageBox, QFrame, QGroupBox, QTextBrowser, QSizePolicy,
+                            QCheckBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QDesktopServices
 from PyQt5.QtCore import QUrl
 import os
 
+from controllers.cancellation import CancellationToken, OperationCancelled
 from controllers.scanner import Scanner
+from controllers.progress import ProgressReporter
 from controllers.reporter import Reporter
+from controllers import columnar
+from models.config import SCAN_WORKERS, SCAN_CATALOG_NAME
 
 class ReportsTab(QWidget):
     def __init__(self):
@@ -57,6 +62,23 @@ class ReportsTab(QWidget):
         
         output_layout.addLayout(output_hbox)
         
+        # Optional typed, compressed copies of the reports for large collections
+        self.parquet_check = QCheckBox("Also write Parquet files (typed, compressed copies of the reports)")
+        if not columnar.is_available():
+            self.parquet_check.setEnabled(False)
+            self.parquet_check.setToolTip("Install pyarrow to write Parquet files")
+        output_layout.addWidget(self.parquet_check)
+        
+        # Optional decode of all pixel data, much slower than reading headers
+        self.deep_validation_check = QCheckBox(
+            "Deep validation (decode every strip and tile to find truncated or corrupt images)")
+        output_layout.addWidget(self.deep_validation_check)
+        
+        # Optional pixel fingerprints, to find copies saved with other settings
+        self.fingerprint_check = QCheckBox(
+            "Find duplicate images (hash decoded pixels, whatever the compression or tags)")
+        output_layout.addWidget(self.fingerprint_check)
+        
         # Generate button - with proper styling and smaller width
         gen_btn_layout = QHBoxLayout()
         gen_btn_layout.addStretch(1)
@@ -86,6 +108,19 @@ class ReportsTab(QWidget):
         """)
         self.generate_btn.clicked.connect(self.generate_reports)
         gen_btn_layout.addWidget(self.generate_btn)
+        
+        # Pause and cancel buttons, only enabled while reports are generated
+        self.pause_btn = QPushButton("Pause")
+        self.pause_btn.setMinimumHeight(40)
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        gen_btn_layout.addWidget(self.pause_btn)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setMinimumHeight(40)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        gen_btn_layout.addWidget(self.cancel_btn)
         gen_btn_layout.addStretch(1)
         
         output_layout.addLayout(gen_btn_layout)
@@ -101,6 +136,9 @@ class ReportsTab(QWidget):
         self.status_label = QLabel("Ready")
         progress_layout.addWidget(self.status_label)
         
+        self.rate_label = QLabel("")
+        progress_layout.addWidget(self.rate_label)
+        
         main_layout.addWidget(progress_group)
         
         # === Summary Section (Initially Hidden) ===
@@ -180,13 +218,18 @@ class ReportsTab(QWidget):
         
         # Create a worker thread to handle report generation
         self.worker = ReportWorker(self.folder_path.text(), 
-                                  self.output_path.text() or os.path.join(self.folder_path.text(), "reports"))
+                                  self.output_path.text() or os.path.join(self.folder_path.text(), "reports"),
+                                  'parquet' if self.parquet_check.isChecked() else None,
+                                  self.deep_validation_check.isChecked(),
+                                  self.fingerprint_check.isChecked())
         
         # Connect signals
         self.worker.progress.connect(self.update_progress)
         self.worker.status.connect(self.update_status)
+        self.worker.rate.connect(self.update_rate)
         self.worker.finished.connect(self.on_finished)
         self.worker.summary.connect(self.display_summary)
+        self.rate_label.setText("")
         
         # Start worker
         self.worker.start()
@@ -196,6 +239,27 @@ class ReportsTab(QWidget):
         self.browse_btn.setEnabled(False)
         self.output_browse_btn.setEnabled(False)
         self.open_folder_btn.setEnabled(False)
+        self.pause_btn.setText("Pause")
+        self.pause_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(True)
+    
+    def toggle_pause(self):
+        """Pause the scan between files, or let it carry on"""
+        cancel_token = self.worker.cancel_token
+        if cancel_token.is_paused:
+            cancel_token.resume()
+            self.pause_btn.setText("Pause")
+        else:
+            cancel_token.pause()
+            self.pause_btn.setText("Resume")
+            self.update_status("Paused")
+    
+    def cancel(self):
+        """Stop the scan; the previous reports, if any, are left in place"""
+        self.worker.cancel_token.cancel()
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.update_status("Cancelling...")
     
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -203,6 +267,9 @@ class ReportsTab(QWidget):
     def update_status(self, message):
         self.status_label.setText(message)
     
+    def update_rate(self, files_per_second, mb_per_second):
+        self.rate_label.setText(f"{files_per_second:.1f} files/s, {mb_per_second:.1f} MB/s")
+    
     def display_summary(self, summary_html):
         """Display the summary data in the summary browser"""
         self.summary_browser.setHtml(summary_html)
@@ -214,10 +281,14 @@ class ReportsTab(QWidget):
         self.browse_btn.setEnabled(True)
         self.output_browse_btn.setEnabled(True)
         self.open_folder_btn.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
         
         if success:
             # Summary will be displayed through the summary signal
             pass
+        elif self.worker.cancel_token.is_cancelled:
+            self.summary_group.setVisible(False)
         else:
             QMessageBox.critical(self, "Error", 
                                "An error occurred during report generation.")
@@ -227,13 +298,19 @@ class ReportsTab(QWidget):
 class ReportWorker(QThread):
     progress = pyqtSignal(int)
     status = pyqtSignal(str)
+    rate = pyqtSignal(float, float)  # files/s, MB/s
     finished = pyqtSignal(bool)
     summary = pyqtSignal(str)  # New signal for summary data
     
-    def __init__(self, source_folder, output_folder):
+    def __init__(self, source_folder, output_folder, columnar_format=None, deep_validation=False,
+                 fingerprint=False):
         super().__init__()
         self.source_folder = source_folder
         self.output_folder = output_folder
+        self.columnar_format = columnar_format
+        self.deep_validation = deep_validation
+        self.fingerprint = fingerprint
+        self.cancel_token = CancellationToken()
     
     def run(self):
         try:
@@ -241,97 +318,55 @@ class ReportWorker(QThread):
             os.makedirs(self.output_folder, exist_ok=True)
             
             # Initialize Scanner
-            scanner = Scanner()
+            scanner = Scanner(workers=SCAN_WORKERS,
+                              catalog_path=os.path.join(self.output_folder, SCAN_CATALOG_NAME),
+                              cancel_token=self.cancel_token,
+                              deep_validation=self.deep_validation,
+                              fingerprint=self.fingerprint)
             self.status.emit("Scanning directories...")
             
-            # Scan for TIFF files
-            scanner.scan(self.source_folder, 
-                        progress_callback=self.progress.emit,
-                        status_callback=self.status.emit)
+            # Coalesce the per-file updates before they become signals to
+            # the UI thread
+            progress_reporter = ProgressReporter(rate_callback=self.rate.emit)
+            status_callback = progress_reporter.status(self.status.emit)
             
-            # Generate reports
-            self.status.emit("Generating reports...")
-            reporter = Reporter()
-            reporter.generate_all_reports(scanner.results, self.output_folder,
-                                         progress_callback=self.progress.emit,
-                                         status_callback=self.status.emit)
+            # Scan for TIFF files, writing report rows as records arrive
+            records = scanner.iter_scan(self.source_folder,
+                                        progress_callback=progress_reporter.percent(self.progress.emit),
+                                        status_callback=status_callback,
+                                        count_callback=progress_reporter.count)
+            reporter = Reporter(columnar_format=self.columnar_format,
+                                deep_validation=self.deep_validation,
+                                fingerprint=self.fingerprint)
+            statistics = reporter.generate_streaming_reports(records, scanner.results,
+                                                             self.output_folder,
+                                                             status_callback=status_callback)
+            progress_reporter.flush()
             
             # Generate summary HTML
-            summary_html = self.generate_summary_html(scanner.results)
+            summary_html = self.generate_summary_html(statistics)
             self.summary.emit(summary_html)
             
             self.status.emit("Complete")
             self.finished.emit(True)
             
+        except OperationCancelled:
+            self.status.emit("Cancelled - previous reports were left unchanged")
+            self.finished.emit(False)
+            
         except Exception as e:
             self.status.emit(f"Error: {str(e)}")
             self.finished.emit(False)
     
-    def generate_summary_html(self, scan_results):
-        """Generate HTML summary of the reports"""
-        # Count asset folders (folders with TIFF files)
-        asset_folders = sum(1 for folder in scan_results['folders'].values() if folder['tiff_count'] > 0)
-        
-        # Total TIFF files
-        total_tiff_files = len(scan_results['tiff_files'])
-        
-        # Calculate total size
-        total_size_bytes = sum(folder['total_size'] for folder in scan_results['folders'].values())
-        total_size_gb = round(total_size_bytes / (1024 * 1024 * 1024), 2)
-        
-        # Calculate average file size
-        avg_file_size_mb = 0
-        if total_tiff_files > 0:
-            avg_file_size_mb = round((total_size_bytes / total_tiff_files) / (1024 * 1024), 2)
-        
-        # DPI statistics
-        dpi_stats = {'300+': 0, '200-299': 0, '100-199': 0, '<100': 0, 'Unknown': 0}
-        for file_info in scan_results['tiff_files']:
-            try:
-                dpi_x = float(file_info.get('dpi_x', 0))
-                dpi_y = float(file_info.get('dpi_y', 0))
-                
-                # Handle tuple DPI values
-                if isinstance(dpi_x, tuple) and len(dpi_x) == 2:
-                    dpi_x = float(dpi_x[0]) / float(dpi_x[1])
-                if isinstance(dpi_y, tuple) and len(dpi_y) == 2:
-                    dpi_y = float(dpi_y[0]) / float(dpi_y[1])
-                
-                dpi = max(dpi_x, dpi_y)
-                
-                if dpi >= 300:
-                    dpi_stats['300+'] += 1
-                elif dpi >= 200:
-                    dpi_stats['200-299'] += 1
-                elif dpi >= 100:
-                    dpi_stats['100-199'] += 1
-                elif dpi > 0:
-                    dpi_stats['<100'] += 1
-                else:
-                    dpi_stats['Unknown'] += 1
-            except (TypeError, ValueError):
-                dpi_stats['Unknown'] += 1
-        
-        # Bit depth statistics
-        bit_depth_stats = {}
-        for file_info in scan_results['tiff_files']:
-            try:
-                bit_depth = int(file_info.get('bit_depth', 0))
-                if bit_depth not in bit_depth_stats:
-                    bit_depth_stats[bit_depth] = 0
-                bit_depth_stats[bit_depth] += 1
-            except (TypeError, ValueError):
-                if 'Unknown' not in bit_depth_stats:
-                    bit_depth_stats['Unknown'] = 0
-                bit_depth_stats['Unknown'] += 1
-        
-        # Compression statistics
-        compression_stats = {}
-        for file_info in scan_results['tiff_files']:
-            compression = file_info.get('compression', 'Unknown')
-            if compression not in compression_stats:
-                compression_stats[compression] = 0
-            compression_stats[compression] += 1
+    def generate_summary_html(self, statistics):
+        """Generate HTML summary of the reports from their SummaryStatistics"""
+        asset_folders = statistics.asset_folders
+        total_tiff_files = statistics.total_tiff_files
+        total_size_gb = statistics.total_size_gb
+        avg_file_size_mb = statistics.avg_file_size_mb
+        dpi_stats = statistics.dpi_counts
+        bit_depth_stats = statistics.bit_depth_counts
+        compression_stats = statistics.compression_counts
         
         # Build HTML content
         html = f"""
@@ -382,7 +417,7 @@ class ReportWorker(QThread):
         
         # Add DPI statistics rows
         for dpi_range, count in dpi_stats.items():
-            percentage = round((count / total_tiff_files * 100), 1) if total_tiff_files > 0 else 0
+            percentage = statistics.percentage(count, 1)
             row_class = ""
             if dpi_range not in ["300+", "Unknown"] and count > 0:
                 row_class = "warning"
@@ -413,7 +448,7 @@ class ReportWorker(QThread):
             else:
                 bit_depth_display = f"{bit_depth} bit"
                 
-            percentage = round((count / total_tiff_files * 100), 1) if total_tiff_files > 0 else 0
+            percentage = statistics.percentage(count, 1)
             html += f"""
                 <tr>
                     <td>{bit_depth_display}</td>
@@ -436,7 +471,7 @@ class ReportWorker(QThread):
         
         # Add compression statistics rows
         for compression, count in sorted(compression_stats.items()):
-            percentage = round((count / total_tiff_files * 100), 1) if total_tiff_files > 0 else 0
+            percentage = statistics.percentage(count, 1)
             html += f"""
                 <tr>
                     <td>{compression}</td>
@@ -445,7 +480,52 @@ class ReportWorker(QThread):
                 </tr>
             """
         
-        html += """
+        # Add pixel validation rows, if the pixel data was decoded
+        if self.deep_validation:
+            html += """
+            </table>
+            
+            <h3>Pixel Validation</h3>
+            <table>
+                <tr>
+                    <th>Result</th>
+                    <th>Count</th>
+                    <th>Percentage</th>
+                </tr>
+            """
+            for result, count in statistics.pixel_check_counts.items():
+                percentage = statistics.percentage(count, 1)
+                row_class = "warning" if result != 'OK' and count > 0 else ""
+                html += f"""
+                <tr class="{row_class}">
+                    <td>{result}</td>
+                    <td>{count}</td>
+                    <td>{percentage}%</td>
+                </tr>
+                """
+        
+        # Add duplicate counts, if the pixels were fingerprinted
+        if self.fingerprint:
+            html += f"""
+            </table>
+            
+            <h3>Duplicate Images</h3>
+            <table>
+                <tr>
+                    <td>Duplicate Groups:</td>
+                    <td class="stat-value">{statistics.duplicate_groups}</td>
+                </tr>
+                <tr>
+                    <td>Files in Duplicate Groups:</td>
+                    <td class="stat-value">{statistics.duplicate_files}</td>
+                </tr>
+            """
+        
+        duplicate_report = ""
+        if self.fingerprint:
+            duplicate_report = "<li>Duplicate Groups - Files whose decoded pixels are identical</li>"
+        
+        html += f"""
             </table>
             
             <h3>Generated Reports</h3>
@@ -453,6 +533,7 @@ class ReportWorker(QThread):
                 <li>Folder Count Report - Lists all folders containing TIFF files</li>
                 <li>TIFF Metadata Report - Detailed metadata for all TIFF files</li>
                 <li>Non-TIFF File Report - List of all non-TIFF files found</li>
+                {duplicate_report}
                 <li>Preservation Summary - Overall collection statistics</li>
             </ul>
         </body>
@@ -1,9 +1,12 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QFileDialog, QLineEdit, QProgressBar,
-                            QMessageBox)
+                            QMessageBox, QRadioButton, QButtonGroup)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
+from controllers.cancellation import CancellationToken, OperationCancelled
+from controllers.progress import ProgressReporter
 from controllers.transfer import FileTransferManager
+from models.config import TRANSFER_WORKERS
 
 class TransferTab(QWidget):
     def __init__(self):
@@ -55,11 +58,48 @@ class TransferTab(QWidget):
         
         main_layout.addLayout(options_layout)
         
+        # Which files already at the destination are skipped
+        sync_layout = QVBoxLayout()
+        sync_layout.addWidget(QLabel("Skip files already at the destination:"))
+        
+        self.sync_journal_radio = QRadioButton("Only those verified by a previous transfer")
+        self.sync_journal_radio.setChecked(True)
+        sync_layout.addWidget(self.sync_journal_radio)
+        
+        self.sync_size_mtime_radio = QRadioButton("Also any with the same size and modification time")
+        sync_layout.addWidget(self.sync_size_mtime_radio)
+        
+        self.sync_manifest_radio = QRadioButton("Those whose source matches the stored checksum (slower, reads every source file)")
+        sync_layout.addWidget(self.sync_manifest_radio)
+        
+        # Add to button group for exclusive selection
+        self.sync_group = QButtonGroup()
+        self.sync_group.addButton(self.sync_journal_radio)
+        self.sync_group.addButton(self.sync_size_mtime_radio)
+        self.sync_group.addButton(self.sync_manifest_radio)
+        
+        main_layout.addLayout(sync_layout)
+        
         # Start transfer button
         self.transfer_btn = QPushButton("Start Transfer")
         self.transfer_btn.clicked.connect(self.start_transfer)
         main_layout.addWidget(self.transfer_btn)
         
+        # Pause and cancel buttons, only enabled while a transfer is running
+        control_layout = QHBoxLayout()
+        
+        self.pause_btn = QPushButton("Pause")
+        self.pause_btn.setEnabled(False)
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        control_layout.addWidget(self.pause_btn)
+        
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel)
+        control_layout.addWidget(self.cancel_btn)
+        
+        main_layout.addLayout(control_layout)
+        
         # Progress section
         main_layout.addWidget(QLabel("Overall Progress:"))
         self.overall_progress = QProgressBar()
@@ -74,6 +114,9 @@ class TransferTab(QWidget):
         self.status_label = QLabel("Ready")
         main_layout.addWidget(self.status_label)
         
+        self.rate_label = QLabel("")
+        main_layout.addWidget(self.rate_label)
+        
         # Add stretch to push widgets to the top
         main_layout.addStretch(1)
         
@@ -100,26 +143,60 @@ class TransferTab(QWidget):
                                "Please select a destination folder.")
             return
         
+        # Determine sync mode
+        if self.sync_size_mtime_radio.isChecked():
+            sync_mode = "size_mtime"
+        elif self.sync_manifest_radio.isChecked():
+            sync_mode = "manifest"
+        else:
+            sync_mode = "journal"
+        
         # Create worker thread
         self.worker = TransferWorker(
             self.source_path.text(),
-            self.dest_path.text()
+            self.dest_path.text(),
+            sync_mode
         )
         
         # Connect signals
         self.worker.overall_progress.connect(self.update_overall_progress)
         self.worker.file_progress.connect(self.update_file_progress)
         self.worker.status.connect(self.update_status)
+        self.worker.rate.connect(self.update_rate)
         self.worker.finished.connect(self.on_finished)
+        self.rate_label.setText("")
         
         # Disable UI elements during processing
         self.transfer_btn.setEnabled(False)
         self.source_browse_btn.setEnabled(False)
         self.dest_browse_btn.setEnabled(False)
+        for button in self.sync_group.buttons():
+            button.setEnabled(False)
+        self.pause_btn.setText("Pause")
+        self.pause_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(True)
         
         # Start worker
         self.worker.start()
     
+    def toggle_pause(self):
+        """Pause the transfer between buffers, or let it carry on"""
+        cancel_token = self.worker.cancel_token
+        if cancel_token.is_paused:
+            cancel_token.resume()
+            self.pause_btn.setText("Pause")
+        else:
+            cancel_token.pause()
+            self.pause_btn.setText("Resume")
+            self.update_status("Paused")
+    
+    def cancel(self):
+        """Stop the transfer; it finishes with success False"""
+        self.worker.cancel_token.cancel()
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
+        self.update_status("Cancelling...")
+    
     def update_overall_progress(self, value):
         self.overall_progress.setValue(value)
     
@@ -129,24 +206,37 @@ class TransferTab(QWidget):
     def update_status(self, message):
         self.status_label.setText(message)
     
+    def update_rate(self, files_per_second, mb_per_second):
+        self.rate_label.setText(f"{files_per_second:.1f} files/s, {mb_per_second:.1f} MB/s")
+    
     def on_finished(self, success, stats=None):
         # Re-enable UI elements
         self.transfer_btn.setEnabled(True)
         self.source_browse_btn.setEnabled(True)
         self.dest_browse_btn.setEnabled(True)
+        for button in self.sync_group.buttons():
+            button.setEnabled(True)
+        self.pause_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(False)
         
         if success:
             # Show statistics
             if stats:
                 message = (f"Transfer complete!\n\n"
                           f"Files transferred: {stats.get('files_transferred', 0)}\n"
-                          f"Total size: {stats.get('total_size_mb', 0):.2f} MB\n"
+                          f"Unchanged files skipped: {stats.get('files_skipped', 0)}\n"
+                          f"Copied: {stats.get('bytes_copied', 0) / (1024*1024):.2f} MB\n"
+                          f"Skipped: {stats.get('bytes_skipped', 0) / (1024*1024):.2f} MB\n"
                           f"Errors: {stats.get('errors', 0)}")
                           
                 QMessageBox.information(self, "Transfer Complete", message)
             else:
                 QMessageBox.information(self, "Success", 
                                       "Transfer completed successfully.")
+        elif self.worker.cancel_token.is_cancelled:
+            QMessageBox.information(self, "Transfer Cancelled",
+                                  "The transfer was cancelled. Starting it again "
+                                  "skips the files already verified.")
         else:
             QMessageBox.critical(self, "Error", 
                                "An error occurred during file transfer.")
@@ -156,26 +246,28 @@ class TransferWorker(QThread):
     overall_progress = pyqtSignal(int)
     file_progress = pyqtSignal(int)
     status = pyqtSignal(str)
+    rate = pyqtSignal(float, float)  # files/s, MB/s
     finished = pyqtSignal(bool, object)
     
-    def __init__(self, source_path, dest_path):
+    def __init__(self, source_path, dest_path, sync_mode="journal"):
         super().__init__()
         self.source_path = source_path
         self.dest_path = dest_path
+        self.sync_mode = sync_mode
+        self.cancel_token = CancellationToken()
     
     def run(self):
         try:
-            transfer_manager = FileTransferManager()
-            
-            # Connect callbacks
-            def overall_progress_callback(value):
-                self.overall_progress.emit(value)
+            transfer_manager = FileTransferManager(workers=TRANSFER_WORKERS,
+                                                   sync_mode=self.sync_mode,
+                                                   cancel_token=self.cancel_token)
             
-            def file_progress_callback(value):
-                self.file_progress.emit(value)
-            
-            def status_callback(message):
-                self.status.emit(message)
+            # Connect callbacks, coalescing the per-buffer updates before
+            # they become signals to the UI thread
+            progress_reporter = ProgressReporter(rate_callback=self.rate.emit)
+            overall_progress_callback = progress_reporter.percent(self.overall_progress.emit)
+            file_progress_callback = progress_reporter.percent(self.file_progress.emit)
+            status_callback = progress_reporter.status(self.status.emit)
             
             # Start transfer
             result = transfer_manager.transfer_files(
@@ -183,11 +275,17 @@ class TransferWorker(QThread):
                 self.dest_path,
                 overall_progress_callback=overall_progress_callback,
                 file_progress_callback=file_progress_callback,
-                status_callback=status_callback
+                status_callback=status_callback,
+                count_callback=progress_reporter.count
             )
             
+            progress_reporter.flush()
             self.finished.emit(True, result)
             
+        except OperationCancelled:
+            self.status.emit("Transfer cancelled")
+            self.finished.emit(False, None)
+            
         except Exception as e:
             self.status.emit(f"Error: {str(e)}")
             self.finished.emit(False, None)
\ No newline at end of file